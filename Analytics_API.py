@@ -0,0 +1,240 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from Storage import DB_ERRORS, get_backend
+from Result_Cache import RESULT_CACHE, DataVersion
+from Query_Governor import QUERY_GOVERNOR, QueryTimeout, QueryCancelled
+from Book_Data import normalize_isbn
+from Streamlit_Application import (POOL_SIZE, POOL_SLOTS, ANALYSIS_QUERIES, ISBN_LOOKUP,
+                                   search_books_by_keyword)
+
+API_HOST = os.environ.get("BOOKSCAPE_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("BOOKSCAPE_API_PORT", "8502"))
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+BODY_CACHE_ENTRIES = 512
+
+# Endpoints are the registered analysis names in lowercase, e.g. /api/top_authors
+ENDPOINTS = {name.lower(): name for name in ANALYSIS_QUERIES}
+PARAMETER_ENDPOINTS = ("search", "isbn")
+
+backend = get_backend(pool_size=POOL_SIZE)
+
+
+class PooledConnection:
+    """Pool checkout that waits for a free slot instead of exhausting the pool"""
+
+    def __init__(self):
+        POOL_SLOTS.acquire()
+        try:
+            self.conn = backend.connect()
+        except Exception:
+            POOL_SLOTS.release()
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def close(self):
+        try:
+            self.conn.close()
+        finally:
+            POOL_SLOTS.release()
+
+
+data_version = DataVersion(PooledConnection)
+
+# Serialized response bodies by ETag, so repeated requests skip pandas and JSON encoding
+body_cache = OrderedDict()
+body_cache_lock = threading.Lock()
+
+
+class BadRequest(Exception):
+    pass
+
+
+def load_frame(version, query, params=None):
+    """Query result from the shared result cache, loaded under the query governor on a miss"""
+    def load():
+        conn = PooledConnection()
+        try:
+            return QUERY_GOVERNOR.execute(backend, conn, query, params)
+        finally:
+            conn.close()
+
+    return RESULT_CACHE.get_or_load(version, query, params, load)
+
+
+def int_param(args, name, default, maximum=None):
+    try:
+        value = int(args.get(name, [default])[0])
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if value < 0:
+        raise BadRequest(f"'{name}' must not be negative")
+    return min(value, maximum) if maximum is not None else value
+
+
+def required_param(args, name):
+    value = args.get(name, [""])[0].strip()
+    if not value:
+        raise BadRequest(f"Query parameter '{name}' is required")
+    return value
+
+
+def isbn_lookup(version, args):
+    isbns = [isbn for value in args.get("isbn", []) for isbn in value.split(",") if isbn.strip()]
+    if not isbns:
+        raise BadRequest("Query parameter 'isbn' is required")
+    keys = sorted({key for key in map(normalize_isbn, isbns) if key})
+    if not keys:
+        return pd.DataFrame(columns=["canonical_isbn", "book_id", "book_title", "book_authors", "publication_year"])
+    query = ISBN_LOOKUP.format(placeholders=", ".join(["%s"] * len(keys)))
+    return load_frame(version, query, tuple(keys))
+
+
+def resolve_endpoint(version, endpoint, args):
+    """Result frame of an endpoint"""
+    if endpoint == "search":
+        return load_frame(version, *search_books_by_keyword(required_param(args, "keyword")))
+    if endpoint == "isbn":
+        return isbn_lookup(version, args)
+    return load_frame(version, ANALYSIS_QUERIES[ENDPOINTS[endpoint]])
+
+
+def endpoint_index():
+    return {
+        "endpoints": [f"/api/{endpoint}" for endpoint in [*ENDPOINTS, *PARAMETER_ENDPOINTS]],
+        "parameters": {
+            "limit": f"rows per page (default {DEFAULT_LIMIT}, max {MAX_LIMIT})",
+            "offset": "rows to skip",
+            "keyword": "title keyword, /api/search only",
+            "isbn": "comma-separated ISBN-10/ISBN-13 values, /api/isbn only"
+        }
+    }
+
+
+def build_body(version, endpoint, args):
+    """Serialize one page of an endpoint result as JSON bytes"""
+    if endpoint == "":
+        payload = dict(endpoint_index(), data_version=version)
+        return json.dumps(payload).encode("utf-8")
+
+    limit = int_param(args, "limit", DEFAULT_LIMIT, MAX_LIMIT)
+    offset = int_param(args, "offset", 0)
+    df = resolve_endpoint(version, endpoint, args)
+    page = df.iloc[offset:offset + limit]
+    rows = json.loads(page.to_json(orient="records", date_format="iso", default_handler=str))
+    payload = {
+        "endpoint": endpoint,
+        "data_version": version,
+        "total_rows": len(df),
+        "truncated": bool(df.attrs.get("truncated")),
+        "offset": offset,
+        "limit": limit,
+        "rows": rows
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def make_etag(version, path, query_string):
+    """ETag of a response: changes only when the data version or the request changes"""
+    canonical_query = "&".join(sorted(query_string.split("&"))) if query_string else ""
+    digest = hashlib.sha1(f"{version}|{path}|{canonical_query}".encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def cached_body(etag):
+    with body_cache_lock:
+        if etag in body_cache:
+            body_cache.move_to_end(etag)
+            return body_cache[etag]
+    return None
+
+
+def remember_body(etag, body):
+    with body_cache_lock:
+        body_cache[etag] = body
+        while len(body_cache) > BODY_CACHE_ENTRIES:
+            body_cache.popitem(last=False)
+
+
+class AnalyticsHandler(BaseHTTPRequestHandler):
+    server_version = "BookScapeAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        if path != "/api" and not path.startswith("/api/"):
+            return self.send_json(404, {"error": "Not found"})
+        endpoint = path[len("/api/"):] if path != "/api" else ""
+        if endpoint and endpoint not in ENDPOINTS and endpoint not in PARAMETER_ENDPOINTS:
+            return self.send_json(404, {"error": f"Unknown endpoint '{endpoint}'"})
+
+        try:
+            version = data_version.get()
+        except DB_ERRORS as e:
+            return self.send_query_error(path, e)
+        etag = make_etag(version, path, url.query)
+
+        # Conditional request: an unchanged data version means the client's copy is current
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = cached_body(etag)
+        if body is None:
+            try:
+                body = build_body(version, endpoint, parse_qs(url.query))
+            except BadRequest as e:
+                return self.send_json(400, {"error": str(e)})
+            except QueryTimeout as e:
+                # Over the time limit, or paused by the governor's cooldown after one
+                return self.send_json(503, {"error": str(e)})
+            except (QueryCancelled, *DB_ERRORS) as e:
+                return self.send_query_error(path, e)
+            remember_body(etag, body)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_query_error(self, path, error):
+        print(f"Error serving {path}: {error}")
+        return self.send_json(500, {"error": f"Query failed: {error}"})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    server = ThreadingHTTPServer((API_HOST, API_PORT), AnalyticsHandler)
+    print(f"Analytics API listening on http://{API_HOST}:{API_PORT}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Analytics API stopped")
+
+
+if __name__ == "__main__":
+    main()
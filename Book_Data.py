@@ -1,7 +1,94 @@
+import time
 import requests
-import mysql.connector
 import json
-from mysql.connector import Error
+from Storage import DB_ERRORS, get_backend
+from Recommendations import build_similarity_index
+from Deduplication import deduplicate
+from Result_Cache import ResultCache, bump_data_version
+from Catalog_Sketches import CatalogSketches
+from Price_History import content_hash, create_history_tables, record_history
+from Category_Tree import create_category_tree_tables, insert_category_node, refresh_category_stats
+from Ingest_Progress import IngestProgress
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library decoder
+    orjson = None
+
+
+# Local, versioned FX table used to normalize prices to USD at ingest.
+# Bump FX_RATES_VERSION whenever the rates are updated.
+FX_RATES_VERSION = "2024-01-01"
+FX_RATES_TO_USD = {
+    "USD": 1.0,
+    "INR": 0.01203,
+    "EUR": 1.0950,
+    "GBP": 1.2730,
+    "CAD": 0.7460,
+    "AUD": 0.6750,
+    "NZD": 0.6260,
+    "JPY": 0.00690,
+    "CNY": 0.1400,
+    "HKD": 0.1280,
+    "SGD": 0.7540,
+    "KRW": 0.00077,
+    "TWD": 0.0320,
+    "CHF": 1.1800,
+    "SEK": 0.0990,
+    "NOK": 0.0980,
+    "DKK": 0.1470,
+    "PLN": 0.2540,
+    "CZK": 0.0446,
+    "HUF": 0.00288,
+    "BRL": 0.2050,
+    "MXN": 0.0590,
+    "ZAR": 0.0545,
+    "RUB": 0.0112,
+    "TRY": 0.0336,
+}
+
+# Largest magnitude books.discount_pct (DECIMAL(7,2)) can hold; a retail price far
+# above the list price would otherwise overflow it and strict MySQL rejects the row.
+DISCOUNT_PCT_LIMIT = 99999.99
+
+
+# Index plan derived from the analysis queries in Streamlit_Application.py.
+# Each entry is (index name, table, columns); composite indexes lead with the
+# filter/group column and append the column the query aggregates or sorts on,
+# so the aggregate can be answered from the index alone.
+INDEX_PLAN = [
+    # PUBLISHER_RATINGS, PUBLISHER_WITH_HIGHEST_AVERAGE_RATING, PUBLISHER_BOOK_COUNT
+    ("idx_publisher_rating", "books", ["publisher_id", "averageRating"]),
+    # EBOOK_VS_PHYSICAL, AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL
+    ("idx_isebook_pagecount", "books", ["isEbook", "pageCount"]),
+    # AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL
+    ("idx_isebook_retail_price", "books", ["isEbook", "retail_price_usd"]),
+    # PUBLISHED_AFTER_2010
+    ("idx_year_pagecount", "books", ["publication_year", "pageCount"]),
+    # YEAR_WITH_HIGHEST_AVERAGE_BOOK_PRICE
+    ("idx_year_retail_price", "books", ["publication_year", "retail_price_usd"]),
+    # AVERAGE_PAGE_COUNT_PER_CATEGORY
+    ("idx_pagecount", "books", ["pageCount"]),
+    # BOOKS_WITH_RATING_OUTLIERS
+    ("idx_rating", "books", ["averageRating", "ratingsCount"]),
+    # RATINGS_GREATER_THAN_AVERAGE_RATING
+    ("idx_ratings_count", "books", ["ratingsCount"]),
+    # TOP_EXPENSIVE_BOOKS (ORDER BY retail_price_usd DESC LIMIT 5)
+    ("idx_retail_price_usd", "books", ["retail_price_usd"]),
+    # DISCOUNTED_BOOKS (discount_pct > 20 ORDER BY discount_pct DESC)
+    ("idx_discount_pct", "books", ["discount_pct"]),
+    # Reverse primary keys for author/category lookups and joins
+    ("idx_book_authors_author", "book_authors", ["author_id", "book_id"]),
+    ("idx_book_categories_category", "book_categories", ["category_id", "book_id"]),
+    # Identifier joins and ISBN lookups
+    ("idx_identifiers_book", "industry_identifiers", ["book_id"]),
+    ("idx_identifiers_isbn", "industry_identifiers", ["canonical_isbn", "book_id"]),
+    # Category hierarchy: child lists, level rollups and subtree lookups
+    ("idx_category_nodes_parent", "category_nodes", ["parent_id"]),
+    ("idx_category_nodes_depth", "category_nodes", ["depth"]),
+    ("idx_category_closure_descendant", "category_closure", ["descendant_id", "ancestor_id"]),
+    ("idx_categories_node", "categories", ["node_id"]),
+]
 
 
 def create_database_schema(cursor):
@@ -10,13 +97,21 @@ def create_database_schema(cursor):
     # Drop existing tables in correct order
     cursor.execute("""
         DROP TABLE IF EXISTS  
+        category_node_stats,
+        category_closure,
+        publisher_merges,
+        author_merges,
+        book_display,
+        book_details,
         book_categories, 
         book_authors, 
         industry_identifiers, 
         books, 
         publishers, 
         authors, 
-        categories
+        categories,
+        category_nodes,
+        fx_rates
     """)
 
     # Create Publishers table
@@ -35,24 +130,25 @@ def create_database_schema(cursor):
         )
     """)
 
-    # Create Categories table
+    # Create the category hierarchy (see Category_Tree.py)
+    create_category_tree_tables(cursor)
+
+    # Create Categories table - each category points at the hierarchy node of its full path
     cursor.execute("""
         CREATE TABLE categories (
             category_id SERIAL PRIMARY KEY,
-            category_name VARCHAR(255) NOT NULL UNIQUE
+            category_name VARCHAR(255) NOT NULL UNIQUE,
+            node_id INTEGER REFERENCES category_nodes(node_id)
         )
     """)
 
-    # Create main Books table - now with categories column
+    # Create main Books table - authors and categories live only in the mapping tables
     cursor.execute("""
         CREATE TABLE books (
             book_id VARCHAR(50) PRIMARY KEY,
             search_key VARCHAR(255),
             book_title VARCHAR(500) NOT NULL,
             book_subtitle TEXT,
-            book_description TEXT,
-            book_authors TEXT,
-            categories TEXT,
             text_readingModes BOOLEAN DEFAULT false,
             image_readingModes BOOLEAN DEFAULT false,
             pageCount INTEGER,
@@ -66,10 +162,32 @@ def create_database_schema(cursor):
             currencyCode_listPrice VARCHAR(3),
             amount_retailPrice DECIMAL(10,2),
             currencyCode_retailPrice VARCHAR(3),
+            list_price_usd DECIMAL(10,2),
+            retail_price_usd DECIMAL(10,2),
+            discount_pct DECIMAL(7,2),
+            fx_rates_version VARCHAR(20),
             buyLink TEXT,
-            imageLinks TEXT,
             country VARCHAR(50),
-            saleability VARCHAR(50)
+            saleability VARCHAR(50),
+            content_hash CHAR(16)
+        )
+    """)
+
+    # Create Book Details table - long description and image links kept out of the hot books rows
+    cursor.execute("""
+        CREATE TABLE book_details (
+            book_id VARCHAR(50) PRIMARY KEY REFERENCES books(book_id) ON DELETE CASCADE,
+            book_description TEXT,
+            imageLinks JSON
+        )
+    """)
+
+    # Create Book Display table - comma-joined authors/categories derived from the mapping tables
+    cursor.execute("""
+        CREATE TABLE book_display (
+            book_id VARCHAR(50) PRIMARY KEY REFERENCES books(book_id) ON DELETE CASCADE,
+            book_authors TEXT,
+            categories TEXT
         )
     """)
 
@@ -78,6 +196,7 @@ def create_database_schema(cursor):
         CREATE TABLE book_authors (
             book_id VARCHAR(50) REFERENCES books(book_id) ON DELETE CASCADE,
             author_id INTEGER REFERENCES authors(author_id) ON DELETE CASCADE,
+            author_position INTEGER NOT NULL DEFAULT 0,
             PRIMARY KEY (book_id, author_id)
         )
     """)
@@ -97,16 +216,28 @@ def create_database_schema(cursor):
             identifier_id SERIAL PRIMARY KEY,
             book_id VARCHAR(50) REFERENCES books(book_id) ON DELETE CASCADE,
             identifier_type VARCHAR(20),
-            identifier_value VARCHAR(50)
+            identifier_value VARCHAR(50),
+            canonical_isbn CHAR(13),
+            UNIQUE (identifier_type, identifier_value)
         )
     """)
 
-    # Create indexes for query optimization
-    cursor.execute("CREATE INDEX idx_publication_year ON books(publication_year)")
-    cursor.execute("CREATE INDEX idx_pagecount ON books(pageCount)")
-    cursor.execute("CREATE INDEX idx_rating ON books(averageRating)")
-    cursor.execute("CREATE INDEX idx_publisher ON books(publisher_id)")
-    cursor.execute("CREATE INDEX idx_isebook ON books(isEbook)")
+    # Create merge tables - name variants folded onto a canonical publisher/author by Deduplication.py
+    for merges_table in ("publisher_merges", "author_merges"):
+        cursor.execute(f"""
+            CREATE TABLE {merges_table} (
+                variant_id INTEGER PRIMARY KEY,
+                variant_name VARCHAR(255),
+                canonical_id INTEGER NOT NULL
+            )
+        """)
+
+    # Create price and rating history tables - kept across reloads (see Price_History.py)
+    create_history_tables(cursor)
+
+    # Create indexes for query optimization (see INDEX_PLAN)
+    for index_name, table_name, columns in INDEX_PLAN:
+        cursor.execute(f"CREATE INDEX {index_name} ON {table_name}({', '.join(columns)})")
 
     print("Database schema created successfully")
 
@@ -134,16 +265,170 @@ def insert_author(cursor, author_name):
 def insert_category(cursor, category_name):
     try:
         cursor.execute("INSERT IGNORE INTO categories (category_name) VALUES (%s)", (category_name,))
-        cursor.execute("SELECT category_id FROM categories WHERE category_name = %s", (category_name,))
-        return cursor.fetchone()[0]
+        cursor.execute("SELECT category_id, node_id FROM categories WHERE category_name = %s", (category_name,))
+        category_id, node_id = cursor.fetchone()
+        # First sighting of a category: place its path in the hierarchy
+        if node_id is None:
+            node_id = insert_category_node(cursor, category_name)
+            cursor.execute("UPDATE categories SET node_id = %s WHERE category_id = %s", (node_id, category_id))
+        return category_id
     except Exception as e:
         print(f"Error handling category {category_name}: {e}")
         return None
 
 
-# Function to scrape books data from Google API
-def scrap(query, api_key, max_results):
+def refresh_book_display(cursor, book_id):
+    """Rebuild the display row of a book from the author and category mapping tables"""
+    cursor.execute("DELETE FROM book_display WHERE book_id = %s", (book_id,))
+    # Authors follow the API's order; the ordered derived table keeps it on SQLite
+    # builds that ignore ORDER BY inside GROUP_CONCAT
+    cursor.execute("""
+        INSERT INTO book_display (book_id, book_authors, categories)
+        SELECT
+            b.book_id,
+            COALESCE((
+                SELECT GROUP_CONCAT(listed.author_name ORDER BY listed.author_position SEPARATOR ', ')
+                FROM (
+                    SELECT a.author_name, ba.author_position
+                    FROM book_authors ba
+                    JOIN authors a ON ba.author_id = a.author_id
+                    WHERE ba.book_id = %s
+                    ORDER BY ba.author_position
+                ) listed
+            ), 'NA'),
+            COALESCE((
+                SELECT GROUP_CONCAT(c.category_name ORDER BY c.category_id SEPARATOR ', ')
+                FROM book_categories bc
+                JOIN categories c ON bc.category_id = c.category_id
+                WHERE bc.book_id = b.book_id
+            ), 'NA')
+        FROM books b
+        WHERE b.book_id = %s
+    """, (book_id, book_id))
+
+
+def to_usd(amount, currency_code):
+    """Convert an amount to USD with the local FX table, None if it cannot be converted"""
+    rate = FX_RATES_TO_USD.get(currency_code)
+    if amount is None or rate is None:
+        return None
+    return round(amount * rate, 2)
+
+
+def discount_percentage(list_price, retail_price):
+    """Discount of the retail price against the list price, in percent, clamped to the discount_pct column"""
+    list_amount, list_currency = list_price.get("amount"), list_price.get("currencyCode")
+    retail_amount, retail_currency = retail_price.get("amount"), retail_price.get("currencyCode")
+    if list_currency != retail_currency:
+        # Compare unrounded USD amounts; rounding to cents first skews discounts on cheap books
+        list_rate, retail_rate = FX_RATES_TO_USD.get(list_currency), FX_RATES_TO_USD.get(retail_currency)
+        if list_rate is None or retail_rate is None:
+            return None
+        list_amount = None if list_amount is None else list_amount * list_rate
+        retail_amount = None if retail_amount is None else retail_amount * retail_rate
+    if list_amount is None or retail_amount is None or list_amount <= 0:
+        return None
+    discount = round((list_amount - retail_amount) / list_amount * 100, 2)
+    return max(-DISCOUNT_PCT_LIMIT, min(discount, DISCOUNT_PCT_LIMIT))
+
+
+def isbn13_check_digit(digits):
+    """Check digit for the first 12 digits of an ISBN-13"""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """Normalize an ISBN-10 or ISBN-13 to its canonical ISBN-13, None if it is not a valid ISBN"""
+    if not value:
+        return None
+    isbn = "".join(ch for ch in str(value).upper() if ch.isdigit() or ch == "X")
+
+    if len(isbn) == 10:
+        if not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == "X"):
+            return None
+        total = sum((10 - i) * (10 if ch == "X" else int(ch)) for i, ch in enumerate(isbn))
+        if total % 11 != 0:
+            return None
+        isbn = "978" + isbn[:9]
+        return isbn + isbn13_check_digit(isbn)
+
+    if len(isbn) == 13 and isbn.isdigit():
+        return isbn if isbn13_check_digit(isbn) == isbn[12] else None
+
+    return None
+
+
+# Fields of a volume resource read by process_book - the API response is
+# projected down to exactly these, so update this map together with process_book
+BOOK_FIELD_MAP = {
+    "volumeInfo": [
+        "title", "subtitle", "description", "authors", "categories", "readingModes",
+        "pageCount", "language", "publisher", "publishedDate", "ratingsCount",
+        "averageRating", "imageLinks", "industryIdentifiers"
+    ],
+    "saleInfo": [
+        "isEbook", "listPrice", "retailPrice", "buyLink", "country", "saleability"
+    ]
+}
+
+
+def build_fields_projection(field_map):
+    """Build the partial-response fields= value for a volumes list request"""
+    sections = ",".join(f"{section}({','.join(fields)})" for section, fields in field_map.items())
+    return f"items(id,{sections})"
+
+
+BOOK_FIELDS = build_fields_projection(BOOK_FIELD_MAP)
+
+# Google APIs only compress responses for clients that advertise gzip in both headers
+REQUEST_HEADERS = {
+    "Accept-Encoding": "gzip",
+    "User-Agent": "BookScape Explorer (gzip)"
+}
+
+
+# Rate limiting and server errors are retried with exponential backoff; any other error status fails the query
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+RETRY_BACKOFF_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying; the API's Retry-After when it sends one in seconds"""
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    return float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF_SECONDS * 2 ** attempt
+
+
+def get_page(session, url, params, retries=MAX_RETRIES):
+    """Request one page of results; raises requests.HTTPError once retries are exhausted"""
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            response = None
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response
+        time.sleep(retry_delay(response, attempt))
+
+
+def parse_json(content):
+    """Decode a JSON response body with the fastest available decoder"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Function to scrape books data from Google API; filters adds request parameters such as langRestrict
+def scrap(query, api_key, max_results, session=None, filters=None):
     url = "https://www.googleapis.com/books/v1/volumes"
+    session = session or requests.Session()
+    session.headers.update(REQUEST_HEADERS)
     results = []
     max_results_per_request = 40
     for start in range(0, max_results, max_results_per_request):
@@ -152,21 +437,30 @@ def scrap(query, api_key, max_results):
             "q": query,
             "startIndex": start,
             "maxResults": min(max_results_per_request, max_results - start),
-            "key": api_key
+            "fields": BOOK_FIELDS,
+            "key": api_key,
+            **(filters or {})
         }
 
-        # Make the API request
-        response = requests.get(url, params=params)
-        data = response.json()
+        # Make the API request; an error page must not pass for the end of the results
+        response = get_page(session, url, params)
+        data = parse_json(response.content)
 
-        # Append results
-        results.extend(data.get("items", []))
+        # Append results; an empty page means the query has no more results
+        items = data.get("items", [])
+        if not items:
+            break
+        results.extend(items)
 
     return results
 
 
-def process_book(book_item, search_key, cursor):
-    """Process a single book item and insert into database with all relationships"""
+def process_book(book_item, search_key, cursor, sketches=None):
+    """Process a single book item and insert into database with all relationships
+
+    Only the fields listed in BOOK_FIELD_MAP are present in book_item. When sketches is
+    given, the stored book is also added to those catalog sketches.
+    """
     try:
         volume_info = book_item.get("volumeInfo", {})
         sale_info = book_item.get("saleInfo", {})
@@ -175,13 +469,9 @@ def process_book(book_item, search_key, cursor):
         publisher_name = volume_info.get("publisher", "Unknown")
         publisher_id = insert_publisher(cursor, publisher_name)
 
-        # Process authors
+        # Process authors and categories (stored in the mapping tables)
         authors = volume_info.get("authors", [])
-        authors_str = ", ".join(authors) if authors else "NA"
-
-        # Process categories
         categories = volume_info.get("categories", [])
-        categories_str = ", ".join(categories) if categories else "NA"
 
         # Extract year
         published_date = volume_info.get("publishedDate", "")
@@ -192,15 +482,18 @@ def process_book(book_item, search_key, cursor):
         except:
             year = None
 
+        # Normalize prices to USD
+        list_price = sale_info.get("listPrice", {})
+        retail_price = sale_info.get("retailPrice", {})
+        list_price_usd = to_usd(list_price.get("amount"), list_price.get("currencyCode"))
+        retail_price_usd = to_usd(retail_price.get("amount"), retail_price.get("currencyCode"))
+
         # Prepare book data
         book_data = {
             "book_id": book_item.get("id"),
             "search_key": search_key,
             "book_title": volume_info.get("title", "NA"),
             "book_subtitle": volume_info.get("subtitle"),
-            "book_description": volume_info.get("description"),
-            "book_authors": authors_str,
-            "categories": categories_str,
             "text_readingModes": volume_info.get("readingModes", {}).get("text", False),
             "image_readingModes": volume_info.get("readingModes", {}).get("image", False),
             "pageCount": volume_info.get("pageCount"),
@@ -210,16 +503,22 @@ def process_book(book_item, search_key, cursor):
             "ratingsCount": volume_info.get("ratingsCount"),
             "averageRating": volume_info.get("averageRating"),
             "isEbook": sale_info.get("isEbook", False),
-            "amount_listPrice": sale_info.get("listPrice", {}).get("amount"),
-            "currencyCode_listPrice": sale_info.get("listPrice", {}).get("currencyCode"),
-            "amount_retailPrice": sale_info.get("retailPrice", {}).get("amount"),
-            "currencyCode_retailPrice": sale_info.get("retailPrice", {}).get("currencyCode"),
+            "amount_listPrice": list_price.get("amount"),
+            "currencyCode_listPrice": list_price.get("currencyCode"),
+            "amount_retailPrice": retail_price.get("amount"),
+            "currencyCode_retailPrice": retail_price.get("currencyCode"),
+            "list_price_usd": list_price_usd,
+            "retail_price_usd": retail_price_usd,
+            "discount_pct": discount_percentage(list_price, retail_price),
+            "fx_rates_version": FX_RATES_VERSION,
             "buyLink": sale_info.get("buyLink"),
-            "imageLinks": json.dumps(volume_info.get("imageLinks", {})),
             "country": sale_info.get("country", "NA"),
             "saleability": sale_info.get("saleability", "NA")
         }
 
+        # Hash of the tracked prices and ratings, diffed against the previous load in SQL
+        book_data["content_hash"] = content_hash(book_data)
+
         # Remove None values
         book_data = {k: v for k, v in book_data.items() if v is not None}
 
@@ -229,15 +528,24 @@ def process_book(book_item, search_key, cursor):
         insert_query = f"INSERT INTO books ({columns}) VALUES ({placeholders})"
         cursor.execute(insert_query, tuple(book_data.values()))
 
+        # Insert book details
+        cursor.execute("""
+            INSERT INTO book_details (book_id, book_description, imageLinks)
+            VALUES (%s, %s, %s)
+        """, (book_data["book_id"], volume_info.get("description"),
+              json.dumps(volume_info.get("imageLinks", {}))))
+
         # Processing authors
-        for author_name in authors:
+        stored_authors = []
+        for author_position, author_name in enumerate(authors):
             if author_name:  # Make sure author name is not empty
                 author_id = insert_author(cursor, author_name)
                 if author_id:
                     cursor.execute("""
-                        INSERT INTO book_authors (book_id, author_id)
-                        VALUES (%s, %s)
-                    """, (book_data["book_id"], author_id))
+                        INSERT INTO book_authors (book_id, author_id, author_position)
+                        VALUES (%s, %s, %s)
+                    """, (book_data["book_id"], author_id, author_position))
+                    stored_authors.append((author_id, author_name))
 
         # Processing categories
         for category_name in categories:
@@ -251,10 +559,19 @@ def process_book(book_item, search_key, cursor):
         # Processing industry identifiers
         identifiers = volume_info.get("industryIdentifiers", [])
         for identifier in identifiers:
+            identifier_type = identifier.get("type")
+            identifier_value = identifier.get("identifier")
+            canonical_isbn = normalize_isbn(identifier_value) if str(identifier_type).startswith("ISBN") else None
             cursor.execute("""
-                INSERT INTO industry_identifiers (book_id, identifier_type, identifier_value)
-                VALUES (%s, %s, %s)
-            """, (book_data["book_id"], identifier.get("type"), identifier.get("identifier")))
+                INSERT IGNORE INTO industry_identifiers (book_id, identifier_type, identifier_value, canonical_isbn)
+                VALUES (%s, %s, %s, %s)
+            """, (book_data["book_id"], identifier_type, identifier_value, canonical_isbn))
+
+        # Derive the display columns from the mapping tables
+        refresh_book_display(cursor, book_data["book_id"])
+
+        if sketches is not None:
+            sketches.observe(dict(book_data, publisher_name=publisher_name), stored_authors)
 
         return True
 
@@ -278,13 +595,14 @@ def main():
         "Business"
     ]
 
+    # Counters published for the dashboard's Ingest Monitor while the load runs
+    progress = IngestProgress(search_keys)
+    data_version = None
+
     try:
-        connection = mysql.connector.connect(
-            host='127.0.0.1',
-            user='root',
-            password='******',
-            database='bookscape_explorer'
-        )
+        # Connection settings and backend selection live in Storage.py
+        progress.stage("schema")
+        connection = get_backend().connect()
 
         if connection.is_connected():
             cursor = connection.cursor()
@@ -293,31 +611,81 @@ def main():
             cursor.execute("CREATE DATABASE IF NOT EXISTS bookscape_explorer")
             cursor.execute("USE bookscape_explorer")
             
-            # Creating the database schema
+            # Creating the database schema; the new version invalidates cached results
             create_database_schema(cursor)
+            bump_data_version(cursor)
+            connection.commit()
 
-            # Process each search key
+            # Process each search key; the crawl planner splits it into sub-queries fetched in parallel
+            from Crawl_Planner import crawl  # the planner imports scrap from this module
+            sketches = CatalogSketches()
             for search_key in search_keys:
                 print(f"Processing search key: {search_key}")
-                books_data = scrap(search_key, api_key, 500)
+                progress.key_started(search_key)
+                progress.stage("fetch")
+                books_data = crawl(search_key, api_key)
+                progress.key_fetched(search_key, len(books_data))
 
+                progress.stage("process")
                 successful_imports = 0
                 for book_item in books_data:
-                    if process_book(book_item, search_key, cursor):
+                    imported = process_book(book_item, search_key, cursor, sketches)
+                    if imported:
                         successful_imports += 1
                         connection.commit()
+                    progress.book_processed(search_key, book_item, imported)
 
+                progress.key_finished(search_key)
                 print(f"Completed {search_key}: {successful_imports} books imported")
 
-    except Error as e:
+            # Merge publisher and author name variants, then refresh the affected display rows
+            progress.stage("deduplicate")
+            affected_books = set()
+            for kind in ("publisher", "author"):
+                affected_books.update(deduplicate(cursor, kind))
+            for book_id in affected_books:
+                refresh_book_display(cursor, book_id)
+            connection.commit()
+            sketches.apply_author_merges(cursor)
+
+            # Roll the loaded books up every level of the category hierarchy
+            progress.stage("category hierarchy")
+            refresh_category_stats(cursor)
+            connection.commit()
+
+            # Build the "similar books" index from the freshly loaded catalog
+            progress.stage("similarity index")
+            build_similarity_index(cursor)
+
+            # Publish the finished load as a new data version and drop older cached results;
+            # prices and ratings that changed since the previous load go to the history
+            progress.stage("publish")
+            data_version = bump_data_version(cursor)
+            record_history(cursor, data_version)
+            connection.commit()
+            ResultCache().prune(data_version)
+            print(f"Data version {data_version} published")
+
+            # Sketches behind the dashboard's approximate mode, tagged with the published version
+            sketches.save(data_version)
+
+            # Run every analysis once so no dashboard user hits a cold query or chart
+            from Cache_Warmup import warm_caches  # the dashboard module imports Book_Data
+            progress.stage("cache warm-up")
+            warm_caches(data_version)
+            progress.finish(data_version)
+
+    except DB_ERRORS as e:
         print(f"Database error: {e}")
+        progress.finish(data_version, error=f"Database error: {e}")
     except Exception as e:
         print(f"General error: {e}")
+        progress.finish(data_version, error=f"General error: {e}")
     finally:
         if connection.is_connected():
             cursor.close()
             connection.close()
-            print("MySQL connection closed")
+            print("Database connection closed")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,349 @@
+import os
+import math
+import random
+import pickle
+import heapq
+import hashlib
+import numpy as np
+import pandas as pd
+from Deduplication import normalize_name
+
+CATALOG_SKETCHES_PATH = os.environ.get("BOOKSCAPE_SKETCHES", "catalog_sketches.pkl")
+
+HLL_PRECISION = 12
+TOP_AUTHOR_CAPACITY = 1024
+SAMPLE_SIZE = 2000
+# z value of the 95% intervals shown next to approximate answers
+Z_95 = 1.96
+
+BOOK_TYPES = ("eBook", "Physical Book")
+SAMPLE_COLUMNS = ["book_id", "book_title", "averageRating", "ratingsCount", "pageCount", "retail_price_usd"]
+
+
+def hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2 ** precision registers (relative standard error 1.04 / sqrt(m))"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, value):
+        hashed = hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class SpaceSaving:
+    """Top-k heavy hitters: each estimate overcounts the true count by at most its error"""
+
+    def __init__(self, capacity=TOP_AUTHOR_CAPACITY):
+        self.capacity = capacity
+        self.counts, self.errors, self.labels = {}, {}, {}
+        # (count, key) entries; stale ones are skipped when popped
+        self.heap = []
+
+    def smallest(self):
+        while True:
+            count, key = self.heap[0]
+            if self.counts.get(key) == count:
+                return key
+            heapq.heappop(self.heap)
+
+    def add(self, key, label=None, count=1):
+        if key not in self.counts and len(self.counts) >= self.capacity:
+            # Replace the smallest counter; its count becomes the newcomer's error bound
+            smallest = self.smallest()
+            floor = self.counts.pop(smallest)
+            self.errors.pop(smallest)
+            self.labels.pop(smallest, None)
+            self.counts[key], self.errors[key] = floor, floor
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.errors.setdefault(key, 0)
+        if label is not None:
+            self.labels[key] = label
+
+        heapq.heappush(self.heap, (self.counts[key], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def merge_keys(self, mapping, labels=None):
+        """Fold counters of variant keys onto their canonical key (summed counts stay upper bounds)"""
+        counts, errors = {}, {}
+        for key, count in self.counts.items():
+            target = mapping.get(key, key)
+            counts[target] = counts.get(target, 0) + count
+            errors[target] = errors.get(target, 0) + self.errors[key]
+        self.counts, self.errors = counts, errors
+        self.heap = [(count, key) for key, count in counts.items()]
+        heapq.heapify(self.heap)
+        self.labels = {mapping.get(key, key): label for key, label in self.labels.items()}
+        self.labels.update(labels or {})
+
+    def top(self, k):
+        """(key, label, estimate, error) of the k largest counters"""
+        ranked = sorted(self.counts, key=lambda key: (-self.counts[key], str(key)))[:k]
+        return [(key, self.labels.get(key), self.counts[key], self.errors[key]) for key in ranked]
+
+
+class RunningMoments:
+    """Count, mean and variance of a stream (Welford), exact and mergeable"""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        # Population standard deviation, like MySQL's STDDEV
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class Reservoir:
+    """Uniform random sample of a stream (algorithm R)"""
+
+    def __init__(self, size=SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self.rng = random.Random(seed)
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+
+def quantile_bound(sample_size, confidence=0.95):
+    """Rank error of a sample quantile (Dvoretzky-Kiefer-Wolfowitz): true rank within +/- this fraction"""
+    if not sample_size:
+        return 1.0
+    return math.sqrt(math.log(2 / (1 - confidence)) / (2 * sample_size))
+
+
+def proportion_interval(hits, size):
+    """Half-width of the 95% normal interval of a sampled proportion"""
+    if not size:
+        return 0.0
+    p = hits / size
+    return Z_95 * math.sqrt(p * (1 - p) / size)
+
+
+class CatalogSketches:
+    """Sketches of the catalog maintained while books are ingested
+
+    Exact running counters and moments per book type, HyperLogLog distinct counts of authors
+    and publishers, Space-Saving top authors, and a reservoir sample of books per book type.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=0):
+        self.version = None
+        self.books = 0
+        self.type_counts = {book_type: 0 for book_type in BOOK_TYPES}
+        self.pages = {book_type: RunningMoments() for book_type in BOOK_TYPES}
+        self.prices = {book_type: RunningMoments() for book_type in BOOK_TYPES}
+        self.ratings = RunningMoments()
+        self.authors = HyperLogLog()
+        self.publishers = HyperLogLog()
+        self.top_authors = SpaceSaving()
+        self.samples = {book_type: Reservoir(sample_size // len(BOOK_TYPES), seed + i)
+                        for i, book_type in enumerate(BOOK_TYPES)}
+
+    def observe(self, book, authors=()):
+        """Add one ingested book; book maps books columns to values, authors is [(author_id, name)]"""
+        book_type = "eBook" if book.get("isEbook") else "Physical Book"
+        self.books += 1
+        self.type_counts[book_type] += 1
+        if book.get("pageCount") is not None:
+            self.pages[book_type].add(float(book["pageCount"]))
+        if book.get("retail_price_usd") is not None:
+            self.prices[book_type].add(float(book["retail_price_usd"]))
+        if book.get("averageRating") is not None:
+            self.ratings.add(float(book["averageRating"]))
+        if book.get("publisher_name"):
+            self.publishers.add(normalize_name(book["publisher_name"]))
+        for author_id, author_name in authors:
+            self.authors.add(normalize_name(author_name))
+            self.top_authors.add(author_id, author_name)
+        self.samples[book_type].add(tuple(book.get(column) for column in SAMPLE_COLUMNS))
+
+    def apply_author_merges(self, cursor):
+        """Point the top-author counters at the canonical authors chosen by Deduplication"""
+        cursor.execute("""
+            SELECT m.variant_id, m.canonical_id, a.author_name
+            FROM author_merges m
+            JOIN authors a ON a.author_id = m.canonical_id
+        """)
+        rows = cursor.fetchall()
+        self.top_authors.merge_keys({variant: canonical for variant, canonical, _ in rows},
+                                    {canonical: name for _, canonical, name in rows})
+
+    def sample_frame(self):
+        frames = [pd.DataFrame(reservoir.items, columns=SAMPLE_COLUMNS).assign(book_type=book_type)
+                  for book_type, reservoir in self.samples.items()]
+        frame = pd.concat(frames, ignore_index=True)
+        for column in SAMPLE_COLUMNS[2:]:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce")
+        return frame
+
+    def save(self, version, path=CATALOG_SKETCHES_PATH):
+        self.version = version
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as output:
+            pickle.dump(self, output, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Catalog sketches saved for {self.books} books: {path}")
+        return path
+
+
+def load_catalog_sketches(path=CATALOG_SKETCHES_PATH):
+    with open(path, "rb") as source:
+        return pickle.load(source)
+
+
+def build_catalog_sketches(cursor, batch_size=5000):
+    """Sketches of a catalog already in the database, read in one streaming pass"""
+    sketches = CatalogSketches()
+    cursor.execute("""
+        SELECT ba.book_id, a.author_id, a.author_name
+        FROM book_authors ba
+        JOIN authors a ON ba.author_id = a.author_id
+    """)
+    authors = {}
+    for book_id, author_id, author_name in cursor.fetchall():
+        authors.setdefault(book_id, []).append((author_id, author_name))
+
+    cursor.execute("""
+        SELECT b.book_id, b.book_title, b.averageRating, b.ratingsCount, b.pageCount,
+               b.retail_price_usd, b.isEbook, p.publisher_name
+        FROM books b
+        LEFT JOIN publishers p ON b.publisher_id = p.publisher_id
+    """)
+    columns = [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            book = dict(zip(columns, row))
+            sketches.observe(book, authors.get(book["book_id"], ()))
+    return sketches
+
+
+# Approximate counterparts of registered analyses: each returns (frame, note on its error bounds)
+def approximate_ebook_vs_physical(sketches):
+    total = sketches.books
+    frame = pd.DataFrame({
+        "book_type": list(BOOK_TYPES),
+        "count": [sketches.type_counts[book_type] for book_type in BOOK_TYPES],
+    })
+    frame["percentage"] = (frame["count"] * 100.0 / total).round(2) if total else 0.0
+    return frame[frame["count"] > 0].reset_index(drop=True), "counts maintained at ingest (exact)"
+
+
+def approximate_type_means(sketches, moments, value_column, digits):
+    rows = [(book_type, round(stats.mean, digits), stats.count)
+            for book_type, stats in moments.items() if stats.count]
+    frame = pd.DataFrame(rows, columns=["book_type", value_column, "book_count"])
+    return frame, "streaming means maintained at ingest (exact)"
+
+
+def approximate_page_counts(sketches):
+    return approximate_type_means(sketches, sketches.pages, "avg_pages", 0)
+
+
+def approximate_prices(sketches):
+    return approximate_type_means(sketches, sketches.prices, "avg_price", 2)
+
+
+def approximate_top_authors(sketches, k=3):
+    rows = [(author_id, name, count, error) for author_id, name, count, error in sketches.top_authors.top(k)]
+    frame = pd.DataFrame(rows, columns=["author_id", "author_name", "book_count", "count_error"])
+    frame["sample_books"] = ""
+    distinct = sketches.authors.count()
+    margin = Z_95 * sketches.authors.relative_error()
+    note = (f"book counts may overstate by up to count_error; "
+            f"≈{distinct:,} distinct authors (±{margin:.1%})")
+    return frame, note
+
+
+def approximate_rating_outliers(sketches):
+    columns = ["book_title", "averageRating", "ratingsCount", "z_score"]
+    sample = sketches.sample_frame()
+    mean, std = sketches.ratings.mean, sketches.ratings.std()
+    if sample["averageRating"].notna().sum() == 0 or not std:
+        return pd.DataFrame(columns=columns), "no rated books sampled"
+
+    sample["z_score"] = ((sample["averageRating"] - mean) / std).round(2)
+    is_outlier = sample["z_score"].abs() > 2
+
+    # Scale each book type's sampled outlier share up to the books of that type
+    estimate, variance = 0.0, 0.0
+    for book_type, reservoir in sketches.samples.items():
+        in_type = sample["book_type"] == book_type
+        size = int(in_type.sum())
+        if size:
+            hits = int((is_outlier & in_type).sum())
+            estimate += hits / size * reservoir.seen
+            variance += (proportion_interval(hits, size) / Z_95 * reservoir.seen) ** 2
+    margin = Z_95 * math.sqrt(variance)
+
+    outliers = sample[is_outlier]
+    outliers = outliers.reindex(outliers["z_score"].abs().sort_values(ascending=False).index)
+    rated = sample["averageRating"].dropna()
+    note = (f"≈{estimate:,.0f} ± {margin:,.0f} outliers among {sketches.ratings.count:,} rated books, "
+            f"from a sample of {len(sample):,}; median rating {rated.median():.2f} "
+            f"(rank ±{quantile_bound(len(rated)):.1%})")
+    return outliers[columns].reset_index(drop=True), note
+
+
+APPROXIMATE_ANALYSES = {
+    "EBOOK_VS_PHYSICAL": approximate_ebook_vs_physical,
+    "AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL": approximate_page_counts,
+    "TOP_AUTHORS": approximate_top_authors,
+    "AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL": approximate_prices,
+    "BOOKS_WITH_RATING_OUTLIERS": approximate_rating_outliers,
+}
+
+
+if __name__ == "__main__":
+    from Storage import get_backend
+    from Result_Cache import read_data_version
+    # Imported by module name so the pickled classes load outside this script
+    from Catalog_Sketches import build_catalog_sketches
+
+    connection = get_backend().connect()
+    try:
+        cursor = connection.cursor()
+        build_catalog_sketches(cursor).save(read_data_version(cursor))
+        cursor.close()
+    finally:
+        connection.close()
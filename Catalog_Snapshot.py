@@ -0,0 +1,131 @@
+import time
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from Facet_Index import FACET_BOOKS, FACET_CATEGORIES, FacetIndex, book_format
+
+# Compact column types of the snapshot; prices and ratings arrive as DECIMAL objects from MySQL
+SNAPSHOT_DTYPES = {
+    "publication_year": "Int16",
+    "ratingsCount": "Int32",
+    "isEbook": "Int8",
+    "averageRating": "float32",
+    "amount_retailPrice": "float64",
+    "retail_price_usd": "float64",
+}
+# Low-cardinality strings are dictionary-encoded
+CATEGORICAL_COLUMNS = ["categories", "currencyCode_retailPrice", "language", "saleability", "country",
+                       "publisher_name", "format"]
+
+SNAPSHOT_QUERIES = {"books": FACET_BOOKS, "book_categories": FACET_CATEGORIES}
+
+
+def compact_frame(books):
+    """Typed, dictionary-encoded copy of the loaded books with a default index"""
+    books = books.reset_index(drop=True)
+    columns = {}
+    for column in books.columns:
+        values = books[column]
+        if column in SNAPSHOT_DTYPES:
+            values = pd.to_numeric(values, errors="coerce").astype(SNAPSHOT_DTYPES[column])
+        columns[column] = values
+    columns["format"] = book_format(columns["isEbook"])
+    for column in CATEGORICAL_COLUMNS:
+        columns[column] = columns[column].astype("category")
+    return pd.DataFrame(columns)
+
+
+def freeze(frame):
+    """Make the arrays behind every column read-only, so no session can change the shared data in place"""
+    for column in frame.columns:
+        array = frame[column].array
+        # Plain, masked (nullable) and categorical arrays keep their values under different attributes
+        for values in (getattr(array, name, None) for name in ("_ndarray", "_data", "_mask", "_codes")):
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+    return frame
+
+
+class CatalogSnapshot:
+    """Read-only, compact copy of the catalog for one data version, shared by every session
+
+    Sessions take views of it instead of copies: view() without row positions shares the
+    column arrays, with positions it copies only the selected rows.
+    """
+
+    def __init__(self, version, books, book_categories):
+        started = time.perf_counter()
+        self.version = version
+        self.frame = freeze(compact_frame(books))
+        self.facets = FacetIndex(self.frame, book_categories)
+        self.size = len(self.frame)
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+        index_arrays = [*self.facets.codes.values(), *self.facets.ranges.values(), self.facets.category_positions]
+        self.memory = {
+            "frame": int(self.frame.memory_usage(deep=True).sum()),
+            "facet_index": int(sum(array.nbytes for array in index_arrays))
+        }
+
+    @property
+    def memory_bytes(self):
+        return sum(self.memory.values())
+
+    def view(self, columns=None, positions=None):
+        frame = self.frame if positions is None else self.frame.iloc[positions]
+        return pd.DataFrame({column: frame[column] for column in (columns or frame.columns)}, copy=False)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "books": self.size,
+            "memory_bytes": self.memory_bytes,
+            **{f"{part}_bytes": size for part, size in self.memory.items()},
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3)
+        }
+
+
+class SnapshotManager:
+    """Holds the catalog snapshot of the current data version for the whole process
+
+    The first caller of a new version loads it while the others wait for the same load;
+    the new snapshot then replaces the old one in a single reference swap. Sessions still
+    holding the old snapshot keep a consistent view until they let go of it.
+    """
+
+    def __init__(self):
+        self.current = None
+        self.lock = threading.Lock()
+        # Replaced snapshots, reported for as long as a session still references them
+        self.retired = weakref.WeakValueDictionary()
+
+    def get(self, version, load):
+        """Snapshot of a data version; load() returns the books and book_categories frames"""
+        snapshot = self.current
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self.lock:
+            snapshot = self.current
+            if snapshot is None or snapshot.version != version:
+                fresh = CatalogSnapshot(version, *load())
+                print(f"Catalog snapshot {version}: {fresh.size:,} books, "
+                      f"{fresh.memory_bytes / 2 ** 20:.1f} MB, loaded in {fresh.load_seconds:.2f}s")
+                if snapshot is not None:
+                    self.retired[snapshot.version] = snapshot
+                self.current = snapshot = fresh
+        return snapshot
+
+    def memory_report(self):
+        """Memory held per data version, current snapshot first"""
+        current = self.current
+        snapshots = [current] if current is not None else []
+        snapshots += [snapshot for snapshot in list(self.retired.values()) if snapshot is not current]
+        return [dict(snapshot.describe(), current=snapshot is current) for snapshot in snapshots]
+
+
+# One manager per process, so every session shares the same snapshot
+CATALOG_SNAPSHOTS = SnapshotManager()
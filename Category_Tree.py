@@ -0,0 +1,146 @@
+# Google Books categories are paths such as "Computers / Programming / Languages / Python"
+PATH_SEPARATOR = "/"
+MAX_DEPTH = 6
+
+
+def create_category_tree_tables(cursor):
+    """Create the category hierarchy: one node per path prefix and its ancestor/descendant closure"""
+    cursor.execute("""
+        CREATE TABLE category_nodes (
+            node_id SERIAL PRIMARY KEY,
+            node_path VARCHAR(255) NOT NULL UNIQUE,
+            node_name VARCHAR(255) NOT NULL,
+            parent_id INTEGER REFERENCES category_nodes(node_id),
+            depth INTEGER NOT NULL
+        )
+    """)
+
+    # One row per (ancestor, descendant) pair, including each node with itself at distance 0
+    cursor.execute("""
+        CREATE TABLE category_closure (
+            ancestor_id INTEGER NOT NULL REFERENCES category_nodes(node_id),
+            descendant_id INTEGER NOT NULL REFERENCES category_nodes(node_id),
+            distance INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        )
+    """)
+
+    # Aggregates over every book in a node's subtree, refreshed after each load
+    cursor.execute("""
+        CREATE TABLE category_node_stats (
+            node_id INTEGER PRIMARY KEY REFERENCES category_nodes(node_id),
+            book_count INTEGER NOT NULL,
+            avg_pages DECIMAL(8,1),
+            avg_rating DECIMAL(3,2),
+            avg_price DECIMAL(10,2)
+        )
+    """)
+
+
+def split_path(category_name):
+    """Path parts of a category name; a name without separators is a single top-level node"""
+    parts = [part.strip() for part in category_name.split(PATH_SEPARATOR) if part.strip()]
+    return parts[:MAX_DEPTH] or [category_name.strip()]
+
+
+def insert_category_node(cursor, category_name):
+    """Add the nodes of a category path and their closure rows; returns the node of the full path"""
+    parts = split_path(category_name)
+    ancestors = []
+    node_id = None
+    for depth, name in enumerate(parts):
+        path = f" {PATH_SEPARATOR} ".join(parts[:depth + 1])
+        cursor.execute(
+            "INSERT IGNORE INTO category_nodes (node_path, node_name, parent_id, depth) VALUES (%s, %s, %s, %s)",
+            (path, name, node_id, depth))
+        inserted = cursor.rowcount == 1
+        cursor.execute("SELECT node_id FROM category_nodes WHERE node_path = %s", (path,))
+        node_id = cursor.fetchone()[0]
+
+        # A new node sits below every node of its path, so its closure rows are known right away
+        if inserted:
+            cursor.executemany(
+                "INSERT INTO category_closure (ancestor_id, descendant_id, distance) VALUES (%s, %s, %s)",
+                [(node_id, node_id, 0)] + [(ancestor, node_id, depth - level)
+                                           for level, ancestor in enumerate(ancestors)])
+        ancestors.append(node_id)
+    return node_id
+
+
+def refresh_category_stats(cursor):
+    """Recompute the per-node aggregates; a book counts once per node however many of its categories fall below it"""
+    cursor.execute("DELETE FROM category_node_stats")
+    cursor.execute("""
+        INSERT INTO category_node_stats (node_id, book_count, avg_pages, avg_rating, avg_price)
+        SELECT
+            t.node_id,
+            COUNT(*),
+            ROUND(AVG(b.pageCount), 1),
+            ROUND(AVG(b.averageRating), 2),
+            ROUND(AVG(b.retail_price_usd), 2)
+        FROM (
+            SELECT DISTINCT cl.ancestor_id as node_id, bc.book_id
+            FROM book_categories bc
+            JOIN categories c ON c.category_id = bc.category_id
+            JOIN category_closure cl ON cl.descendant_id = c.node_id
+        ) t
+        JOIN books b ON b.book_id = t.book_id
+        GROUP BY t.node_id
+    """)
+    cursor.execute("SELECT COUNT(*) FROM category_node_stats")
+    print(f"Category hierarchy: aggregates refreshed for {cursor.fetchone()[0]} nodes")
+
+
+# Children of a node (or the top-level nodes) with their subtree aggregates
+CATEGORY_CHILDREN = """
+    SELECT
+        n.node_id,
+        n.node_name,
+        n.node_path,
+        s.book_count,
+        s.avg_pages,
+        s.avg_rating,
+        s.avg_price,
+        (SELECT COUNT(*) FROM category_nodes k WHERE k.parent_id = n.node_id) as subcategories
+    FROM category_nodes n
+    JOIN category_node_stats s ON s.node_id = n.node_id
+    WHERE {parent}
+    ORDER BY s.book_count DESC, n.node_name
+"""
+CATEGORY_ROOTS = CATEGORY_CHILDREN.format(parent="n.parent_id IS NULL")
+CATEGORY_SUBCATEGORIES = CATEGORY_CHILDREN.format(parent="n.parent_id = %s")
+
+# Every category rolled up to one level of the hierarchy
+CATEGORY_LEVEL_STATS = """
+    SELECT
+        n.node_path as category_name,
+        s.avg_pages,
+        s.book_count,
+        s.avg_rating,
+        s.avg_price
+    FROM category_nodes n
+    JOIN category_node_stats s ON s.node_id = n.node_id
+    WHERE n.depth = %s
+    ORDER BY s.avg_pages DESC
+"""
+
+# Books anywhere in a node's subtree, one page at a time
+CATEGORY_NODE_BOOKS = """
+    SELECT
+        b.book_id,
+        b.book_title,
+        b.publication_year,
+        b.averageRating,
+        b.ratingsCount
+    FROM books b
+    WHERE b.book_id IN (
+        SELECT bc.book_id
+        FROM category_closure cl
+        JOIN categories c ON c.node_id = cl.descendant_id
+        JOIN book_categories bc ON bc.category_id = c.category_id
+        WHERE cl.ancestor_id = %s
+    )
+    ORDER BY COALESCE(b.ratingsCount, 0) DESC, b.book_title
+    LIMIT %s OFFSET %s
+"""
+
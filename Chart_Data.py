@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Above these sizes charts are drawn from reduced data, so drawing time stays bounded
+MAX_SCATTER_POINTS = 2000
+MAX_BARS = 20
+PAGE_BINS = 40
+
+
+def top_n_other(data, label_column, value_column, n=MAX_BARS, other_label="Other"):
+    """Keep the n - 1 largest rows and fold the rest into one "Other" row holding their mean"""
+    if len(data) <= n:
+        return data[[label_column, value_column]].reset_index(drop=True)
+    ordered = data.sort_values(value_column, ascending=False, kind="stable")
+    top, rest = ordered.iloc[:n - 1], ordered.iloc[n - 1:]
+    other = pd.DataFrame({
+        label_column: [f"{other_label} ({len(rest):,})"],
+        value_column: [rest[value_column].mean()]
+    })
+    return pd.concat([top[[label_column, value_column]], other], ignore_index=True)
+
+
+def year_page_bins(years, pages, page_bins=PAGE_BINS):
+    """2-D histogram of books per publication year and page-count bin
+
+    Returns (year_edges, page_edges, counts) with counts shaped (years, page bins).
+    """
+    years = np.asarray(years, dtype=float)
+    pages = np.asarray(pages, dtype=float)
+    valid = ~(np.isnan(years) | np.isnan(pages))
+    years, pages = years[valid], pages[valid]
+    if len(years) == 0:
+        return np.array([0.0, 1.0]), np.array([0.0, 1.0]), np.zeros((1, 1))
+
+    # One column per year, centred on the year
+    year_edges = np.arange(years.min(), years.max() + 2) - 0.5
+    page_edges = np.linspace(pages.min(), pages.max() + 1, page_bins + 1)
+    counts, _, _ = np.histogram2d(years, pages, bins=[year_edges, page_edges])
+    return year_edges, page_edges, counts
+
+
+def lttb(x, y, threshold=MAX_SCATTER_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling of a series sorted by x
+
+    Returns the indices of the kept points: the first and last point plus, for every
+    bucket in between, the point forming the largest triangle with its neighbours.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 inner points
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket is the third vertex (the last point for the final bucket)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample_series(data, x_column, y_column, threshold=MAX_SCATTER_POINTS):
+    """Rows of data sorted by x and reduced with LTTB to at most threshold points"""
+    ordered = data.dropna(subset=[x_column, y_column]).sort_values(x_column, kind="stable")
+    if len(ordered) <= threshold:
+        return ordered
+    return ordered.iloc[lttb(ordered[x_column], ordered[y_column], threshold)]
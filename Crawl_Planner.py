@@ -0,0 +1,132 @@
+import threading
+import requests
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from Book_Data import scrap
+
+# The volumes API stops paging a query after a few hundred results; a partition that
+# returns this many is assumed to have more and is split further
+RESULT_CEILING = 400
+CRAWL_WORKERS = 8
+# Upper bound on the partitions fetched per search key (each is up to RESULT_CEILING / 40 requests)
+MAX_PARTITIONS = 25
+# Values taken from a saturated partition's own results when splitting it
+MAX_SPLIT_VALUES = 8
+
+# Order in which saturated partitions are split; a partition is never split twice on the same dimension.
+# Request parameters narrow the result set as filters, the other dimensions become query terms.
+# orderBy is not a split: its single child re-queries the same result set newest-first, which only
+# reaches the books past the ceiling of the relevance order. It comes last for that reason.
+FILTER_DIMENSIONS = {"printType", "langRestrict", "orderBy"}
+SPLIT_DIMENSIONS = ["printType", "langRestrict", "subject", "inpublisher", "orderBy"]
+
+
+def observed_values(items, values_of, limit=MAX_SPLIT_VALUES):
+    """Most frequent values of a volume attribute among fetched items"""
+    counts = Counter(value for item in items for value in values_of(item.get("volumeInfo", {})) if value)
+    return [value for value, _ in counts.most_common(limit)]
+
+
+# Dimension -> values to split on, given the items a saturated partition returned
+SPLIT_VALUES = {
+    "printType": lambda items: ["books", "magazines"],
+    "langRestrict": lambda items: observed_values(items, lambda volume: [volume.get("language")]),
+    # Top-level subject of each category path, e.g. "Computers" for "Computers / Programming"
+    "subject": lambda items: observed_values(
+        items, lambda volume: [category.split("/")[0].strip() for category in volume.get("categories", [])]),
+    "inpublisher": lambda items: observed_values(items, lambda volume: [volume.get("publisher")]),
+    # The API has no date filter; the newest-first re-query reaches the recent books a relevance-ordered window cut off
+    "orderBy": lambda items: ["newest"],
+}
+
+
+class Partition:
+    """One sub-query of a search key: its query terms, request filters and the dimensions it was split on"""
+
+    def __init__(self, terms, filters=None, split_on=()):
+        self.terms = tuple(terms)
+        self.filters = dict(filters or {})
+        self.split_on = tuple(split_on)
+
+    @property
+    def query(self):
+        return " ".join(self.terms)
+
+    def __repr__(self):
+        filters = " ".join(f"{name}={value}" for name, value in self.filters.items())
+        return f"[{self.query}{' | ' + filters if filters else ''}]"
+
+    def next_dimension(self):
+        return next((dimension for dimension in SPLIT_DIMENSIONS if dimension not in self.split_on), None)
+
+    def children(self, items):
+        """Sub-partitions on the next dimension, with values drawn from this partition's results"""
+        dimension = self.next_dimension()
+        if dimension is None:
+            return []
+        split_on = self.split_on + (dimension,)
+        children = []
+        for value in SPLIT_VALUES[dimension](items):
+            if dimension in FILTER_DIMENSIONS:
+                children.append(Partition(self.terms, dict(self.filters, **{dimension: value}), split_on))
+            else:
+                children.append(Partition(self.terms + (f'{dimension}:"{value}"',), self.filters, split_on))
+        # A dimension without values to split on is skipped for the next one
+        return children or Partition(self.terms, self.filters, split_on).children(items)
+
+
+def crawl(search_key, api_key, workers=CRAWL_WORKERS, ceiling=RESULT_CEILING, max_partitions=MAX_PARTITIONS):
+    """Harvest a search key past the per-query ceiling
+
+    Partitions are fetched concurrently; one that returns a full ceiling of results is split
+    on the next dimension. Books are deduplicated on their volume id, first sighting kept.
+    Partitions past max_partitions are not fetched and are reported as dropped.
+    Returns the list of unique book items.
+    """
+    local = threading.local()
+
+    def fetch(partition):
+        # requests sessions are not shared between threads
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return scrap(partition.query, api_key, ceiling, local.session, partition.filters)
+
+    books = {}
+    fetched = saturated = failed = dropped = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(fetch, Partition([search_key])): Partition([search_key])}
+        planned = 1
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                partition = pending.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Partition {partition} failed: {e}")
+                    continue
+
+                fetched += 1
+                new = 0
+                for item in items:
+                    if item.get("id") and item["id"] not in books:
+                        books[item["id"]] = item
+                        new += 1
+                print(f"Partition {partition}: {len(items)} results, {new} new")
+
+                if len(items) >= ceiling:
+                    saturated += 1
+                    children = partition.children(items)
+                    budget = max(max_partitions - planned, 0)
+                    for child in children[:budget]:
+                        pending[executor.submit(fetch, child)] = child
+                        planned += 1
+                    if len(children) > budget:
+                        dropped += len(children) - budget
+                        print(f"Partition {partition}: {len(children) - budget} of {len(children)} sub-partitions "
+                              f"dropped, the budget of {max_partitions} partitions is spent")
+
+    print(f"Crawled '{search_key}': {len(books)} unique books from {fetched} partitions "
+          f"({saturated} split at the ceiling, {failed} failed, {dropped} dropped over the partition budget)")
+    return list(books.values())
@@ -0,0 +1,152 @@
+import os
+import time
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+from Result_Loader import iter_frames, iter_rows, fetch_frame, chunk_to_frame, column_kind
+
+EXPORT_CHUNK_SIZE = 20000
+SAMPLE_ROWS = 200
+EXPORT_FORMATS = ["CSV", "Parquet"]
+
+# Rough Parquet size relative to CSV for the same rows (compressed, columnar)
+PARQUET_SIZE_RATIO = 0.35
+
+# Export files live in one directory per process, removed at exit; an export is kept for an hour
+# so its download button survives reruns, then removed by the next export of any session
+EXPORT_TTL_SECONDS = 3600
+EXPORT_DIRECTORY = tempfile.TemporaryDirectory(prefix="bookscape_exports_")
+# Rows read ahead to find the type of columns the driver does not declare (SQLite) and that start with nulls;
+# columns still only null after them are written as strings
+PARQUET_TYPE_SCAN_ROWS = 100000
+# Parquet type of each column kind Result_Loader stores; nullable, unlike the NumPy arrays of a chunk
+PARQUET_TYPES = {"float": pa.float64(), "int": pa.int64(), "bool": pa.bool_(), "str": pa.string()}
+
+
+def as_subquery(query):
+    return query.strip().rstrip(";")
+
+
+def estimate_export(conn, query, params=None):
+    """Estimate the row count and CSV/Parquet size of a query result without fetching it"""
+    source = as_subquery(query)
+    total_rows = int(fetch_frame(conn, f"SELECT COUNT(*) AS total_rows FROM ({source}) export_source", params)
+                     .iloc[0]["total_rows"])
+    sample = fetch_frame(conn, f"SELECT * FROM ({source}) export_source LIMIT {SAMPLE_ROWS}", params)
+
+    bytes_per_row = len(sample.to_csv(index=False).encode("utf-8")) / len(sample) if len(sample) else 0
+    csv_bytes = int(bytes_per_row * total_rows)
+    return {
+        "rows": total_rows,
+        "CSV": csv_bytes,
+        "Parquet": int(csv_bytes * PARQUET_SIZE_RATIO)
+    }
+
+
+def format_size(num_bytes):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:,.0f} {unit}" if unit == "B" else f"{num_bytes:,.1f} {unit}"
+        num_bytes /= 1024
+
+
+def export_csv(conn, query, path, params=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream a query result into a CSV file chunk by chunk; returns the number of rows written"""
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        for chunk in iter_frames(conn, query, params, chunk_size):
+            chunk.to_csv(output, header=rows == 0, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def parquet_type(type_code, values):
+    """Parquet type of a column from its declared type or its first non-null value; None while unknown"""
+    present = [value for value in values if value is not None]
+    if type_code is None and not present:
+        return None
+    kind = column_kind(type_code, present)
+    if kind != "str" or not present or isinstance(present[0], (str, bytes, bytearray)):
+        return PARQUET_TYPES[kind]
+    # Dates and times keep their own type
+    return pa.array(present[:1]).type
+
+
+def parquet_schema(description, types):
+    """Arrow schema of an export; columns that were only ever null are written as strings"""
+    return pa.schema([(column[0], known or pa.string()) for column, known in zip(description, types)])
+
+
+def write_row_groups(writer, chunks, description):
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk_to_frame(chunk, description), preserve_index=False)
+        writer.write_table(table.cast(writer.schema))
+
+
+def export_parquet(conn, query, path, params=None, chunk_size=EXPORT_CHUNK_SIZE,
+                   type_scan_rows=PARQUET_TYPE_SCAN_ROWS):
+    """Stream a query result into a Parquet file, one row group per chunk
+
+    The schema does not come from the first chunk alone: an integer column whose nulls only show
+    up later, or a column that starts out null, is cast to one type in every chunk.
+    """
+    rows = 0
+    writer = types = None
+    pending = []
+    try:
+        for chunk, description in iter_rows(conn, query, params, chunk_size):
+            rows += len(chunk)
+            pending.append(chunk)
+            if writer is None:
+                types = [known or parquet_type(column[1], [row[n] for row in chunk])
+                         for n, (column, known) in enumerate(zip(description, types or [None] * len(description)))]
+                if None in types and rows < type_scan_rows:
+                    continue
+                writer = pq.ParquetWriter(path, parquet_schema(description, types), compression="snappy")
+            write_row_groups(writer, pending, description)
+            pending = []
+
+        # The result ended while some column was still only null
+        if pending:
+            writer = pq.ParquetWriter(path, parquet_schema(description, types), compression="snappy")
+            write_row_groups(writer, pending, description)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+EXPORTERS = {
+    "CSV": (export_csv, ".csv"),
+    "Parquet": (export_parquet, ".parquet"),
+}
+
+
+def remove_stale_exports(directory=None, max_age=EXPORT_TTL_SECONDS):
+    """Delete export files older than max_age, e.g. those of sessions that have ended"""
+    directory = directory or EXPORT_DIRECTORY.name
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def export_to_file(conn, query, export_format, params=None, directory=None):
+    """Export a query result to a new file in the export directory; returns (path, rows)
+
+    The caller removes the file once it is replaced; a failed export removes it at once.
+    """
+    directory = directory or EXPORT_DIRECTORY.name
+    remove_stale_exports(directory)
+    exporter, suffix = EXPORTERS[export_format]
+    handle, path = tempfile.mkstemp(prefix="bookscape_export_", suffix=suffix, dir=directory)
+    os.close(handle)
+    try:
+        rows = exporter(conn, query, path, params)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, rows
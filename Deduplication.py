@@ -0,0 +1,214 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+# Tokens that do not distinguish one publisher from another
+PUBLISHER_NOISE = {
+    "the", "and", "inc", "incorporated", "ltd", "limited", "llc", "llp", "plc", "co", "company",
+    "corp", "corporation", "pvt", "private", "gmbh", "ag", "sa", "media", "publishing",
+    "publishers", "publisher", "publications", "press", "books", "group", "international"
+}
+AUTHOR_NOISE = {"dr", "prof", "mr", "mrs", "ms", "phd"}
+# Generational suffixes name a different person: John Smith Jr. is not John Smith Sr.
+GENERATION_SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+
+# How each entity is stored and referenced
+ENTITIES = {
+    "publisher": {
+        "table": "publishers", "id": "publisher_id", "name": "publisher_name",
+        "mapping": "books", "merges": "publisher_merges", "noise": PUBLISHER_NOISE, "threshold": 0.75
+    },
+    "author": {
+        "table": "authors", "id": "author_id", "name": "author_name",
+        "mapping": "book_authors", "merges": "author_merges", "noise": AUTHOR_NOISE, "threshold": 0.85,
+        "distinct": GENERATION_SUFFIXES
+    }
+}
+
+# Blocks larger than this are compared within a sliding window of sorted keys
+MAX_BLOCK_SIZE = 200
+WINDOW_SIZE = 10
+
+APOSTROPHES = re.compile(r"['`’]")
+ASCII_WORDS = re.compile(r"[a-z0-9]+")
+
+
+def word_char(char):
+    # Letters, digits and the combining marks some scripts write vowels with (Devanagari matras)
+    return char.isalnum() or unicodedata.category(char).startswith("M")
+
+
+def normalize_name(name, noise=()):
+    """Casefolded word tokens of a name without accents, punctuation or noise words
+
+    Tokens are Unicode words, so names in any script (清华大学出版社, Иванов) keep their letters;
+    a name without any word characters falls back to its whole casefolded text.
+    """
+    if name.isascii():
+        # Most names: nothing to decompose, and the word characters are letters and digits
+        text = APOSTROPHES.sub("", name.lower())  # O'Reilly -> oreilly
+        tokens = ASCII_WORDS.findall(text)
+    else:
+        # Accents are dropped from Latin letters only (Müller -> muller); other scripts keep their marks
+        kept, base = [], ""
+        for char in unicodedata.normalize("NFKD", name):
+            if not unicodedata.combining(char):
+                base = char
+            elif base.isascii():
+                continue
+            kept.append(char)
+        text = APOSTROPHES.sub("", "".join(kept).casefold())
+        tokens = "".join(char if word_char(char) else " " for char in text).split()
+    meaningful = [token for token in tokens if token not in noise]
+    fallback = [text.strip()] if text.strip() else []
+    return meaningful or tokens or fallback
+
+
+def trigrams(key):
+    """Character trigrams of a compact key, padded so short keys still compare"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def blocking_keys(tokens, key):
+    """Blocks a normalized name falls into: key prefix and its longest token; none for an empty name"""
+    if not key:
+        return set()
+    return {f"p:{key[:4]}", f"t:{max(tokens, key=len)}"}
+
+
+def candidate_pairs(keys, token_lists, sizes, threshold):
+    """Pairs of distinct normalized keys that share a block; a pair sharing two blocks comes up twice
+
+    Within a block only keys whose trigram counts are close enough to reach threshold are paired:
+    Jaccard similarity cannot exceed the ratio of the two set sizes.
+    """
+    blocks = defaultdict(list)
+    for i, (key, tokens) in enumerate(zip(keys, token_lists)):
+        for block in blocking_keys(tokens, key):
+            blocks[block].append(i)
+
+    for members in blocks.values():
+        if len(members) <= MAX_BLOCK_SIZE:
+            members = sorted(members, key=sizes.__getitem__)
+            for n, a in enumerate(members):
+                limit = sizes[a] / threshold
+                for b in members[n + 1:]:
+                    if sizes[b] > limit:
+                        break
+                    yield a, b
+        else:
+            # Sorted-neighbourhood within oversized blocks keeps the work near-linear
+            members = sorted(members, key=lambda i: keys[i])
+            for n, a in enumerate(members):
+                for b in members[n + 1:n + 1 + WINDOW_SIZE]:
+                    yield a, b
+
+
+def cluster_names(names, noise=(), threshold=0.8, distinct=()):
+    """Group name variants; returns lists of indices into names with more than one member
+
+    Names whose tokens from distinct differ are never merged, however similar they are.
+    """
+    token_lists = [normalize_name(name, noise) for name in names]
+    compact = ["".join(tokens) for tokens in token_lists]
+
+    # Names with the same compact key are the same entity; empty names match nothing
+    key_members = defaultdict(list)
+    for i, key in enumerate(compact):
+        if key:
+            key_members[key].append(i)
+    keys = list(key_members)
+    key_tokens = [token_lists[key_members[key][0]] for key in keys]
+
+    # Fuzzy-match the distinct keys within their blocks
+    grams = [trigrams(key) for key in keys]
+    sizes = [len(key_grams) for key_grams in grams]
+    markers = [frozenset(tokens).intersection(distinct) for tokens in key_tokens]
+    groups = UnionFind(len(keys))
+    for a, b in candidate_pairs(keys, key_tokens, sizes, threshold):
+        if markers[a] != markers[b]:
+            continue
+        shared = len(grams[a] & grams[b])
+        if shared / (sizes[a] + sizes[b] - shared) >= threshold:
+            groups.union(a, b)
+
+    clusters = defaultdict(list)
+    for k, key in enumerate(keys):
+        clusters[groups.find(k)].extend(key_members[key])
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def deduplicate(cursor, kind):
+    """Merge name variants of publishers or authors onto one canonical id
+
+    Returns the ids of the books whose publisher or authors changed.
+    """
+    entity = ENTITIES[kind]
+    table, id_column, name_column = entity["table"], entity["id"], entity["name"]
+    mapping, merges = entity["mapping"], entity["merges"]
+
+    # Names with their number of books; the most used spelling becomes canonical
+    cursor.execute(f"""
+        SELECT e.{id_column}, e.{name_column}, COUNT(m.book_id)
+        FROM {table} e
+        LEFT JOIN {mapping} m ON e.{id_column} = m.{id_column}
+        GROUP BY e.{id_column}, e.{name_column}
+    """)
+    rows = cursor.fetchall()
+    clusters = cluster_names([row[1] for row in rows], entity["noise"], entity["threshold"], entity.get("distinct", ()))
+
+    merge_rows = []
+    for members in clusters:
+        canonical = max(members, key=lambda i: (rows[i][2], -len(rows[i][1])))
+        merge_rows.extend((rows[i][0], rows[i][1], rows[canonical][0]) for i in members if i != canonical)
+
+    cursor.execute(f"DELETE FROM {merges}")
+    if not merge_rows:
+        print(f"No duplicate {table} found")
+        return []
+    cursor.executemany(
+        f"INSERT INTO {merges} (variant_id, variant_name, canonical_id) VALUES (%s, %s, %s)", merge_rows)
+
+    cursor.execute(f"""
+        SELECT DISTINCT book_id FROM {mapping}
+        WHERE {id_column} IN (SELECT variant_id FROM {merges})
+    """)
+    affected_books = [row[0] for row in cursor.fetchall()]
+
+    # Write canonical ids back in bulk
+    if mapping == "books":
+        cursor.execute(f"""
+            UPDATE books
+            SET {id_column} = (SELECT canonical_id FROM {merges} WHERE variant_id = books.{id_column})
+            WHERE {id_column} IN (SELECT variant_id FROM {merges})
+        """)
+    else:
+        # A merged author keeps the variant's place in the book's author list
+        cursor.execute(f"""
+            INSERT IGNORE INTO {mapping} (book_id, {id_column}, author_position)
+            SELECT m.book_id, mg.canonical_id, m.author_position
+            FROM {mapping} m
+            JOIN {merges} mg ON m.{id_column} = mg.variant_id
+        """)
+        cursor.execute(f"DELETE FROM {mapping} WHERE {id_column} IN (SELECT variant_id FROM {merges})")
+    cursor.execute(f"DELETE FROM {table} WHERE {id_column} IN (SELECT variant_id FROM {merges})")
+
+    print(f"Merged {len(merge_rows)} {table} variants into {len(clusters)} canonical names")
+    return affected_books
@@ -0,0 +1,163 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Snapshot of the filterable book attributes, plus the columns shown in the books table
+FACET_BOOKS = """
+    SELECT
+        b.book_id,
+        b.book_title,
+        d.book_authors,
+        d.categories,
+        b.publication_year,
+        b.averageRating,
+        b.ratingsCount,
+        b.isEbook,
+        b.amount_retailPrice,
+        b.currencyCode_retailPrice,
+        b.retail_price_usd,
+        b.language,
+        b.saleability,
+        b.country,
+        p.publisher_name
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    LEFT JOIN publishers p ON b.publisher_id = p.publisher_id
+    ORDER BY b.book_id
+"""
+
+FACET_CATEGORIES = """
+    SELECT bc.book_id, c.category_name
+    FROM book_categories bc
+    JOIN categories c ON bc.category_id = c.category_id
+"""
+
+# Facet column -> label; one value per book
+VALUE_FACETS = {
+    "language": "Language",
+    "format": "Format",
+    "saleability": "Saleability",
+    "country": "Country",
+    "publisher_name": "Publisher"
+}
+# A book can carry several categories, so this facet is built from book_categories
+CATEGORY_FACET = "category"
+FACET_LABELS = dict(VALUE_FACETS, **{CATEGORY_FACET: "Category"})
+RANGE_FACETS = {
+    "publication_year": "Publication year",
+    "averageRating": "Rating"
+}
+
+
+def book_format(is_ebook):
+    """Format facet value of each book"""
+    return pd.Series(np.where(is_ebook.fillna(0).astype(bool), "eBook", "Physical Book"), index=is_ebook.index)
+
+
+class FacetIndex:
+    """Immutable in-memory index over a snapshot of books and their categories
+
+    Every facet value is dictionary-encoded, so the bitmap of a selection is one vectorized
+    lookup over the code array. Values of a facet are OR-ed, facets are AND-ed, and the
+    counts of a facet are taken under all the other facets' filters.
+    """
+
+    def __init__(self, books, book_categories):
+        # Rows are addressed by position, so books must have a default index; the frame is not copied
+        self.frame = books if "format" in books else books.assign(format=book_format(books["isEbook"]))
+        self.size = len(self.frame)
+
+        # facet -> (sorted distinct values, code per book with -1 for missing)
+        self.values, self.codes = {}, {}
+        for facet in VALUE_FACETS:
+            codes, values = pd.factorize(self.frame[facet], sort=True)
+            self.values[facet], self.codes[facet] = np.asarray(values, dtype=object), codes.astype(np.int32)
+
+        # Category pairs as (book position, category code) arrays
+        positions = pd.Index(self.frame["book_id"]).get_indexer(book_categories["book_id"])
+        pairs = book_categories[positions >= 0]
+        codes, values = pd.factorize(pairs["category_name"], sort=True)
+        self.values[CATEGORY_FACET] = np.asarray(values, dtype=object)
+        self.codes[CATEGORY_FACET] = codes.astype(np.int32)
+        self.category_positions = positions[positions >= 0]
+
+        self.ranges = {facet: pd.to_numeric(self.frame[facet], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                       for facet in RANGE_FACETS}
+        # Unfiltered counts give every facet a stable value order, most frequent first
+        self.totals = self.query()["counts"]
+
+    def range_bounds(self, facet):
+        """(min, max) of a range facet, ignoring missing values"""
+        values = self.ranges[facet]
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return 0.0, 0.0
+        return float(values.min()), float(values.max())
+
+    def selection_lookup(self, facet, selected):
+        """Boolean lookup table over the codes of a facet: True for the selected values"""
+        values = self.values[facet]
+        # The extra trailing slot is where missing values (code -1) land
+        lookup = np.zeros(len(values) + 1, dtype=bool)
+        lookup[:-1] = np.isin(values, list(selected))
+        return lookup
+
+    def value_mask(self, facet, selected):
+        """Books having any of the selected values of a facet"""
+        lookup = self.selection_lookup(facet, selected)
+        if facet == CATEGORY_FACET:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.category_positions[lookup[self.codes[facet]]]] = True
+            return mask
+        return lookup[self.codes[facet]]
+
+    def range_mask(self, facet, low, high):
+        """Books whose value lies in [low, high]; books without a value are excluded"""
+        values = self.ranges[facet]
+        with np.errstate(invalid="ignore"):
+            return (values >= low) & (values <= high)
+
+    def facet_counts(self, facet, mask):
+        """Books per value of a facet among the books in mask, largest first"""
+        if facet == CATEGORY_FACET:
+            codes = self.codes[facet][mask[self.category_positions]]
+        else:
+            codes = self.codes[facet][mask]
+            codes = codes[codes >= 0]
+        counts = np.bincount(codes, minlength=len(self.values[facet]))
+        return pd.Series(counts, index=self.values[facet]).sort_values(ascending=False, kind="stable")
+
+    def query(self, selections=None, ranges=None):
+        """Evaluate a filter combination
+
+        selections maps a facet to the values to keep, ranges maps a range facet to (low, high).
+        Returns a dict with the matching rows, the per-facet counts and the evaluation time.
+        """
+        started = time.perf_counter()
+        masks = {}
+        for facet, selected in (selections or {}).items():
+            if selected:
+                masks[facet] = self.value_mask(facet, selected)
+        for facet, (low, high) in (ranges or {}).items():
+            masks[facet] = self.range_mask(facet, low, high)
+
+        everything = np.ones(self.size, dtype=bool)
+        matched = everything.copy()
+        for mask in masks.values():
+            matched &= mask
+
+        counts = {}
+        for facet in FACET_LABELS:
+            # Counts of a facet ignore its own filter, so sibling values stay selectable
+            others = everything.copy()
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            counts[facet] = self.facet_counts(facet, others)
+
+        return {
+            "rows": np.flatnonzero(matched),
+            "matched": int(matched.sum()),
+            "counts": counts,
+            "milliseconds": (time.perf_counter() - started) * 1000
+        }
@@ -0,0 +1,87 @@
+import sys
+from Streamlit_Application import ANALYSIS_QUERIES, init_backend
+
+# (analysis, table) pairs of the whole-catalog aggregations and the tables they must read in full.
+# Tables are real table names, not plan aliases; any other full table or index scan fails the check.
+FULL_SCAN_TABLES = {
+    # The unfiltered books table of the dashboard
+    ("BOOKS_TABLE", "books"),
+    # Counts and averages over every book, read from a covering index
+    ("COUNT_BOOKS", "books"),
+    ("EBOOK_VS_PHYSICAL", "books"),
+    ("AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL", "books"),
+    ("AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL", "books"),
+    # One row per publisher, author or category of the whole catalog
+    ("PUBLISHER_BOOK_COUNT", "publishers"),
+    ("PUBLISHER_RATINGS", "publishers"),
+    ("PUBLISHER_WITH_MORE_THAN_10_BOOKS", "publishers"),
+    ("PUBLISHER_WITH_HIGHEST_AVERAGE_RATING", "publishers"),
+    ("TOP_AUTHORS", "book_authors"),
+    ("AVERAGE_PAGE_COUNT_PER_CATEGORY", "book_categories"),
+    ("BOOKS_WITH_MORE_THAN_3_AUTHORS", "book_authors"),
+    ("SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR", "book_authors"),
+    ("AUTHORS_PUBLISHED_FOR_3_CONSECUTIVE_YEARS", "book_authors"),
+    ("AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS", "book_authors"),
+}
+
+
+def full_scan_steps(plan):
+    """Return the plan steps that read a whole base table or a whole index
+
+    A covering index scan still reads every entry of the index, so it counts as a full scan;
+    the driving table of a join is no exception. Derived tables (CTEs/subqueries) are skipped.
+    """
+    return [step for step in plan if step.get("scan") and step.get("table") and not step["table"].startswith("<")]
+
+
+def check_query_indexes(backend, cursor, queries=None, full_scan_tables=None):
+    """Check that every registered analysis query reaches its rows through an index seek
+
+    Full scans pass only for the (query, table) pairs in full_scan_tables (FULL_SCAN_TABLES).
+    """
+    queries = queries or ANALYSIS_QUERIES
+    full_scan_tables = FULL_SCAN_TABLES if full_scan_tables is None else full_scan_tables
+    failures = {}
+
+    for name, query in queries.items():
+        plan = backend.explain(cursor, query)
+        scans = full_scan_steps(plan)
+        unexpected = [step for step in scans if (name, step["table"]) not in full_scan_tables]
+        uses_index = any(step.get("key") for step in plan)
+        if unexpected:
+            failures[name] = unexpected
+            tables = ", ".join(f"{step['table']} ({'index ' + str(step['key']) if step.get('key') else 'table'})"
+                               for step in unexpected)
+            print(f"FAIL {name}: full scan of {tables}")
+        elif not uses_index and not scans:
+            failures[name] = plan
+            print(f"FAIL {name}: no index used")
+        elif scans:
+            print(f"OK   {name}: full scan of {', '.join(sorted({step['table'] for step in scans}))} (expected)")
+        else:
+            keys = ", ".join(str(step.get("key")) for step in plan if step.get("key"))
+            print(f"OK   {name}: {keys}")
+
+    return failures
+
+
+def main():
+    backend = init_backend()
+    connection = backend.connect()
+    try:
+        cursor = connection.cursor()
+        failures = check_query_indexes(backend, cursor)
+        cursor.close()
+    finally:
+        connection.close()
+
+    assert not failures, f"{len(failures)} queries scan without an index seek: {', '.join(failures)}"
+    print(f"All {len(ANALYSIS_QUERIES)} analysis queries use an index or an expected full scan")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import threading
+from collections import Counter
+
+# Progress of the running (or last) ingest, read by the dashboard's Ingest Monitor
+INGEST_PROGRESS_PATH = os.environ.get("BOOKSCAPE_INGEST_PROGRESS", "ingest_progress.json")
+
+# The file is rewritten at most this often while books are processed, and at every stage change
+FLUSH_INTERVAL_SECONDS = 1.0
+TOP_PUBLISHERS = 10
+FETCHED_STATUSES = ("processing", "done")
+
+
+class IngestProgress:
+    """Counters of a running ingest, kept in memory and published to a small JSON file
+
+    Everything is counted from the books as they are processed, so following an ingest
+    never runs an aggregate against the tables being written.
+    """
+
+    def __init__(self, search_keys, path=INGEST_PROGRESS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.flushed_at = 0.0
+        now = time.time()
+        self.state = {
+            "status": "running",
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "data_version": None,
+            "error": None,
+            "stage": None,
+            "stages": {},
+            "keys": {key: {"status": "pending", "fetched": 0, "imported": 0, "failed": 0,
+                           "started_at": None, "finished_at": None} for key in search_keys}
+        }
+        self.publishers = Counter()
+        self.formats = Counter()
+        self.years = Counter()
+        self.stage_started = now
+        self.flush(force=True)
+
+    def stage(self, name):
+        """Enter a stage; time spent and items handled are totalled per stage name"""
+        with self.lock:
+            self.close_stage()
+            self.state["stage"] = name
+            self.state["stages"].setdefault(name, {"seconds": 0.0, "items": 0})
+        self.flush(force=True)
+
+    def close_stage(self):
+        now = time.time()
+        current = self.state["stage"]
+        if current is not None:
+            self.state["stages"][current]["seconds"] += now - self.stage_started
+        self.stage_started = now
+
+    def add_items(self, count=1):
+        with self.lock:
+            if self.state["stage"] is not None:
+                self.state["stages"][self.state["stage"]]["items"] += count
+
+    def key_started(self, key):
+        with self.lock:
+            self.state["keys"][key].update(status="fetching", started_at=time.time())
+        self.flush(force=True)
+
+    def key_fetched(self, key, count):
+        with self.lock:
+            self.state["keys"][key].update(status="processing", fetched=count)
+        self.add_items(count)
+        self.flush(force=True)
+
+    def book_processed(self, key, book_item, imported):
+        """Count one processed book; running breakdowns cover the imported ones"""
+        with self.lock:
+            self.state["keys"][key]["imported" if imported else "failed"] += 1
+            if imported:
+                volume_info = book_item.get("volumeInfo", {})
+                self.publishers[volume_info.get("publisher", "Unknown")] += 1
+                self.formats["eBook" if book_item.get("saleInfo", {}).get("isEbook") else "Physical Book"] += 1
+                year = str(volume_info.get("publishedDate", ""))[:4]
+                self.years[year if year.isdigit() else "Unknown"] += 1
+        self.add_items()
+        self.flush()
+
+    def key_finished(self, key):
+        with self.lock:
+            self.state["keys"][key].update(status="done", finished_at=time.time())
+        self.flush(force=True)
+
+    def finish(self, data_version=None, error=None):
+        with self.lock:
+            self.close_stage()
+            self.state.update(status="failed" if error else "finished", finished_at=time.time(),
+                              data_version=data_version, error=error, stage=None)
+        self.flush(force=True)
+
+    def snapshot(self):
+        with self.lock:
+            state = json.loads(json.dumps(self.state))
+            state["updated_at"] = time.time()
+            # Include the time spent so far in the current stage
+            if state["stage"] is not None:
+                state["stages"][state["stage"]]["seconds"] += state["updated_at"] - self.stage_started
+            state["publishers"] = dict(self.publishers.most_common(TOP_PUBLISHERS))
+            state["formats"] = dict(self.formats)
+            state["years"] = dict(sorted(self.years.items()))
+        return state
+
+    def flush(self, force=False):
+        """Write the counters, at most every FLUSH_INTERVAL_SECONDS unless forced"""
+        if not force and time.monotonic() - self.flushed_at < FLUSH_INTERVAL_SECONDS:
+            return
+        self.flushed_at = time.monotonic()
+        state = self.snapshot()
+        # Write then rename, so a reader never sees a half-written file
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as output:
+            json.dump(state, output)
+        os.replace(temporary, self.path)
+
+
+def read_progress(path=INGEST_PROGRESS_PATH):
+    """Last published ingest progress, or None when no ingest has run"""
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def estimate_progress(state, now=None):
+    """Throughput and ETA of an ingest from its published counters
+
+    Keys not fetched yet are assumed to yield as many books as the fetched ones did on average.
+    """
+    now = now or time.time()
+    keys = state["keys"].values()
+    end = state["finished_at"] or now
+    elapsed = end - state["started_at"]
+    processed = sum(key["imported"] + key["failed"] for key in keys)
+    fetched_keys = [key for key in keys if key["status"] in FETCHED_STATUSES]
+    average_fetched = sum(key["fetched"] for key in fetched_keys) / len(fetched_keys) if fetched_keys else 0
+    expected = sum(key["fetched"] if key["status"] in FETCHED_STATUSES else average_fetched for key in keys)
+
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    remaining = max(expected - processed, 0)
+    running = state["status"] == "running"
+    return {
+        "elapsed_seconds": elapsed,
+        "processed": processed,
+        "imported": sum(key["imported"] for key in keys),
+        "expected": int(expected),
+        "books_per_second": rate,
+        "keys_done": sum(key["status"] == "done" for key in keys),
+        # Unknown until one key has been fetched and some books processed
+        "eta_seconds": remaining / rate if running and rate > 0 and fetched_keys else None
+    }
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
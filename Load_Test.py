@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import requests
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Streamlit_Application.py")
+SEARCH_KEYWORDS = ["python", "data", "guide", "kitchen", "quantum"]
+ANALYSIS_SELECTOR = "📊 Choose Analysis View"
+
+# The dashboard server publishes its own counters (connections opened, peak RSS) this often
+STATS_INTERVAL_SECONDS = 0.5
+SERVER_START_SECONDS = 60
+
+
+def configure_environment(database, cache_dir):
+    """Point every project module at the seeded SQLite file and a private result cache and sketches
+
+    Must run before the project modules are imported: they read these settings at import time.
+    """
+    os.environ["BOOKSCAPE_BACKEND"] = "sqlite"
+    os.environ["BOOKSCAPE_SQLITE_PATH"] = database
+    os.environ["BOOKSCAPE_CACHE_DIR"] = cache_dir
+    os.environ["BOOKSCAPE_SKETCHES"] = os.path.join(cache_dir, "catalog_sketches.pkl")
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+
+def count_connections(backend):
+    """Wrap backend.connect so every connection the app opens is counted"""
+    counter = {"opened": 0}
+    lock = threading.Lock()
+    connect = backend.connect
+
+    def counted_connect():
+        with lock:
+            counter["opened"] += 1
+        return connect()
+
+    backend.connect = counted_connect
+    return counter
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def serve(port, stats_path):
+    """Run the dashboard as a regular Streamlit server, publishing its connection count and peak RSS
+
+    Started by main() in its own process, with the environment configure_environment() set up.
+    """
+    from streamlit.web import bootstrap
+    from Storage import get_backend
+    from Streamlit_Application import POOL_SIZE
+
+    # The app script shares this process's modules, so it gets the same (counted) backend
+    connections = count_connections(get_backend(pool_size=POOL_SIZE))
+
+    def publish():
+        while True:
+            temporary = f"{stats_path}.tmp"
+            with open(temporary, "w") as output:
+                json.dump({"connections": connections["opened"], "peak_rss_mb": peak_rss_mb()}, output)
+            os.replace(temporary, stats_path)
+            time.sleep(STATS_INTERVAL_SECONDS)
+
+    threading.Thread(target=publish, name="load-test-stats", daemon=True).start()
+    # The same steps as "streamlit run", with its command line flags
+    flag_options = {
+        "server_port": port,
+        "server_address": "127.0.0.1",
+        "server_headless": True,
+        "server_fileWatcherType": "none",
+        "browser_gatherUsageStats": False,
+    }
+    bootstrap.load_config_options(flag_options)
+    bootstrap.run(APP_PATH, None, [], flag_options)
+
+
+def start_server(port, stats_path):
+    """Start the dashboard server process and wait until it answers its health check"""
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port), "--stats", stats_path],
+                              env=os.environ.copy())
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Dashboard server exited with status {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).ok:
+                return server
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Dashboard server did not start within {SERVER_START_SECONDS}s")
+
+
+def read_server_stats(stats_path):
+    # Let the server publish the counters of the last requests first
+    time.sleep(STATS_INTERVAL_SECONDS * 2)
+    with open(stats_path) as source:
+        return json.load(source)
+
+
+class DashboardSession:
+    """One browser tab: a websocket to the server that requests script runs like the frontend does"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.widgets = {}
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+        self.connection = await websocket_connect(self.url, max_message_size=256 * 2 ** 20)
+
+    def close(self):
+        self.connection.close()
+
+    async def run(self, widget_states=()):
+        """Request one script run with the given widget values; returns the errors it showed"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        message = BackMsg()
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        return await asyncio.wait_for(self.read_run(), self.timeout)
+
+    async def read_run(self):
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        errors = []
+        while True:
+            payload = await self.connection.read_message()
+            if payload is None:
+                raise ConnectionError("Dashboard server closed the session")
+            message = ForwardMsg()
+            message.ParseFromString(payload)
+            kind = message.WhichOneof("type")
+            if kind == "script_finished":
+                if message.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    errors.append("Script failed to compile")
+                if message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return errors
+            elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in ("selectbox", "text_input"):
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.label] = widget
+                elif element_type == "exception":
+                    errors.append(element.exception.message)
+                elif element_type == "alert" and element.alert.format == Alert.ERROR:
+                    errors.append(element.alert.body)
+
+    async def select_view(self, view, keyword):
+        """Pick one analysis view, like a user click; the keyword view also searches for keyword"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        selector = self.widgets[ANALYSIS_SELECTOR]
+        choice = WidgetState(id=selector.id, int_value=list(selector.options).index(view))
+        errors = await self.run([choice])
+        if view == "Search Books by Keyword" and not errors:
+            keyword_input = next(widget for label, widget in self.widgets.items() if "keyword" in label)
+            errors = await self.run([choice, WidgetState(id=keyword_input.id, string_value=keyword)])
+        return errors
+
+
+async def simulate_session(session_id, url, views, iterations, timeout, seed):
+    """One simulated user: open the dashboard, then switch through analysis views"""
+    rng = random.Random(seed + session_id)
+    records = []
+
+    session = DashboardSession(url, timeout)
+    started = time.perf_counter()
+    try:
+        await session.connect()
+        errors = await session.run()
+    except Exception as e:
+        errors = [str(e) or type(e).__name__]
+    records.append({"session": session_id, "view": "(initial load)", "seconds": time.perf_counter() - started,
+                    "errors": errors})
+    if errors:
+        return records
+
+    try:
+        for _ in range(iterations):
+            view = rng.choice(views)
+            started = time.perf_counter()
+            try:
+                errors = await session.select_view(view, rng.choice(SEARCH_KEYWORDS))
+            except Exception as e:
+                errors = [str(e) or type(e).__name__]
+            records.append({"session": session_id, "view": view, "seconds": time.perf_counter() - started,
+                            "errors": errors})
+    finally:
+        session.close()
+    return records
+
+
+async def simulate_sessions(sessions, url, views, iterations, timeout, seed):
+    return await asyncio.gather(*(simulate_session(session_id, url, views, iterations, timeout, seed)
+                                  for session_id in range(sessions)))
+
+
+def summarize(sessions, elapsed, server_stats):
+    results = [record for records in sessions for record in records]
+    latencies = [record["seconds"] for record in results]
+    failures = [record for record in results if record["errors"]]
+    per_view = {}
+    for record in results:
+        per_view.setdefault(record["view"], []).append(record["seconds"])
+
+    return {
+        "sessions": len(sessions),
+        "requests": len(results),
+        "failed_requests": len(failures),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(max(latencies, default=0.0), 4)
+        },
+        # Measured in the one dashboard server process all sessions share
+        "db_connections_opened": server_stats["connections"],
+        "server_peak_rss_mb": round(server_stats["peak_rss_mb"], 1),
+        "views": {view: {"requests": len(values), "p50": round(percentile(values, 50), 4),
+                         "p95": round(percentile(values, 95), 4)}
+                  for view, values in sorted(per_view.items())},
+        "errors": sorted({error for record in failures for error in record["errors"]})[:10]
+    }
+
+
+def print_report(report):
+    print(f"Sessions: {report['sessions']}  Requests: {report['requests']}  "
+          f"Failed: {report['failed_requests']}  Elapsed: {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['throughput_rps']} requests/s")
+    latency = report["latency_seconds"]
+    print(f"Latency: p50 {latency['p50']}s  p95 {latency['p95']}s  p99 {latency['p99']}s  max {latency['max']}s")
+    print(f"DB connections opened: {report['db_connections_opened']}")
+    print(f"Server peak RSS: {report['server_peak_rss_mb']} MB")
+    print("Per view:")
+    for view, stats in report["views"].items():
+        print(f"  {view:<45} {stats['requests']:>5} requests  p50 {stats['p50']:.4f}s  p95 {stats['p95']:.4f}s")
+    for error in report["errors"]:
+        print(f"Error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with simulated sessions")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=20, help="view switches per session")
+    parser.add_argument("--books", type=int, default=2000, help="synthetic books to seed")
+    parser.add_argument("--database", help="SQLite file to use (seeded into a temporary file by default)")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--warm", action="store_true", help="warm the result caches before the sessions start")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed for one script run")
+    parser.add_argument("--seed", type=int, default=7, help="random seed for the data and the sessions")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    # Internal: the dashboard server process started by the load test
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stats", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.stats)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bookscape_load_")
+    database = args.database or os.path.join(workdir, "load_test.db")
+    cache_dir = os.path.join(workdir, "cache")
+    configure_environment(database, cache_dir)
+
+    from Storage import get_backend
+    from Streamlit_Application import POOL_SIZE, ANALYSIS_VIEWS
+
+    backend = get_backend(pool_size=POOL_SIZE)
+    if not args.no_seed:
+        from Synthetic_Data import seed_database
+        connection = backend.connect()
+        try:
+            seed_database(connection, args.books, args.seed)
+        finally:
+            connection.close()
+    if args.warm:
+        from Cache_Warmup import warm_caches
+        warm_caches(backend=backend)
+
+    views = list(ANALYSIS_VIEWS) + ["Search Books by Keyword"]
+
+    port = free_port()
+    stats_path = os.path.join(workdir, "server_stats.json")
+    server = start_server(port, stats_path)
+    try:
+        print(f"Running {args.sessions} sessions x {args.iterations} view switches against one dashboard server "
+              f"(port {port}, {database})")
+        started = time.perf_counter()
+        sessions = asyncio.run(simulate_sessions(args.sessions, f"ws://127.0.0.1:{port}/_stcore/stream", views,
+                                                 args.iterations, args.timeout, args.seed))
+        elapsed = time.perf_counter() - started
+        server_stats = read_server_stats(stats_path)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = summarize(sessions, elapsed, server_stats)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Report written to {args.json}")
+
+    sys.exit(1 if report["failed_requests"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+from datetime import date, timedelta
+from Storage import DB_ERRORS
+
+# Values whose changes are tracked across ingests; retail_price_usd is stored alongside
+# for ranking, but left out of the hash so a new FX rates version is not logged as a change
+TRACKED_COLUMNS = ["amount_retailPrice", "amount_listPrice", "currencyCode_retailPrice",
+                   "averageRating", "ratingsCount"]
+HISTORY_COLUMNS = TRACKED_COLUMNS + ["retail_price_usd"]
+
+# Secondary indexes of the history tables (see Book_Data.INDEX_PLAN)
+HISTORY_INDEX_PLAN = [
+    # Per-book timelines and the previous value of a change
+    ("idx_history_book", "book_history", ["book_id", "observed_on"]),
+]
+
+TREND_DAYS = 7
+TREND_LIMIT = 20
+
+
+def content_hash(book_data):
+    """Hash of the tracked values of a book row, compared in SQL to detect changes"""
+    content = "|".join(repr(book_data.get(column)) for column in TRACKED_COLUMNS)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def create_history_tables(cursor):
+    """Create the history tables; unlike the catalog tables they are kept across reloads"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS book_hashes (
+            book_id VARCHAR(50) PRIMARY KEY,
+            content_hash CHAR(16) NOT NULL
+        )
+    """)
+
+    # Clustered by date first, so a week of changes is one primary key range
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS book_history (
+            observed_on DATE NOT NULL,
+            data_version VARCHAR(40) NOT NULL,
+            book_id VARCHAR(50) NOT NULL,
+            amount_retailPrice DECIMAL(10,2),
+            amount_listPrice DECIMAL(10,2),
+            currencyCode_retailPrice VARCHAR(3),
+            averageRating DECIMAL(3,2),
+            ratingsCount INTEGER,
+            retail_price_usd DECIMAL(10,2),
+            PRIMARY KEY (observed_on, book_id, data_version)
+        )
+    """)
+
+    for index_name, table_name, columns in HISTORY_INDEX_PLAN:
+        try:
+            cursor.execute(f"CREATE INDEX {index_name} ON {table_name}({', '.join(columns)})")
+        except DB_ERRORS:
+            pass  # created by an earlier load
+
+
+def record_history(cursor, data_version, observed_on=None):
+    """Append the tracked values of new and changed books, then remember their new hashes
+
+    Returns the number of history rows written.
+    """
+    observed_on = (observed_on or date.today()).isoformat()
+    create_history_tables(cursor)
+
+    columns = ", ".join(HISTORY_COLUMNS)
+    selected = ", ".join(f"b.{column}" for column in HISTORY_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO book_history (observed_on, data_version, book_id, {columns})
+        SELECT %s, %s, b.book_id, {selected}
+        FROM books b
+        LEFT JOIN book_hashes h ON h.book_id = b.book_id
+        WHERE h.book_id IS NULL OR h.content_hash <> b.content_hash
+    """, (observed_on, data_version))
+    changed = cursor.rowcount
+
+    cursor.execute("""
+        DELETE FROM book_hashes
+        WHERE book_id IN (
+            SELECT book_id FROM book_history WHERE observed_on = %s AND data_version = %s
+        )
+    """, (observed_on, data_version))
+    cursor.execute("""
+        INSERT INTO book_hashes (book_id, content_hash)
+        SELECT b.book_id, b.content_hash
+        FROM book_history hi
+        JOIN books b ON b.book_id = hi.book_id
+        WHERE hi.observed_on = %s AND hi.data_version = %s
+    """, (observed_on, data_version))
+
+    print(f"Price and rating history: {changed} new or changed books recorded for {observed_on}")
+    return changed
+
+
+# Trend queries: changes observed since a date, each compared with the book's previous value
+CHANGES_SINCE = """
+    WITH timeline AS (
+        SELECT
+            h.book_id,
+            h.observed_on,
+            h.{column} as current_value,
+            LAG(h.{column}) OVER (
+                PARTITION BY h.book_id
+                ORDER BY h.observed_on, h.data_version
+            ) as previous_value
+        FROM book_history h
+        WHERE h.book_id IN (SELECT book_id FROM book_history WHERE observed_on >= %s)
+    )
+    SELECT
+        t.book_id,
+        b.book_title,
+        t.observed_on,
+        t.previous_value,
+        t.current_value,
+        ROUND(t.current_value - t.previous_value, 2) as value_change,
+        ROUND((t.current_value - t.previous_value) * 100.0 / t.previous_value, 2) as change_pct
+    FROM timeline t
+    JOIN books b ON b.book_id = t.book_id
+    WHERE t.observed_on >= %s
+    AND t.previous_value IS NOT NULL
+    AND t.current_value IS NOT NULL
+    AND t.current_value {direction} t.previous_value
+    ORDER BY ABS(t.current_value - t.previous_value) DESC
+    LIMIT %s
+"""
+
+PRICE_DROPS = CHANGES_SINCE.format(column="retail_price_usd", direction="<")
+RATING_COUNT_GAINS = CHANGES_SINCE.format(column="ratingsCount", direction=">")
+RATING_CHANGES = CHANGES_SINCE.format(column="averageRating", direction="<>")
+
+BOOK_HISTORY = """
+    SELECT observed_on, amount_retailPrice, currencyCode_retailPrice, retail_price_usd,
+           amount_listPrice, averageRating, ratingsCount
+    FROM book_history
+    WHERE book_id = %s
+    ORDER BY observed_on, data_version
+"""
+
+TREND_QUERIES = {
+    "PRICE_DROPS": PRICE_DROPS,
+    "RATING_COUNT_GAINS": RATING_COUNT_GAINS,
+    "RATING_CHANGES": RATING_CHANGES,
+}
+
+
+def trend_params(days=TREND_DAYS, limit=TREND_LIMIT, today=None):
+    """Parameters of the trend queries for changes in the last days"""
+    since = ((today or date.today()) - timedelta(days=days)).isoformat()
+    return since, since, limit
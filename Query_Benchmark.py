@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from Load_Test import configure_environment
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+DEFAULT_WORKDIR = ".bookscape_benchmark"
+
+
+def timing_summary(seconds):
+    return {
+        "min": round(min(seconds), 4),
+        "median": round(statistics.median(seconds), 4),
+        "max": round(max(seconds), 4)
+    }
+
+
+def git_revision():
+    """Short commit hash of the checkout, so results can be matched to a schema and index version"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def benchmark_analysis(backend, governor, name, query, repeat):
+    """Time one analysis query, its chart (data reduction, drawing and PNG encoding) and record its plan"""
+    from Index_Check import full_scan_steps
+    from Result_Cache import figure_png
+    from Streamlit_Application import ANALYSIS_CHARTS
+
+    record = {"rows": 0}
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        plan = backend.explain(cursor, query)
+        cursor.close()
+        record["plan"] = [{"table": step["table"], "key": step["key"], "detail": step["detail"]} for step in plan]
+        record["full_scans"] = sorted({step["table"] for step in full_scan_steps(plan)})
+
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            df = governor.execute(backend, conn, query, capped=False)
+            seconds.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    record["rows"] = len(df)
+    record["result_bytes"] = int(df.memory_usage(deep=True).sum())
+    record["query_seconds"] = timing_summary(seconds)
+
+    if name in ANALYSIS_CHARTS and not df.empty:
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            figure_png(ANALYSIS_CHARTS[name], df)
+            seconds.append(time.perf_counter() - started)
+        record["chart_seconds"] = timing_summary(seconds)
+    return record
+
+
+def run_scale(books, workdir, repeat, timeout, seed, reseed):
+    """Seed (or reuse) the catalog of one scale and benchmark every analysis against it
+
+    Runs in its own process, because the project modules read the database path at import time.
+    """
+    database = os.path.join(workdir, f"benchmark_{books}.db")
+    configure_environment(database, os.path.join(workdir, f"cache_{books}"))
+    from Storage import get_backend
+    from Result_Cache import read_data_version
+    from Query_Governor import QueryGovernor, QueryTimeout
+    from Streamlit_Application import ANALYSIS_QUERIES
+
+    backend = get_backend()
+    result = {"books": books, "database": database, "seed_seconds": None}
+    if reseed or not os.path.exists(database):
+        from Synthetic_Data import seed_database
+        started = time.perf_counter()
+        connection = backend.connect()
+        try:
+            seed_database(connection, books, seed, skewed=True)
+        finally:
+            connection.close()
+        result["seed_seconds"] = round(time.perf_counter() - started, 1)
+
+    connection = backend.connect()
+    try:
+        cursor = connection.cursor()
+        result["data_version"] = read_data_version(cursor)
+        cursor.close()
+    finally:
+        connection.close()
+
+    # No cooldown: a query that timed out once is still measured on the next scale
+    governor = QueryGovernor(timeout=timeout, cooldown=0)
+    print(f"Benchmarking {len(ANALYSIS_QUERIES)} analyses against {books:,} books ({database})")
+    result["queries"] = {}
+    for name, query in ANALYSIS_QUERIES.items():
+        try:
+            record = benchmark_analysis(backend, governor, name, query, repeat)
+        except QueryTimeout as e:
+            record = {"error": str(e), "timeout": True}
+        except Exception as e:
+            record = {"error": str(e)}
+        result["queries"][name] = record
+
+        if "error" in record:
+            print(f"  {name:<50} error: {record['error']}")
+        else:
+            chart = record.get("chart_seconds", {}).get("median", 0.0)
+            scans = f"  full scan: {', '.join(record['full_scans'])}" if record["full_scans"] else ""
+            print(f"  {name:<50} {record['rows']:>8} rows  query {record['query_seconds']['median']:8.3f}s  "
+                  f"chart {chart:6.3f}s{scans}")
+    return result
+
+
+def compare(report, baseline, threshold=0.1, min_seconds=0.01):
+    """Print the analyses whose median query time changed by more than threshold against a baseline report
+
+    Changes under min_seconds are timer noise and left out.
+    """
+    print(f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('created')}):")
+    for books, scale in report["scales"].items():
+        previous = baseline.get("scales", {}).get(books)
+        if previous is None:
+            continue
+        for name, record in scale["queries"].items():
+            before = previous["queries"].get(name, {}).get("query_seconds", {}).get("median")
+            after = record.get("query_seconds", {}).get("median")
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if abs(change) > threshold and abs(after - before) >= min_seconds:
+                print(f"  {int(books):>9,} books  {name:<50} {before:8.3f}s -> {after:8.3f}s  "
+                      f"({'slower' if change > 0 else 'faster'} by {abs(change):.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every analysis query on synthetic catalogs of several sizes")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="catalog sizes in books")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="where the seeded databases are kept")
+    parser.add_argument("--reseed", action="store_true", help="seed again even if a database of the size exists")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query and chart; the median is reported")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds allowed for one query")
+    parser.add_argument("--seed", type=int, default=7, help="random seed of the synthetic catalogs")
+    parser.add_argument("--json", default="query_benchmark.json", help="where to write the results")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    from Book_Data import INDEX_PLAN
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "backend": "sqlite",
+        "indexes": [index_name for index_name, _, _ in INDEX_PLAN],
+        "repeat": args.repeat,
+        "scales": {}
+    }
+    for books in args.scales:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            report["scales"][str(books)] = executor.submit(run_scale, books, args.workdir, args.repeat,
+                                                           args.timeout, args.seed, args.reseed).result()
+
+    # Plan details may hold driver types (e.g. Decimal) that json cannot encode natively
+    with open(args.json, "w") as output:
+        json.dump(report, output, indent=2, default=str)
+    print(f"Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(report, json.load(baseline))
+
+    failed = [name for scale in report["scales"].values() for name, record in scale["queries"].items()
+              if "error" in record]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
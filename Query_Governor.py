@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+import threading
+from Storage import DB_ERRORS
+from Result_Loader import fetch_frame
+
+# Limits of one dashboard or API query
+QUERY_TIMEOUT_SECONDS = float(os.environ.get("BOOKSCAPE_QUERY_TIMEOUT", "20"))
+MAX_FETCH_ROWS = int(os.environ.get("BOOKSCAPE_MAX_ROWS", "250000"))
+
+# A query that ran out of time is not retried for this long; callers fall back instead
+BUDGET_COOLDOWN_SECONDS = 300
+
+# The catalog snapshot reads the whole catalog once per data version for every session, so it
+# gets a longer limit and no cooldown: one slow load must not lock the default view out for minutes
+SNAPSHOT_TIMEOUT_SECONDS = float(os.environ.get("BOOKSCAPE_SNAPSHOT_TIMEOUT", "300"))
+WATCH_INTERVAL_SECONDS = 0.1
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class QueryGovernor:
+    """Runs queries under a time limit, a row cap and a cancellation check
+
+    A query that exceeded its time budget is refused for a cooldown period, so callers
+    degrade to a cached or approximate answer at once instead of tying up another
+    database thread.
+    """
+
+    def __init__(self, timeout=QUERY_TIMEOUT_SECONDS, max_rows=MAX_FETCH_ROWS, cooldown=BUDGET_COOLDOWN_SECONDS):
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.cooldown = cooldown
+        self.exceeded = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(query, params=None):
+        return hashlib.sha1(repr((" ".join(query.split()), params)).encode("utf-8")).hexdigest()
+
+    def check_budget(self, key):
+        with self.lock:
+            exceeded_at = self.exceeded.get(key)
+        if exceeded_at is not None and time.monotonic() - exceeded_at < self.cooldown:
+            raise QueryTimeout(f"Query exceeded its {self.timeout:g}s budget "
+                               f"{time.monotonic() - exceeded_at:.0f}s ago and is paused")
+
+    def record(self, key, exceeded):
+        with self.lock:
+            if exceeded:
+                self.exceeded[key] = time.monotonic()
+            else:
+                self.exceeded.pop(key, None)
+
+    def execute(self, backend, conn, query, params=None, cancelled=None, capped=True):
+        """Load a query result on conn under the limits
+
+        cancelled is polled while the query runs; when it returns True the statement is
+        interrupted. Raises QueryTimeout or QueryCancelled. Unless capped is False, a result
+        longer than the row cap is cut off and flagged with frame.attrs["truncated"].
+        """
+        key = self.key(query, params)
+        self.check_budget(key)
+
+        interrupt = backend.interrupter(conn)
+        finished = threading.Event()
+        reason = {}
+        deadline = time.monotonic() + self.timeout
+
+        def watch():
+            while not finished.wait(WATCH_INTERVAL_SECONDS):
+                if cancelled is not None and cancelled():
+                    reason["cancelled"] = True
+                elif time.monotonic() > deadline:
+                    reason["timeout"] = True
+                else:
+                    continue
+                interrupt()
+                return
+
+        backend.limit_statement_time(conn, self.timeout)
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            frame = fetch_frame(conn, query, params, max_rows=self.max_rows if capped else None)
+        except DB_ERRORS as e:
+            if reason.get("cancelled"):
+                raise QueryCancelled("Query cancelled") from e
+            if reason.get("timeout") or backend.is_timeout(e):
+                self.record(key, exceeded=True)
+                raise QueryTimeout(f"Query exceeded its {self.timeout:g}s time limit") from e
+            raise
+        finally:
+            finished.set()
+            watcher.join()
+
+        self.record(key, exceeded=False)
+        if frame.attrs.get("truncated"):
+            frame.attrs["row_cap"] = self.max_rows
+        return frame
+
+
+# One governor per process, so every session sees which queries are over budget
+QUERY_GOVERNOR = QueryGovernor()
+SNAPSHOT_GOVERNOR = QueryGovernor(timeout=SNAPSHOT_TIMEOUT_SECONDS, cooldown=0)
@@ -0,0 +1,178 @@
+import os
+import re
+import zlib
+import numpy as np
+import scipy.sparse as sp
+
+SIMILARITY_INDEX_PATH = os.environ.get("BOOKSCAPE_SIMILARITY_INDEX", "similarity_index.npz")
+
+# Hashed bag-of-words settings
+N_FEATURES = 2 ** 18
+TOP_K = 10
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "with", "you", "your", "na"
+}
+
+# Repeat the title so it weighs more than the long description
+FIELD_WEIGHTS = {"book_title": 2, "book_subtitle": 1, "categories": 1, "book_description": 1}
+
+# Upper bound on the dense similarity block computed at once (cells of float32)
+BLOCK_CELLS = 2 ** 25
+
+DOCUMENTS_QUERY = """
+    SELECT
+        b.book_id,
+        b.book_title,
+        b.book_subtitle,
+        d.categories,
+        bd.book_description
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    LEFT JOIN book_details bd ON b.book_id = bd.book_id
+    ORDER BY b.book_id
+"""
+
+
+def tokenize(text):
+    """Lowercase word tokens without stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOP_WORDS and len(token) > 1]
+
+
+def hash_token(token):
+    """Stable feature index of a token (Python's hash() changes between processes)"""
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+
+def document_text(row):
+    """Combine the weighted text fields of a book into one document"""
+    parts = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = row.get(field)
+        if value:
+            parts.extend([value] * weight)
+    return " ".join(parts)
+
+
+def count_matrix(documents):
+    """Hashed term counts of the documents as a CSR matrix"""
+    indptr = [0]
+    indices = []
+    for document in documents:
+        indices.extend(hash_token(token) for token in tokenize(document))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    counts = sp.csr_matrix((data, np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+                           shape=(len(documents), N_FEATURES))
+    counts.sum_duplicates()
+    return counts
+
+
+def l2_normalize(matrix):
+    """Scale every row to unit length so dot products are cosine similarities"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+
+def tfidf_matrix(counts):
+    """Sublinear TF-IDF weighting with smoothed IDF; returns the matrix and the IDF vector"""
+    n_documents = counts.shape[0]
+    document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    weighted = counts.copy()
+    weighted.data = 1 + np.log(weighted.data)
+    weighted = weighted.dot(sp.diags(idf)).tocsr()
+    return l2_normalize(weighted), idf
+
+
+def top_k(scores, k):
+    """Indices and scores of the k highest values in each row, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int32), np.empty((scores.shape[0], 0), dtype=np.float32)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return (np.take_along_axis(candidates, order, axis=1).astype(np.int32),
+            np.take_along_axis(candidate_scores, order, axis=1).astype(np.float32))
+
+
+def nearest_neighbours(matrix, k=TOP_K):
+    """Precompute the k most similar books of every book, one dense block of rows at a time"""
+    n_books = matrix.shape[0]
+    neighbours = np.zeros((n_books, min(k, max(n_books - 1, 0))), dtype=np.int32)
+    scores = np.zeros(neighbours.shape, dtype=np.float32)
+    block_size = max(1, BLOCK_CELLS // max(n_books, 1))
+    transposed = matrix.T.tocsc()
+
+    for start in range(0, n_books, block_size):
+        end = min(start + block_size, n_books)
+        block = matrix[start:end].dot(transposed).toarray()
+        # A book is not its own neighbour
+        block[np.arange(end - start), np.arange(start, end)] = -1.0
+        neighbours[start:end], scores[start:end] = top_k(block, neighbours.shape[1])
+
+    return neighbours, scores
+
+
+def build_similarity_index(cursor, path=SIMILARITY_INDEX_PATH, k=TOP_K):
+    """Build the TF-IDF matrix and nearest neighbours of every book and save them as one artifact"""
+    cursor.execute(DOCUMENTS_QUERY)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    counts = count_matrix([document_text(row) for row in rows])
+    matrix, idf = tfidf_matrix(counts)
+    neighbours, scores = nearest_neighbours(matrix, k)
+
+    np.savez_compressed(
+        path,
+        book_ids=np.array([row["book_id"] for row in rows], dtype=object).astype(str),
+        titles=np.array([row["book_title"] or "" for row in rows], dtype=object).astype(str),
+        data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+        idf=idf, neighbours=neighbours, scores=scores
+    )
+    print(f"Similarity index built for {len(rows)} books: {path}")
+    return path
+
+
+class SimilarityIndex:
+    """Loaded similarity artifact answering "books similar to X" queries"""
+
+    def __init__(self, path=SIMILARITY_INDEX_PATH):
+        with np.load(path) as artifact:
+            self.book_ids = artifact["book_ids"]
+            self.titles = artifact["titles"]
+            self.idf = artifact["idf"]
+            self.neighbours = artifact["neighbours"]
+            self.scores = artifact["scores"]
+            self.matrix = sp.csr_matrix(
+                (artifact["data"], artifact["indices"], artifact["indptr"]),
+                shape=(len(self.book_ids), N_FEATURES))
+        self.positions = {book_id: i for i, book_id in enumerate(self.book_ids)}
+
+    def similar_books(self, book_id, k=TOP_K):
+        """Precomputed neighbours of a book as (book_id, title, score) tuples"""
+        position = self.positions.get(book_id)
+        if position is None:
+            return []
+        neighbours = self.neighbours[position, :k]
+        scores = self.scores[position, :k]
+        return [(self.book_ids[i], self.titles[i], float(score))
+                for i, score in zip(neighbours, scores) if score > 0]
+
+    def search(self, text, k=TOP_K):
+        """Top-k cosine search of free text against every book"""
+        query = count_matrix([text])
+        if query.nnz == 0:
+            return []
+        query.data = 1 + np.log(query.data)
+        query = l2_normalize(query.multiply(self.idf).tocsr())
+        scores = self.matrix.dot(query.T).toarray().ravel()
+        positions, best = top_k(scores[np.newaxis, :], k)
+        return [(self.book_ids[i], self.titles[i], float(score))
+                for i, score in zip(positions[0], best[0]) if score > 0]
@@ -0,0 +1,229 @@
+import os
+import io
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import pandas as pd
+import matplotlib.pyplot as plt
+
+# Shared by every process (dashboard, API, warm-up) that reads the same database
+CACHE_DIR = os.environ.get("BOOKSCAPE_CACHE_DIR", ".bookscape_cache")
+MEMORY_ENTRIES = 256
+# Entries on disk past this size are evicted, least recently used first; an ingest clears older versions anyway
+MAX_DISK_BYTES = int(float(os.environ.get("BOOKSCAPE_CACHE_MAX_MB", "1024")) * 2 ** 20)
+VERSION_TTL_SECONDS = 5
+
+UNVERSIONED = "unversioned"
+
+
+def create_data_version_table(cursor):
+    """Create the single-row table holding the current data version (kept across reloads)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY,
+            version VARCHAR(40) NOT NULL,
+            updated_at VARCHAR(32) NOT NULL
+        )
+    """)
+
+
+def bump_data_version(cursor):
+    """Give the data a new version so results cached under the old one are no longer used"""
+    create_data_version_table(cursor)
+    version = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    cursor.execute("DELETE FROM data_version")
+    cursor.execute("INSERT INTO data_version (id, version, updated_at) VALUES (1, %s, %s)",
+                   (version, datetime.now().isoformat(timespec="seconds")))
+    return version
+
+
+def read_data_version(cursor):
+    try:
+        cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        row = cursor.fetchone()
+    except Exception:
+        return UNVERSIONED
+    return row[0] if row else UNVERSIONED
+
+
+class DataVersion:
+    """Current data version, re-read from the database at most every ttl seconds"""
+
+    def __init__(self, connect, ttl=VERSION_TTL_SECONDS):
+        self.connect = connect
+        self.ttl = ttl
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.version is None or time.monotonic() - self.checked_at > self.ttl:
+                conn = self.connect()
+                try:
+                    cursor = conn.cursor()
+                    self.version = read_data_version(cursor)
+                    cursor.close()
+                finally:
+                    conn.close()
+                self.checked_at = time.monotonic()
+            return self.version
+
+
+class ResultCache:
+    """Query results keyed by (data version, query, params) in memory and on disk"""
+
+    def __init__(self, directory=CACHE_DIR, memory_entries=MEMORY_ENTRIES, max_disk_bytes=MAX_DISK_BYTES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(query, params=None):
+        return hashlib.sha1(repr((" ".join(query.split()), params)).encode("utf-8")).hexdigest()
+
+    def path(self, version, key):
+        return os.path.join(self.directory, version, f"{key}.pkl")
+
+    def get(self, version, query, params=None):
+        key = self.key(query, params)
+        with self.lock:
+            if (version, key) in self.memory:
+                self.memory.move_to_end((version, key))
+                return self.memory[(version, key)]
+
+        path = self.path(version, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as cached:
+                result = pickle.load(cached)
+            # The modification time orders entries for eviction
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self.remember(version, key, result)
+        return result
+
+    def put(self, version, query, params, result):
+        key = self.key(query, params)
+        self.remember(version, key, result)
+
+        # Write to a temporary file first so readers never see a partial entry
+        path = self.path(version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary, "wb") as cached:
+            pickle.dump(result, cached, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete the least recently used entries on disk until they fit in max_disk_bytes"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if file_name.endswith(".pkl"):
+                    path = os.path.join(root, file_name)
+                    try:
+                        status = os.stat(path)
+                    except OSError:  # removed by another process meanwhile
+                        continue
+                    entries.append((status.st_mtime, status.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def remember(self, version, key, result):
+        with self.lock:
+            self.memory[(version, key)] = result
+            self.memory.move_to_end((version, key))
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def get_or_load(self, version, query, params, load):
+        """Return the cached result or load, cache and return it"""
+        result = self.get(version, query, params)
+        if result is None:
+            result = load()
+            self.put(version, query, params, result)
+        return result
+
+    def latest(self, query, params=None):
+        """(version, result) of the most recently used cached result of a query under any version"""
+        key = self.key(query, params)
+        with self.lock:
+            for version, cached_key in reversed(self.memory):
+                if cached_key == key:
+                    return version, self.memory[(version, key)]
+        if not os.path.isdir(self.directory):
+            return None
+        for version in sorted(os.listdir(self.directory), reverse=True):
+            result = self.get(version, query, params)
+            if result is not None:
+                return version, result
+        return None
+
+    def prune(self, keep_version):
+        """Delete on-disk results of every other data version"""
+        if not os.path.isdir(self.directory):
+            return
+        for version in os.listdir(self.directory):
+            if version != keep_version:
+                shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+
+# One cache per process, shared by every dashboard session, the API and the warm-up
+RESULT_CACHE = ResultCache()
+
+# pyplot keeps global state, so only one figure is drawn at a time in a process
+FIGURE_LOCK = threading.Lock()
+
+
+def figure_png(draw, data):
+    """Draw a chart function's figure and return it as PNG bytes (same settings as st.pyplot)"""
+    with FIGURE_LOCK:
+        fig = draw(data)
+        image = io.BytesIO()
+        try:
+            fig.savefig(image, format="png", dpi=200, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    return image.getvalue()
+
+
+def data_digest(data):
+    """Short hash of a frame's columns and values"""
+    try:
+        values = pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes()
+    except TypeError:  # unhashable cells such as lists
+        values = pickle.dumps(data.to_numpy(), protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.sha1(repr(list(data.columns)).encode("utf-8") + values).hexdigest()[:16]
+
+
+def cached_figure(version, name, draw, data):
+    """PNG of a named chart, drawn once per data version and data
+
+    Charts of degraded results (a timed-out query answered approximately or from an older
+    version) are drawn but not cached, so they never stand in for the real chart.
+    """
+    if data.attrs.get("degraded"):
+        return figure_png(draw, data)
+    return RESULT_CACHE.get_or_load(version, f"chart:{name}:{data_digest(data)}", None,
+                                    lambda: figure_png(draw, data))
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+from mysql.connector import FieldType
+
+CHUNK_SIZE = 10000
+
+# String columns become categoricals when they repeat this much
+CATEGORY_MIN_ROWS = 64
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+FLOAT_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL, FieldType.FLOAT, FieldType.DOUBLE}
+INT_TYPES = {FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24, FieldType.YEAR}
+BOOL_TYPES = {FieldType.TINY}
+
+
+def column_kind(type_code, values):
+    """Decide how a column is stored: 'float', 'int', 'bool' or 'str'"""
+    if type_code in FLOAT_TYPES:
+        return "float"
+    if type_code in INT_TYPES:
+        return "int"
+    if type_code in BOOL_TYPES:
+        return "bool"
+
+    # No driver type information (SQLite) - infer from every non-null value, not the first one:
+    # SQLite returns the integral values of a DECIMAL column (4.0) as int, the others (3.5) as float
+    types = {type(v) for v in values} - {type(None)}
+    if types == {bool}:
+        return "bool"
+    if types and types <= {int}:
+        return "int"
+    if types and types <= {int, float, Decimal}:
+        return "float"
+    return "str"
+
+
+def build_column(values, kind):
+    """Build a typed NumPy/pandas array from the values of one column"""
+    has_nulls = any(v is None for v in values)
+
+    if kind == "float":
+        # NumPy converts Decimal via __float__ and None to NaN
+        return np.array(values, dtype=np.float64)
+    if kind == "int":
+        return np.array(values, dtype=np.float64 if has_nulls else np.int64)
+    if kind == "bool":
+        if has_nulls:
+            return pd.array([None if v is None else bool(v) for v in values], dtype="boolean")
+        return np.array(values, dtype=bool)
+
+    return np.array([v.decode() if isinstance(v, (bytes, bytearray)) else v for v in values], dtype=object)
+
+
+def categorize(frame):
+    """Convert repetitive string columns of a complete frame to categoricals"""
+    if len(frame) < CATEGORY_MIN_ROWS:
+        return frame
+    for name in frame.columns:
+        column = frame[name]
+        if column.dtype == object and column.nunique() <= len(frame) * CATEGORY_MAX_UNIQUE_RATIO:
+            frame[name] = column.astype("category")
+    return frame
+
+
+def execute(cursor, query, params=None):
+    """Execute a query, only passing parameters when there are any"""
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+
+
+def chunk_to_frame(rows, description):
+    """Turn a list of row tuples into a DataFrame with typed columns"""
+    names = [column[0] for column in description]
+    columns = [list(values) for values in zip(*rows)] if rows else [[] for _ in names]
+    data = {
+        column[0]: build_column(values, column_kind(column[1], values))
+        for column, values in zip(description, columns)
+    }
+    return pd.DataFrame(data, columns=names)
+
+
+def iter_rows(conn, query, params=None, chunk_size=CHUNK_SIZE):
+    """Execute a query and yield its result as (rows, cursor description) of at most chunk_size rows"""
+    cursor = conn.cursor()
+    try:
+        execute(cursor, query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows, cursor.description
+    finally:
+        # Drain rows left behind when the consumer stops early
+        if getattr(conn, "unread_result", False):
+            conn.consume_results()
+        cursor.close()
+
+
+def iter_frames(conn, query, params=None, chunk_size=CHUNK_SIZE):
+    """Execute a query and yield its result as DataFrames of at most chunk_size rows"""
+    for rows, description in iter_rows(conn, query, params, chunk_size):
+        yield chunk_to_frame(rows, description)
+
+
+def fetch_frame(conn, query, params=None, chunk_size=CHUNK_SIZE, max_rows=None):
+    """Execute a query and load the full result as one typed DataFrame
+
+    With max_rows, at most that many rows are loaded; a longer result is cut off and
+    flagged with frame.attrs["truncated"] = True.
+    """
+    cursor = conn.cursor()
+    truncated = False
+    try:
+        execute(cursor, query, params)
+        description = cursor.description
+        chunks, fetched = [], 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if max_rows is not None and fetched + len(rows) > max_rows:
+                rows, truncated = rows[:max_rows - fetched], True
+            chunks.append(chunk_to_frame(rows, description))
+            fetched += len(rows)
+            if truncated:
+                break
+    finally:
+        # Drain rows left behind when the result was cut off
+        if getattr(conn, "unread_result", False):
+            conn.consume_results()
+        cursor.close()
+
+    if not chunks:
+        return chunk_to_frame([], description)
+    frame = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    frame = categorize(frame)
+    if truncated:
+        frame.attrs["truncated"] = True
+    return frame
@@ -0,0 +1,338 @@
+import os
+import re
+import math
+import sqlite3
+import mysql.connector
+from functools import lru_cache
+from mysql.connector import pooling
+
+# Storage backend selection: "mysql" (default) or "sqlite" for a server-less local database
+BACKEND_NAME = os.environ.get("BOOKSCAPE_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("BOOKSCAPE_SQLITE_PATH", "bookscape_explorer.db")
+
+MYSQL_CONFIG = {
+    "host": "127.0.0.1",
+    "user": "root",
+    "password": "**********",
+    "database": "bookscape_explorer",
+    "use_pure": False  # use the C extension when it is installed
+}
+
+# SQLite accepts ORDER BY inside aggregates from 3.44 on; older versions drop it
+SQLITE_ORDERED_AGGREGATES = sqlite3.sqlite_version_info >= (3, 44, 0)
+
+# Errors raised by either backend
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+
+# Single-quoted SQL string literals, which translation must leave untouched
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+GROUP_CONCAT = re.compile(
+    r"GROUP_CONCAT\(\s*(?P<distinct>DISTINCT\s+)?(?P<expr>[^()]+?)"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>[^()]+?))?(?:\s+SEPARATOR\s+(?P<sep>'[^']*'))?\s*\)",
+    re.IGNORECASE
+)
+
+# Table references of a query; plans name tables by these aliases
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+NOT_ALIASES = {"ON", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "CROSS", "GROUP", "ORDER", "LIMIT", "USING",
+               "HAVING", "UNION"}
+
+# MySQL -> SQLite rewrites applied outside string literals
+SQLITE_REWRITES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    # NULL-safe equality
+    (re.compile(r"<=>"), "IS"),
+    (re.compile(r"\bSERIAL\s+PRIMARY\s+KEY\b", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    # DECIMAL has NUMERIC affinity, which stores 4.0 as the integer 4; REAL keeps every value a float
+    (re.compile(r"\bDECIMAL\s*\(\s*\d+\s*,\s*\d+\s*\)", re.IGNORECASE), "REAL"),
+    (re.compile(r"^\s*EXPLAIN\s+(?!QUERY\s+PLAN)", re.IGNORECASE), "EXPLAIN QUERY PLAN "),
+]
+
+
+def rewrite_outside_literals(sql, rewrites):
+    """Apply regex rewrites to the parts of a statement that are not string literals"""
+    parts = []
+    position = 0
+    for literal in STRING_LITERAL.finditer(sql):
+        code = sql[position:literal.start()]
+        for pattern, replacement in rewrites:
+            code = pattern.sub(replacement, code)
+        parts.extend([code, literal.group()])
+        position = literal.end()
+    code = sql[position:]
+    for pattern, replacement in rewrites:
+        code = pattern.sub(replacement, code)
+    parts.append(code)
+    return "".join(parts)
+
+
+def table_aliases(query):
+    """Map of the aliases in a query to the tables (or CTEs) they stand for"""
+    return {alias: name for name, alias in TABLE_ALIAS.findall(query) if alias.upper() not in NOT_ALIASES}
+
+
+def sqlite_group_concat(match):
+    """GROUP_CONCAT(x ORDER BY y SEPARATOR 's') -> GROUP_CONCAT(x, 's' ORDER BY y)"""
+    expr = match.group("expr").strip()
+    order = f" ORDER BY {match.group('order').strip()}" if match.group("order") and SQLITE_ORDERED_AGGREGATES else ""
+    if match.group("distinct"):
+        # SQLite only accepts a single argument with DISTINCT (default separator)
+        return f"GROUP_CONCAT(DISTINCT {expr}{order})"
+    if match.group("sep"):
+        return f"GROUP_CONCAT({expr}, {match.group('sep')}{order})"
+    return f"GROUP_CONCAT({expr}{order})"
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql, dialect):
+    """Translate a MySQL statement to the given dialect, returning a tuple of statements"""
+    if dialect == "mysql":
+        return (sql,)
+
+    stripped = sql.strip().rstrip(";")
+
+    # Server-level statements have no meaning for an embedded database file
+    if re.match(r"^(CREATE\s+DATABASE|USE)\b", stripped, re.IGNORECASE):
+        return ()
+
+    # SQLite drops one table per statement
+    drop = re.match(r"^DROP\s+TABLE\s+IF\s+EXISTS\s+(.+)$", stripped, re.IGNORECASE | re.DOTALL)
+    if drop:
+        tables = [table.strip() for table in drop.group(1).split(",") if table.strip()]
+        return tuple(f"DROP TABLE IF EXISTS {table}" for table in tables)
+
+    statement = GROUP_CONCAT.sub(sqlite_group_concat, stripped)
+    return (rewrite_outside_literals(statement, SQLITE_REWRITES),)
+
+
+class StdDev:
+    """Population standard deviation aggregate, matching MySQL STDDEV()"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        if self.count == 0:
+            return None
+        return math.sqrt(self.m2 / self.count)
+
+
+class SQLiteCursor:
+    """DB-API cursor that accepts the MySQL statements used across the project"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def execute(self, sql, params=None):
+        for statement in translate_sql(sql, "sqlite"):
+            if params:
+                self.cursor.execute(statement, params)
+            else:
+                self.cursor.execute(statement)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        for statement in translate_sql(sql, "sqlite"):
+            self.cursor.executemany(statement, seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self.cursor.fetchmany(size or self.cursor.arraysize)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+class SQLiteConnection:
+    """Connection wrapper exposing the subset of the mysql.connector API the project uses"""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.create_aggregate("STDDEV", 1, StdDev)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def is_connected(self):
+        try:
+            self.connection.execute("SELECT 1")
+            return True
+        except sqlite3.ProgrammingError:
+            return False
+
+    def close(self):
+        self.connection.close()
+
+
+class MySQLBackend:
+    """MySQL server backend, optionally pooled"""
+    dialect = "mysql"
+
+    def __init__(self, config=None, pool_size=None):
+        self.config = dict(config or MYSQL_CONFIG)
+        self.pool_size = pool_size
+        self.pool = None
+
+    def connect(self):
+        if self.pool_size:
+            if self.pool is None:
+                self.pool = pooling.MySQLConnectionPool(
+                    pool_name="bookscape", pool_size=self.pool_size, **self.config)
+            return self.pool.get_connection()
+        return mysql.connector.connect(**self.config)
+
+    def limit_statement_time(self, conn, seconds):
+        """Make the server abort SELECT statements on this connection that run longer than seconds"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(seconds * 1000),))
+        finally:
+            cursor.close()
+
+    def interrupter(self, conn):
+        """Callable that aborts the statement running on conn, safe to call from another thread"""
+        connection_id = conn.connection_id
+
+        def interrupt():
+            # KILL QUERY must come from a second connection; the session itself stays open
+            killer = mysql.connector.connect(**self.config)
+            try:
+                cursor = killer.cursor()
+                cursor.execute(f"KILL QUERY {int(connection_id)}")
+                cursor.close()
+            finally:
+                killer.close()
+
+        return interrupt
+
+    def is_timeout(self, error):
+        # ER_QUERY_TIMEOUT: maximum statement execution time exceeded
+        return getattr(error, "errno", None) == 3024
+
+    def explain(self, cursor, query):
+        """Return the plan as steps of {select, table, alias, key, scan, detail} in join order
+
+        table is the table an alias stands for; derived tables keep MySQL's <derivedN> names.
+        scan is True for steps that read the whole table or the whole of an index (type ALL or index).
+        """
+        cursor.execute(f"EXPLAIN {query.strip().rstrip(';')}")
+        columns = [column[0] for column in cursor.description]
+        aliases = table_aliases(query)
+        steps = []
+        for row in cursor.fetchall():
+            step = dict(zip(columns, row))
+            alias = step.get("table")
+            steps.append({"select": step.get("id"), "table": aliases.get(alias, alias), "alias": alias,
+                          "key": step.get("key"), "scan": step.get("type") in ("ALL", "index"), "detail": step})
+        return steps
+
+
+class SQLiteBackend:
+    """Embedded SQLite backend for local runs, tests and benchmarks"""
+    dialect = "sqlite"
+
+    PLAN_STEP = re.compile(
+        r"^(?:SCAN|SEARCH) (?P<table>\S+)(?: AS \S+)?"
+        r"(?: USING (?:COVERING )?(?:INDEX (?P<index>\S+)|(?P<pk>(?:INTEGER )?PRIMARY KEY)))?"
+    )
+
+    def __init__(self, path=None, pool_size=None):
+        self.path = path or SQLITE_PATH
+
+    def connect(self):
+        return SQLiteConnection(self.path)
+
+    def limit_statement_time(self, conn, seconds):
+        # No server-side limit; the caller's watchdog enforces it through interrupter()
+        pass
+
+    def interrupter(self, conn):
+        """Callable that aborts the statement running on conn, safe to call from another thread"""
+        return conn.connection.interrupt
+
+    def is_timeout(self, error):
+        return False
+
+    def explain(self, cursor, query):
+        """Return the plan as steps of {select, table, alias, key, scan, detail}; CTEs and subqueries show as <name>
+
+        table is the table an alias stands for. scan is True for SCAN steps, which read the whole
+        table or, with USING INDEX, the whole index.
+        """
+        cursor.execute(f"EXPLAIN {query.strip().rstrip(';')}")
+        rows = cursor.fetchall()
+        derived = {row[3].split()[-1] for row in rows if row[3].startswith(("MATERIALIZE", "CO-ROUTINE"))}
+        aliases = table_aliases(query)
+        steps = []
+        for row in rows:
+            match = self.PLAN_STEP.match(row[3])
+            if not match or match.group("table") == "CONSTANT":
+                continue
+            alias = match.group("table")
+            table = aliases.get(alias, alias)
+            # Plan steps name tables by alias, so aliases of CTEs count as derived too
+            if alias in derived or table in derived:
+                table = f"<{table}>"
+            key = match.group("index") or match.group("pk")
+            steps.append({"select": row[1], "table": table, "alias": alias, "key": key,
+                          "scan": row[3].startswith("SCAN"), "detail": row[3]})
+        return steps
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_instances = {}
+
+
+def get_backend(name=None, **options):
+    """Return the shared backend instance for a backend name (defaults to BOOKSCAPE_BACKEND)"""
+    name = name or BACKEND_NAME
+    if name not in _instances:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown storage backend '{name}', expected one of {', '.join(BACKENDS)}")
+        _instances[name] = BACKENDS[name](**options)
+    return _instances[name]
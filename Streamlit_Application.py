@@ -1,9 +1,30 @@
 import streamlit as st
-import mysql.connector
+import os
+import time
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner.script_requests import ScriptRequests, ScriptRequestType
+from Storage import get_backend
+from Result_Loader import iter_frames
+from Book_Data import normalize_isbn
+from Recommendations import SIMILARITY_INDEX_PATH, SimilarityIndex
+from Result_Cache import RESULT_CACHE, DataVersion, cached_figure
+from Query_Governor import QUERY_GOVERNOR, SNAPSHOT_GOVERNOR, QueryTimeout
+from Chart_Data import MAX_SCATTER_POINTS, top_n_other, year_page_bins, downsample_series
+from Catalog_Sketches import CATALOG_SKETCHES_PATH, APPROXIMATE_ANALYSES, load_catalog_sketches
+from Price_History import TREND_DAYS, TREND_QUERIES, BOOK_HISTORY, trend_params
+from Category_Tree import CATEGORY_ROOTS, CATEGORY_SUBCATEGORIES, CATEGORY_LEVEL_STATS, CATEGORY_NODE_BOOKS
+from Catalog_Snapshot import CATALOG_SNAPSHOTS, SNAPSHOT_QUERIES
+from Facet_Index import VALUE_FACETS, CATEGORY_FACET, FACET_LABELS, RANGE_FACETS
+from Ingest_Progress import read_progress, estimate_progress, format_duration
+from Data_Export import EXPORT_FORMATS, as_subquery, estimate_export, export_to_file, format_size
 
 # Set basic style parameters
 plt.style.use('default')
@@ -17,38 +38,261 @@ plt.rcParams.update({
 })
 
 
-# Database connection function
+# Database connection settings live in Storage.py (BOOKSCAPE_BACKEND selects mysql or sqlite)
+POOL_SIZE = 8
+
+# Bounds concurrent checkouts so callers wait instead of exhausting the pool
+POOL_SLOTS = threading.BoundedSemaphore(POOL_SIZE)
+
+
+# Storage backend shared by all sessions of the app (owns the MySQL connection pool)
+@st.cache_resource
+def init_backend():
+    return get_backend(pool_size=POOL_SIZE)
+
+
+# Database connection function - closing the connection returns it to the pool
 def init_connection():
-    return mysql.connector.connect(
-        host="127.0.0.1",
-        user="root",
-        password="**********",
-        database="bookscape_explorer"
-    )
+    return init_backend().connect()
+
+
+@contextmanager
+def pooled_connection():
+    """Check a connection out of the pool, waiting for a free slot if needed"""
+    with POOL_SLOTS:
+        conn = init_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+# Similarity index shared by all sessions, reloaded when the artifact is rebuilt
+@st.cache_resource
+def load_similarity_index(modified_time):
+    return SimilarityIndex(SIMILARITY_INDEX_PATH)
+
+
+# Catalog sketches shared by all sessions, reloaded when ingest saves new ones
+@st.cache_resource
+def load_sketches(modified_time):
+    return load_catalog_sketches(CATALOG_SKETCHES_PATH)
+
+
+# Query results (RESULT_CACHE) are shared with the analytics API and keyed by the data version
+@st.cache_resource
+def init_data_version():
+    return DataVersion(init_connection)
+
+
+def current_data_version():
+    return init_data_version().get()
+
+
+# Read-only catalog snapshot (books table and facet index), loaded once per data version for all sessions
+def catalog_snapshot():
+    try:
+        return CATALOG_SNAPSHOTS.get(current_data_version(), load_snapshot_frames)
+    except QueryTimeout as e:
+        # Keep serving the last good snapshot until a load of the new version succeeds
+        previous = CATALOG_SNAPSHOTS.current
+        if previous is None:
+            raise
+        st.warning(f"Showing the catalog of data version {previous.version}: {e}")
+        return previous
+
+
+def load_snapshot_frames():
+    frames = run_queries(SNAPSHOT_QUERIES, runner=snapshot_query)
+    return frames["books"], frames["book_categories"]
+
+
+def snapshot_query(query):
+    # The snapshot must see the whole catalog, so it is exempt from the row cap, and it skips
+    # the result cache so the raw rows are not kept next to their compact copy
+    with pooled_connection() as conn:
+        return SNAPSHOT_GOVERNOR.execute(init_backend(), conn, query, capped=False)
 
 
-# Function to run queries
-def run_query(query):
-    conn = init_connection()
-    df = pd.read_sql_query(query, conn)
+# Streamlit has no public flag for a pending rerun: its Stop/RerunException is only raised in the script
+# thread, which is blocked waiting for the query. rerun_requested reads the request state itself, which is
+# why streamlit is pinned in requirements.txt; tests/test_rerun_requested.py fails if that state changes.
+RERUN_STATE_READABLE = hasattr(ScriptRequests(), "_state")
+if not RERUN_STATE_READABLE:
+    print("Warning: this Streamlit version does not expose the pending rerun state; "
+          "queries will not be cancelled when the user switches views")
+
+
+def rerun_requested(ctx):
+    """True once the session asked for a rerun or stop, e.g. because the user switched views"""
+    if ctx is None or not RERUN_STATE_READABLE:
+        return False
+    return ctx.script_requests._state != ScriptRequestType.CONTINUE
+
+
+# Function to run queries - served from the result cache while the data version is unchanged;
+# misses run under the query governor's time limit, row cap (unless capped=False) and cancellation
+def run_query(query, params=None, capped=True):
+    ctx = get_script_run_ctx()
+
+    def load():
+        with pooled_connection() as conn:
+            return QUERY_GOVERNOR.execute(init_backend(), conn, query, params,
+                                          cancelled=lambda: rerun_requested(ctx), capped=capped)
+
+    try:
+        df = RESULT_CACHE.get_or_load(current_data_version(), query, params, load)
+    except QueryTimeout as e:
+        df = degraded_result(query, params, e)
+    show_governor_notices(df)
+    # Shallow copy so callers can add or replace columns without touching the cached frame
+    return df.copy(deep=False)
+
+
+def degraded_result(query, params, error):
+    """Answer to a query that ran out of time: approximate when it has sketches, else the last cached result"""
+    name = next((name for name, analysis in ANALYSIS_QUERIES.items() if analysis == query), None)
+    sketches = current_sketches() if name in APPROXIMATE_ANALYSES else None
+    if sketches is not None:
+        df, note = APPROXIMATE_ANALYSES[name](sketches)
+        df.attrs = dict(approximate=True, degraded=f"{error} - approximate answer: {note}")
+        return df
+
+    latest = RESULT_CACHE.latest(query, params)
+    if latest is None:
+        raise error
+    version, df = latest
+    df = df.copy(deep=False)
+    df.attrs = dict(df.attrs, degraded=f"{error} - showing the cached result of data version {version}")
     return df
 
 
+def show_governor_notices(df):
+    if df.attrs.get("degraded"):
+        st.warning(f"⏱️ {df.attrs['degraded']}")
+    if df.attrs.get("truncated"):
+        st.warning(f"✂️ Showing the first {df.attrs.get('row_cap', len(df)):,} rows; the full result is longer. "
+                   f"Use the export to get every row.")
+
+
+# Function to run a query and hand its result over in chunks as they arrive
+def stream_query(query, params=None, chunk_size=5000):
+    with pooled_connection() as conn:
+        yield from iter_frames(conn, query, params, chunk_size)
+
+
+def current_sketches():
+    """Catalog sketches of the current data version, or None if there are none for it yet"""
+    if not os.path.exists(CATALOG_SKETCHES_PATH):
+        return None
+    sketches = load_sketches(os.path.getmtime(CATALOG_SKETCHES_PATH))
+    return sketches if sketches.version == current_data_version() else None
+
+
+def run_analysis(name):
+    """Result of a registered analysis, answered from the catalog sketches in approximate mode"""
+    if st.session_state.get("approximate_mode") and name in APPROXIMATE_ANALYSES:
+        sketches = current_sketches()
+        if sketches is not None:
+            df, note = APPROXIMATE_ANALYSES[name](sketches)
+            # Charts of approximate results are cached apart from the exact ones
+            df.attrs["approximate"] = True
+            st.caption(f"≈ Approximate answer: {note}")
+            return df
+        st.caption("No catalog sketches for this data version yet - showing the exact answer")
+    return run_query(ANALYSIS_QUERIES[name])
+
+
+def render_export(name, query, params=None):
+    """Export controls: estimate first, then stream the full result to a CSV/Parquet file"""
+    with st.expander("⬇️ Export results"):
+        export_format = st.radio("Format", EXPORT_FORMATS, horizontal=True, key=f"export_format_{name}")
+        estimate_key, file_key = f"export_estimate_{name}", f"export_file_{name}"
+
+        if st.button("Estimate export size", key=f"export_estimate_button_{name}"):
+            with pooled_connection() as conn:
+                st.session_state[estimate_key] = estimate_export(conn, query, params)
+
+        estimate = st.session_state.get(estimate_key)
+        if estimate:
+            st.caption(f"About {estimate['rows']:,} rows, ~{format_size(estimate[export_format])} as {export_format}")
+
+            if estimate["rows"] and st.button(f"Start {export_format} export", key=f"export_start_{name}"):
+                previous = st.session_state.pop(file_key, None)
+                if previous and os.path.exists(previous[0]):
+                    os.remove(previous[0])
+                with st.spinner("Exporting..."):
+                    with pooled_connection() as conn:
+                        path, rows = export_to_file(conn, query, export_format, params)
+                st.session_state[file_key] = (path, rows, export_format)
+
+        exported = st.session_state.get(file_key)
+        if exported:
+            path, rows, exported_format = exported
+            try:
+                with open(path, "rb") as export_file:
+                    st.download_button(
+                        f"Download {rows:,} rows ({format_size(os.fstat(export_file.fileno()).st_size)})",
+                        export_file,
+                        file_name=f"{name.lower()}{os.path.splitext(path)[1]}",
+                        key=f"export_download_{name}"
+                    )
+            except FileNotFoundError:
+                # Removed after EXPORT_TTL_SECONDS (see Data_Export.remove_stale_exports)
+                st.caption("This export has expired; start it again to download it")
+
+
+def run_query_streamed(query, placeholder, params=None):
+    """Load a large result chunk by chunk, showing the first rows while the rest loads"""
+    version = current_data_version()
+    cached = RESULT_CACHE.get(version, query, params)
+    if cached is not None:
+        return cached.copy(deep=False)
+
+    chunks = []
+    for chunk in stream_query(query, params):
+        chunks.append(chunk)
+        if len(chunks) == 1:
+            placeholder.dataframe(chunk)
+    placeholder.empty()
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    RESULT_CACHE.put(version, query, params, df)
+    return df.copy(deep=False)
+
+
+# Function to run independent queries concurrently
+def run_queries(queries, runner=None):
+    """Run a {name: query} mapping in parallel and return {name: DataFrame}"""
+    runner = runner or run_query
+    # Worker threads inherit the script context so cached resources resolve without warnings
+    with ThreadPoolExecutor(max_workers=max(1, min(len(queries), POOL_SIZE)),
+                            initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx())) as executor:
+        futures = {name: executor.submit(runner, query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
 # SQL Queries
 BOOKS_TABLE = """
     SELECT 
-        book_title,
-        book_authors,
-        categories,
-        publication_year,
-        averageRating,
-        ratingsCount,
-        isEbook,
-        amount_retailPrice,
-        currencyCode_retailPrice
-    FROM books
+        b.book_title,
+        d.book_authors,
+        d.categories,
+        b.publication_year,
+        b.averageRating,
+        b.ratingsCount,
+        b.isEbook,
+        b.amount_retailPrice,
+        b.currencyCode_retailPrice,
+        b.retail_price_usd
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
 """
 
+# BOOKS_TABLE columns as kept in the catalog snapshot; years are formatted for display, not converted
+BOOKS_TABLE_COLUMNS = ["book_title", "book_authors", "categories", "publication_year", "averageRating",
+                       "ratingsCount", "isEbook", "amount_retailPrice", "currencyCode_retailPrice", "retail_price_usd"]
+BOOKS_TABLE_FORMAT = {"publication_year": st.column_config.NumberColumn(format="%d")}
+
 COUNT_BOOKS = """
     SELECT COUNT(*) as total_books FROM books
 """
@@ -93,40 +337,40 @@ PUBLISHER_RATINGS = """
 
 TOP_EXPENSIVE_BOOKS = """
     SELECT 
-        book_title,
-        amount_retailPrice,
-        currencyCode_retailPrice,
-        book_authors
-    FROM books
-    WHERE amount_retailPrice IS NOT NULL
-    ORDER BY amount_retailPrice DESC
+        b.book_title,
+        b.retail_price_usd,
+        b.amount_retailPrice,
+        b.currencyCode_retailPrice,
+        d.book_authors
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    WHERE b.retail_price_usd IS NOT NULL
+    ORDER BY b.retail_price_usd DESC
     LIMIT 5
 """
 
 PUBLISHED_AFTER_2010 = """
     SELECT 
-        book_title,
-        publication_year,
-        pageCount,
-        book_authors
-    FROM books
-    WHERE publication_year > 2010 
-    AND pageCount >= 500
-    ORDER BY publication_year, pageCount DESC;
+        b.book_title,
+        b.publication_year,
+        b.pageCount,
+        d.book_authors
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    WHERE b.publication_year > 2010 
+    AND b.pageCount >= 500
+    ORDER BY b.publication_year, b.pageCount DESC;
 """
 
 DISCOUNTED_BOOKS = """
     SELECT 
         book_title,
-        amount_listPrice,
-        amount_retailPrice,
-        ROUND(((amount_listPrice - amount_retailPrice) / amount_listPrice * 100), 2) as discount_percentage
+        list_price_usd,
+        retail_price_usd,
+        discount_pct as discount_percentage
     FROM books
-    WHERE amount_listPrice IS NOT NULL 
-    AND amount_retailPrice IS NOT NULL
-    AND amount_listPrice > amount_retailPrice
-    AND ((amount_listPrice - amount_retailPrice) / amount_listPrice * 100) > 20
-    ORDER BY discount_percentage DESC;
+    WHERE discount_pct > 20
+    ORDER BY discount_pct DESC;
 """
 
 AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL = """
@@ -142,17 +386,42 @@ AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL = """
     GROUP BY isEbook;
 """
 
-TOP_AUTHORS = """
+# Aggregated list views return a count plus at most this many sample members per row;
+# the full member list is fetched page by page through the DRILLDOWN_QUERIES
+MEMBER_SAMPLE_SIZE = 3
+
+TOP_AUTHORS = f"""
+    WITH top_authors AS (
+        SELECT 
+            author_id,
+            COUNT(*) as book_count
+        FROM book_authors
+        GROUP BY author_id
+        ORDER BY book_count DESC
+        LIMIT 3
+    ),
+    ranked_books AS (
+        SELECT 
+            ba.author_id,
+            b.book_title,
+            ROW_NUMBER() OVER (
+                PARTITION BY ba.author_id
+                ORDER BY COALESCE(b.ratingsCount, 0) DESC, b.book_title
+            ) as book_rank
+        FROM top_authors t
+        JOIN book_authors ba ON ba.author_id = t.author_id
+        JOIN books b ON ba.book_id = b.book_id
+    )
     SELECT 
+        a.author_id,
         a.author_name,
-        COUNT(DISTINCT ba.book_id) as book_count,
-        GROUP_CONCAT(b.book_title) as books
-    FROM book_authors ba
-    JOIN authors a ON ba.author_id = a.author_id
-    JOIN books b ON ba.book_id = b.book_id
-    GROUP BY a.author_id, a.author_name  -- Group by both ID and name
-    ORDER BY book_count DESC
-    LIMIT 3;
+        t.book_count,
+        GROUP_CONCAT(r.book_title ORDER BY r.book_rank SEPARATOR '; ') as sample_books
+    FROM top_authors t
+    JOIN authors a ON a.author_id = t.author_id
+    JOIN ranked_books r ON r.author_id = t.author_id AND r.book_rank <= {MEMBER_SAMPLE_SIZE}
+    GROUP BY a.author_id, a.author_name, t.book_count
+    ORDER BY t.book_count DESC;
 """
 
 PUBLISHER_WITH_MORE_THAN_10_BOOKS = """
@@ -179,16 +448,33 @@ AVERAGE_PAGE_COUNT_PER_CATEGORY = """
     ORDER BY avg_pages DESC;
 """
 
-BOOKS_WITH_MORE_THAN_3_AUTHORS = """
+BOOKS_WITH_MORE_THAN_3_AUTHORS = f"""
+    WITH many_authors AS (
+        SELECT 
+            book_id,
+            COUNT(*) as author_count
+        FROM book_authors
+        GROUP BY book_id
+        HAVING COUNT(*) > 3
+    ),
+    ranked_authors AS (
+        SELECT 
+            ba.book_id,
+            a.author_name,
+            ROW_NUMBER() OVER (PARTITION BY ba.book_id ORDER BY a.author_name) as author_rank
+        FROM many_authors m
+        JOIN book_authors ba ON ba.book_id = m.book_id
+        JOIN authors a ON ba.author_id = a.author_id
+    )
     SELECT 
+        b.book_id,
         b.book_title,
-        COUNT(DISTINCT ba.author_id) as author_count,
-        GROUP_CONCAT(a.author_name) as authors
-    FROM books b
-    JOIN book_authors ba ON b.book_id = ba.book_id
-    JOIN authors a ON ba.author_id = a.author_id
-    GROUP BY b.book_id, b.book_title
-    HAVING COUNT(DISTINCT ba.author_id) > 3;
+        m.author_count,
+        GROUP_CONCAT(r.author_name ORDER BY r.author_rank SEPARATOR '; ') as sample_authors
+    FROM many_authors m
+    JOIN books b ON b.book_id = m.book_id
+    JOIN ranked_authors r ON r.book_id = m.book_id AND r.author_rank <= {MEMBER_SAMPLE_SIZE}
+    GROUP BY b.book_id, b.book_title, m.author_count;
 """
 
 RATINGS_GREATER_THAN_AVERAGE_RATING = """
@@ -205,42 +491,175 @@ RATINGS_GREATER_THAN_AVERAGE_RATING = """
     ORDER BY ratingsCount DESC;
 """
 
-SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR = """
+SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR = f"""
+    WITH author_years AS (
+        SELECT 
+            ba.author_id,
+            b.publication_year,
+            COUNT(*) as books_in_year
+        FROM book_authors ba
+        JOIN books b ON ba.book_id = b.book_id
+        GROUP BY ba.author_id, b.publication_year
+        HAVING COUNT(*) > 1
+    ),
+    ranked_books AS (
+        SELECT 
+            ay.author_id,
+            ay.publication_year,
+            b.book_title,
+            ROW_NUMBER() OVER (
+                PARTITION BY ay.author_id, ay.publication_year
+                ORDER BY COALESCE(b.ratingsCount, 0) DESC, b.book_title
+            ) as book_rank
+        FROM author_years ay
+        JOIN book_authors ba ON ba.author_id = ay.author_id
+        JOIN books b ON ba.book_id = b.book_id AND b.publication_year <=> ay.publication_year
+    )
     SELECT 
+        a.author_id,
         a.author_name,
-        b1.publication_year,
-        COUNT(*) as books_in_year,
-        GROUP_CONCAT(b1.book_title) as book_titles
-    FROM books b1
-    JOIN book_authors ba1 ON b1.book_id = ba1.book_id
-    JOIN authors a ON ba1.author_id = a.author_id
-    GROUP BY a.author_id, a.author_name, b1.publication_year
-    HAVING COUNT(*) > 1
-    ORDER BY b1.publication_year DESC, books_in_year DESC;
+        ay.publication_year,
+        ay.books_in_year,
+        GROUP_CONCAT(r.book_title ORDER BY r.book_rank SEPARATOR '; ') as sample_titles
+    FROM author_years ay
+    JOIN authors a ON a.author_id = ay.author_id
+    JOIN ranked_books r ON r.author_id = ay.author_id
+        AND r.publication_year <=> ay.publication_year
+        AND r.book_rank <= {MEMBER_SAMPLE_SIZE}
+    GROUP BY a.author_id, a.author_name, ay.publication_year, ay.books_in_year
+    ORDER BY ay.publication_year DESC, ay.books_in_year DESC;
+"""
+
+
+# Full member lists behind the aggregated views, one indexed page at a time (LIMIT/OFFSET last)
+AUTHOR_BOOKS = """
+    SELECT 
+        b.book_title,
+        b.publication_year,
+        p.publisher_name,
+        b.averageRating
+    FROM book_authors ba
+    JOIN books b ON ba.book_id = b.book_id
+    LEFT JOIN publishers p ON b.publisher_id = p.publisher_id
+    WHERE ba.author_id = %s
+    ORDER BY b.publication_year DESC, b.book_title
+    LIMIT %s OFFSET %s
+"""
+
+AUTHOR_YEAR_BOOKS = """
+    SELECT 
+        b.book_title,
+        p.publisher_name,
+        b.averageRating
+    FROM book_authors ba
+    JOIN books b ON ba.book_id = b.book_id
+    LEFT JOIN publishers p ON b.publisher_id = p.publisher_id
+    WHERE ba.author_id = %s
+    AND b.publication_year <=> %s
+    ORDER BY p.publisher_name, b.book_title
+    LIMIT %s OFFSET %s
+"""
+
+BOOK_AUTHOR_LIST = """
+    SELECT 
+        a.author_name
+    FROM book_authors ba
+    JOIN authors a ON ba.author_id = a.author_id
+    WHERE ba.book_id = %s
+    ORDER BY a.author_name
+    LIMIT %s OFFSET %s
+"""
+
+DRILLDOWN_QUERIES = {
+    "AUTHOR_BOOKS": AUTHOR_BOOKS,
+    "AUTHOR_YEAR_BOOKS": AUTHOR_YEAR_BOOKS,
+    "BOOK_AUTHOR_LIST": BOOK_AUTHOR_LIST,
+    "CATEGORY_NODE_BOOKS": CATEGORY_NODE_BOOKS,
+}
+
+DRILLDOWN_PAGE_SIZE = 25
+
+
+def drilldown_page(name, params, page, page_size=DRILLDOWN_PAGE_SIZE):
+    """One page (counting from 0) of a drill-down member list"""
+    # numpy scalars from a result row become plain Python values for the driver, missing values NULL
+    params = tuple(None if pd.isna(value) else value.item() if hasattr(value, "item") else value
+                   for value in params)
+    return run_query(DRILLDOWN_QUERIES[name], params + (page_size, page * page_size))
+
+
+def render_drilldown(data, name, key_columns, label_columns, count_column, title):
+    """Select a row of an aggregated view and page through its full member list"""
+    with st.expander(f"🔎 {title}"):
+        labels = [f"{n + 1}. " + " · ".join(str(data.at[i, column]) for column in label_columns)
+                  for n, i in enumerate(data.index)]
+        choice = st.selectbox("Select a row", labels, key=f"drilldown_row_{name}")
+        position = data.index[labels.index(choice)]
+        total = int(data.at[position, count_column])
+        pages = max(1, -(-total // DRILLDOWN_PAGE_SIZE))
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"drilldown_page_{name}_{position}")
+        members = drilldown_page(name, [data.at[position, column] for column in key_columns], page - 1)
+        first = (page - 1) * DRILLDOWN_PAGE_SIZE
+        st.caption(f"Showing {first + 1:,}-{first + len(members):,} of {total:,}")
+        st.dataframe(members, use_container_width=True)
+
+
+KEYWORD_SEARCH = """
+    SELECT 
+        b.book_title,
+        d.book_authors,
+        b.publication_year,
+        b.averageRating
+    FROM books b
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    WHERE LOWER(b.book_title) LIKE LOWER(%s)
+    ORDER BY COALESCE(b.averageRating, -1) DESC
 """
 
 
 def search_books_by_keyword(keyword):
-    return f"""
-        SELECT 
-            book_title,
-            book_authors,
-            publication_year,
-            averageRating
-        FROM books
-        WHERE LOWER(book_title) LIKE LOWER('%{keyword}%')
-        ORDER BY COALESCE(averageRating, -1) DESC
-    """
+    """Keyword search query and its parameters (the keyword is never formatted into the SQL)"""
+    return KEYWORD_SEARCH, (f"%{keyword}%",)
+
+
+ISBN_LOOKUP = """
+    SELECT DISTINCT
+        i.canonical_isbn,
+        b.book_id,
+        b.book_title,
+        d.book_authors,
+        b.publication_year
+    FROM industry_identifiers i
+    JOIN books b ON i.book_id = b.book_id
+    LEFT JOIN book_display d ON b.book_id = d.book_id
+    WHERE i.canonical_isbn IN ({placeholders})
+"""
+
+
+def resolve_isbns(isbns):
+    """Resolve a batch of ISBN-10/ISBN-13 values to books in a single query"""
+    requested = pd.DataFrame({"isbn": list(isbns)})
+    requested["canonical_isbn"] = requested["isbn"].map(normalize_isbn)
+
+    keys = requested["canonical_isbn"].dropna().unique().tolist()
+    if keys:
+        query = ISBN_LOOKUP.format(placeholders=", ".join(["%s"] * len(keys)))
+        found = run_query(query, tuple(keys))
+    else:
+        found = pd.DataFrame(columns=["canonical_isbn", "book_id", "book_title", "book_authors", "publication_year"])
+
+    return requested.merge(found, on="canonical_isbn", how="left")
 
 
 YEAR_WITH_HIGHEST_AVERAGE_BOOK_PRICE = """
     SELECT 
         publication_year,
-        ROUND(AVG(amount_retailPrice), 2) as avg_price,
+        ROUND(AVG(retail_price_usd), 2) as avg_price,
         COUNT(*) as book_count
     FROM books
     WHERE publication_year IS NOT NULL 
-    AND amount_retailPrice IS NOT NULL
+    AND retail_price_usd IS NOT NULL
     GROUP BY publication_year
     ORDER BY avg_price DESC
     LIMIT 1;
@@ -281,20 +700,55 @@ AUTHORS_PUBLISHED_FOR_3_CONSECUTIVE_YEARS = """
     WHERE consecutive_years >= 3;
 """
 
-AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS = """
+AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS = f"""
+    WITH multi_publisher AS (
+        SELECT 
+            ba.author_id,
+            b.publication_year,
+            COUNT(DISTINCT b.publisher_id) as publisher_count,
+            COUNT(*) as book_count
+        FROM book_authors ba
+        JOIN books b ON ba.book_id = b.book_id
+        GROUP BY ba.author_id, b.publication_year
+        HAVING COUNT(DISTINCT b.publisher_id) > 1
+    ),
+    publisher_books AS (
+        SELECT 
+            m.author_id,
+            m.publication_year,
+            b.publisher_id,
+            COUNT(*) as publisher_books
+        FROM multi_publisher m
+        JOIN book_authors ba ON ba.author_id = m.author_id
+        JOIN books b ON ba.book_id = b.book_id AND b.publication_year <=> m.publication_year
+        GROUP BY m.author_id, m.publication_year, b.publisher_id
+    ),
+    ranked_publishers AS (
+        SELECT 
+            pb.author_id,
+            pb.publication_year,
+            p.publisher_name,
+            ROW_NUMBER() OVER (
+                PARTITION BY pb.author_id, pb.publication_year
+                ORDER BY pb.publisher_books DESC, p.publisher_name
+            ) as publisher_rank
+        FROM publisher_books pb
+        JOIN publishers p ON p.publisher_id = pb.publisher_id
+    )
     SELECT 
+        a.author_id,
         a.author_name,
-        b.publication_year,
-        COUNT(DISTINCT b.publisher_id) as publisher_count,
-        COUNT(*) as book_count,
-        GROUP_CONCAT(DISTINCT p.publisher_name) as publishers
-    FROM authors a
-    JOIN book_authors ba ON a.author_id = ba.author_id
-    JOIN books b ON ba.book_id = b.book_id
-    JOIN publishers p ON b.publisher_id = p.publisher_id
-    GROUP BY a.author_id, a.author_name, b.publication_year
-    HAVING COUNT(DISTINCT b.publisher_id) > 1
-    ORDER BY b.publication_year DESC, book_count DESC;
+        m.publication_year,
+        m.publisher_count,
+        m.book_count,
+        GROUP_CONCAT(r.publisher_name ORDER BY r.publisher_rank SEPARATOR '; ') as sample_publishers
+    FROM multi_publisher m
+    JOIN authors a ON a.author_id = m.author_id
+    JOIN ranked_publishers r ON r.author_id = m.author_id
+        AND r.publication_year <=> m.publication_year
+        AND r.publisher_rank <= {MEMBER_SAMPLE_SIZE}
+    GROUP BY a.author_id, a.author_name, m.publication_year, m.publisher_count, m.book_count
+    ORDER BY m.publication_year DESC, m.book_count DESC;
 """
 
 AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL = """
@@ -303,10 +757,10 @@ AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL = """
             WHEN isEbook THEN 'eBook'
             ELSE 'Physical Book'
         END as book_type,
-        ROUND(AVG(amount_retailPrice), 2) as avg_price,
+        ROUND(AVG(retail_price_usd), 2) as avg_price,
         COUNT(*) as book_count
     FROM books
-    WHERE amount_retailPrice IS NOT NULL
+    WHERE retail_price_usd IS NOT NULL
     GROUP BY isEbook;
 """
 
@@ -319,14 +773,15 @@ BOOKS_WITH_RATING_OUTLIERS = """
         WHERE averageRating IS NOT NULL
     )
     SELECT 
-        book_title,
-        averageRating,
-        ratingsCount,
-        ROUND((averageRating - mean_rating)/stddev_rating, 2) as z_score
-    FROM books, stats
-    WHERE averageRating IS NOT NULL
-    AND ABS(averageRating - mean_rating) > 2 * stddev_rating
-    ORDER BY ABS(averageRating - mean_rating) DESC;
+        b.book_title,
+        b.averageRating,
+        b.ratingsCount,
+        ROUND((b.averageRating - mean_rating)/stddev_rating, 2) as z_score
+    FROM stats
+    JOIN books b
+        ON b.averageRating > mean_rating + 2 * stddev_rating
+        OR b.averageRating < mean_rating - 2 * stddev_rating
+    ORDER BY ABS(b.averageRating - mean_rating) DESC;
 """
 
 PUBLISHER_WITH_HIGHEST_AVERAGE_RATING = """
@@ -343,6 +798,81 @@ PUBLISHER_WITH_HIGHEST_AVERAGE_RATING = """
     LIMIT 1;
 """
 
+# Registry of every static query the dashboard runs, keyed by constant name
+ANALYSIS_QUERIES = {
+    "BOOKS_TABLE": BOOKS_TABLE,
+    "COUNT_BOOKS": COUNT_BOOKS,
+    "EBOOK_VS_PHYSICAL": EBOOK_VS_PHYSICAL,
+    "PUBLISHER_BOOK_COUNT": PUBLISHER_BOOK_COUNT,
+    "PUBLISHER_RATINGS": PUBLISHER_RATINGS,
+    "TOP_EXPENSIVE_BOOKS": TOP_EXPENSIVE_BOOKS,
+    "PUBLISHED_AFTER_2010": PUBLISHED_AFTER_2010,
+    "DISCOUNTED_BOOKS": DISCOUNTED_BOOKS,
+    "AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL": AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL,
+    "TOP_AUTHORS": TOP_AUTHORS,
+    "PUBLISHER_WITH_MORE_THAN_10_BOOKS": PUBLISHER_WITH_MORE_THAN_10_BOOKS,
+    "AVERAGE_PAGE_COUNT_PER_CATEGORY": AVERAGE_PAGE_COUNT_PER_CATEGORY,
+    "BOOKS_WITH_MORE_THAN_3_AUTHORS": BOOKS_WITH_MORE_THAN_3_AUTHORS,
+    "RATINGS_GREATER_THAN_AVERAGE_RATING": RATINGS_GREATER_THAN_AVERAGE_RATING,
+    "SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR": SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR,
+    "YEAR_WITH_HIGHEST_AVERAGE_BOOK_PRICE": YEAR_WITH_HIGHEST_AVERAGE_BOOK_PRICE,
+    "AUTHORS_PUBLISHED_FOR_3_CONSECUTIVE_YEARS": AUTHORS_PUBLISHED_FOR_3_CONSECUTIVE_YEARS,
+    "AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS": AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS,
+    "AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL": AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL,
+    "BOOKS_WITH_RATING_OUTLIERS": BOOKS_WITH_RATING_OUTLIERS,
+    "PUBLISHER_WITH_HIGHEST_AVERAGE_RATING": PUBLISHER_WITH_HIGHEST_AVERAGE_RATING,
+}
+
+# Registered query behind each analysis view
+ANALYSIS_VIEWS = {
+    "eBooks vs Physical Books Distribution": "EBOOK_VS_PHYSICAL",
+    "Top 5 Most Expensive Books": "TOP_EXPENSIVE_BOOKS",
+    "Publishers with Most Books": "PUBLISHER_BOOK_COUNT",
+    "Top Publishers by Rating": "PUBLISHER_RATINGS",
+    "Long Books After 2010": "PUBLISHED_AFTER_2010",
+    "Books with Major Discounts": "DISCOUNTED_BOOKS",
+    "eBook vs Physical Book Page Count": "AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL",
+    "Top Authors Analysis": "TOP_AUTHORS",
+    "Publishers with More Than 10 Books": "PUBLISHER_WITH_MORE_THAN_10_BOOKS",
+    "Category Page Count Analysis": "AVERAGE_PAGE_COUNT_PER_CATEGORY",
+    "Books with Many Authors": "BOOKS_WITH_MORE_THAN_3_AUTHORS",
+    "Books with Above Average Ratings": "RATINGS_GREATER_THAN_AVERAGE_RATING",
+    "Same Author Same Year": "SAME_AUTHOR_PUBLISHED_IN_SAME_YEAR",
+    "Year with Highest Book Price": "YEAR_WITH_HIGHEST_AVERAGE_BOOK_PRICE",
+    "Authors Who Published 3 Consecutive Years": "AUTHORS_PUBLISHED_FOR_3_CONSECUTIVE_YEARS",
+    "Authors in Multiple Publishers": "AUTHORS_PUBLISHED_SAME_YEAR_DIFFERENT_PUBLISHERS",
+    "eBook vs Physical Book Prices": "AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL",
+    "Rating Outlier Analysis": "BOOKS_WITH_RATING_OUTLIERS",
+}
+
+
+def latest_history_date():
+    """Date of the most recent price and rating history entry, or None without history"""
+    try:
+        latest = run_query("SELECT MAX(observed_on) as observed_on FROM book_history")
+    except Exception:
+        return None
+    return latest['observed_on'].iloc[0] if not latest.empty else None
+
+
+def category_tree_levels():
+    """Number of levels in the category hierarchy, 0 before it has been built"""
+    try:
+        depth = run_query("SELECT MAX(depth) as depth FROM category_nodes")
+    except Exception:
+        return 0
+    return 0 if depth.empty or pd.isna(depth['depth'].iloc[0]) else int(depth['depth'].iloc[0]) + 1
+
+
+def filtered_books_query(search_term):
+    """BOOKS_TABLE restricted to titles or authors containing the search term"""
+    query = as_subquery(BOOKS_TABLE) + """
+    WHERE LOWER(b.book_title) LIKE %s
+    OR LOWER(d.book_authors) LIKE %s
+"""
+    pattern = f"%{search_term.lower()}%"
+    return query, (pattern, pattern)
+
 
 def book_distribution_pie_chart(data):
     plt.clf()
@@ -379,7 +909,7 @@ def expense_bar_chart(data):
     colors = sns.color_palette("cubehelix", len(data))
 
     bars = ax.bar(range(len(data)),
-                  data['amount_retailPrice'],
+                  data['retail_price_usd'],
                   color=colors)
 
     ax.set_title('Top 5 Most Expensive Books',
@@ -387,8 +917,7 @@ def expense_bar_chart(data):
                  fontsize=14,
                  fontweight='bold')
     ax.set_xlabel('Book Titles', fontsize=12)
-    ax.set_ylabel(f'Price ({data["currencyCode_retailPrice"].iloc[0]})',
-                  fontsize=12)
+    ax.set_ylabel('Price (USD)', fontsize=12)
 
     ax.set_xticks(range(len(data)))
     ax.set_xticklabels(data['book_title'],
@@ -476,13 +1005,20 @@ def year_pages_chart(data):
     plt.clf()
     fig, ax = plt.subplots(figsize=(12, 6))
 
-    # Scatter plot
-    scatter = ax.scatter(data['publication_year'],
-                         data['pageCount'],
-                         s=100,  # Point size
-                         alpha=0.6,
-                         c=data['pageCount'],  # Color based on page count
-                         cmap='viridis')
+    if len(data) > MAX_SCATTER_POINTS:
+        # Large result: books per year and page-count bin instead of one marker per book
+        year_edges, page_edges, counts = year_page_bins(data['publication_year'], data['pageCount'])
+        mesh = ax.pcolormesh(year_edges, page_edges, np.ma.masked_equal(counts.T, 0), cmap='viridis')
+        plt.colorbar(mesh, label='Number of Books')
+    else:
+        # Scatter plot
+        scatter = ax.scatter(data['publication_year'],
+                             data['pageCount'],
+                             s=100,  # Point size
+                             alpha=0.6,
+                             c=data['pageCount'],  # Color based on page count
+                             cmap='viridis')
+        plt.colorbar(scatter, label='Page Count')
 
     ax.set_title('Books Published After 2010 with 500+ Pages',
                  pad=20,
@@ -492,7 +1028,6 @@ def year_pages_chart(data):
     ax.set_xlabel('Publication Year', fontsize=12)
     ax.set_ylabel('Page Count', fontsize=12)
 
-    plt.colorbar(scatter, label='Page Count')
     ax.grid(True, alpha=0.3)
 
     plt.tight_layout()
@@ -503,6 +1038,10 @@ def discount_chart(data):
     plt.clf()
     fig, ax = plt.subplots(figsize=(12, 6))
 
+    # Largest discounts get their own bar, the rest share one "Other" bar with their average
+    total_books = len(data)
+    data = top_n_other(data, 'book_title', 'discount_percentage')
+
     # Create bar chart for discount percentages
     bars = ax.bar(range(len(data)),
                   data['discount_percentage'],
@@ -525,7 +1064,11 @@ def discount_chart(data):
                 ha='center',
                 va='bottom')
 
-    plt.xticks([])  # Hide x-axis labels as they would be too crowded
+    if len(data) < total_books:
+        # Only the folded bar is labelled
+        plt.xticks([len(data) - 1], [data['book_title'].iloc[-1]])
+    else:
+        plt.xticks([])  # Hide x-axis labels as they would be too crowded
 
     plt.tight_layout()
     return fig
@@ -573,6 +1116,10 @@ def rating_outliers_chart(data):
     plt.clf()
     fig, ax = plt.subplots(figsize=(7, 3))
 
+    # Keep the shape of large results with a bounded number of markers
+    total_books = len(data)
+    data = downsample_series(data, 'ratingsCount', 'averageRating')
+
     # Scatter plot
     scatter = ax.scatter(data['ratingsCount'],
                          data['averageRating'],
@@ -581,7 +1128,10 @@ def rating_outliers_chart(data):
                          alpha=0.8,
                          s=80)
 
-    ax.set_title('Rating Outliers Distribution',
+    title = 'Rating Outliers Distribution'
+    if len(data) < total_books:
+        title += f' ({len(data):,} of {total_books:,} shown)'
+    ax.set_title(title,
                  pad=20,
                  fontsize=12,
                  fontweight='bold')
@@ -640,18 +1190,209 @@ def top_publisher_chart(data):
     return fig
 
 
+def price_history_chart(data):
+    plt.clf()
+    fig, ax1 = plt.subplots(figsize=(10, 4))
+
+    # Price on the left axis, number of ratings on the right
+    ax1.step(data['observed_on'].astype(str), data['retail_price_usd'], where='post',
+             color='#0072BD', marker='o', label='Retail price (USD)')
+    ax1.set_ylabel('Retail price (USD)', fontsize=10)
+    ax2 = ax1.twinx()
+    ax2.step(data['observed_on'].astype(str), data['ratingsCount'], where='post',
+             color='#D95319', marker='s', label='Ratings count')
+    ax2.set_ylabel('Ratings count', fontsize=10)
+    ax2.grid(False)
+
+    ax1.set_title('Price and Ratings History',
+                  pad=20,
+                  fontsize=12,
+                  fontweight='bold')
+    plt.setp(ax1.get_xticklabels(), rotation=45, ha='right')
+
+    plt.tight_layout()
+    return fig
+
+
+# Chart drawn for each registered analysis query
+ANALYSIS_CHARTS = {
+    "EBOOK_VS_PHYSICAL": book_distribution_pie_chart,
+    "TOP_EXPENSIVE_BOOKS": expense_bar_chart,
+    "PUBLISHER_BOOK_COUNT": publisher_books_chart,
+    "PUBLISHER_RATINGS": publisher_rating_chart,
+    "PUBLISHED_AFTER_2010": year_pages_chart,
+    "DISCOUNTED_BOOKS": discount_chart,
+    "AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL": page_count_comparison,
+    "BOOKS_WITH_RATING_OUTLIERS": rating_outliers_chart,
+    "PUBLISHER_WITH_HIGHEST_AVERAGE_RATING": top_publisher_chart,
+}
+
+
+def chart_image(name, data, version=None):
+    """PNG of an analysis chart, drawn once per data version and shared through the result cache"""
+    key = f"{name}:approximate" if data.attrs.get("approximate") else name
+    return cached_figure(version or current_data_version(), key, ANALYSIS_CHARTS[name], data)
+
+
+def show_chart(name, data):
+    st.image(chart_image(name, data), use_column_width="always")
+
+
+def render_facet_filters(index):
+    """Facet filters with live counts; returns the index query result, or None when no filter is set"""
+    # Counts depend on the other facets' selections, so evaluate the current state before drawing
+    selections = {facet: st.session_state.get(f"facet_{facet}", []) for facet in FACET_LABELS}
+    bounds = {facet: index.range_bounds(facet) for facet in RANGE_FACETS}
+    ranges = {}
+    for facet, (low, high) in bounds.items():
+        chosen = st.session_state.get(f"facet_{facet}")
+        if chosen is not None and tuple(chosen) != (low, high):
+            ranges[facet] = chosen
+    result = index.query(selections, ranges)
+
+    with st.expander("🎛️ Filter books", expanded=bool(selections and any(selections.values()) or ranges)):
+        col1, col2 = st.columns(2)
+        for position, facet in enumerate([*VALUE_FACETS, CATEGORY_FACET]):
+            counts = result["counts"][facet]
+            # Options keep the unfiltered order so the widgets stay put while the counts change
+            options = list(index.totals[facet].index)
+            with (col1 if position % 2 == 0 else col2):
+                st.multiselect(FACET_LABELS[facet], options, key=f"facet_{facet}",
+                               format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0):,})")
+
+        col1, col2 = st.columns(2)
+        year_low, year_high = bounds["publication_year"]
+        rating_low, rating_high = bounds["averageRating"]
+        with col1:
+            if year_low < year_high:
+                st.slider(RANGE_FACETS["publication_year"], int(year_low), int(year_high),
+                          (int(year_low), int(year_high)), key="facet_publication_year")
+        with col2:
+            if rating_low < rating_high:
+                st.slider(RANGE_FACETS["averageRating"], float(rating_low), float(rating_high),
+                          (float(rating_low), float(rating_high)), step=0.5, key="facet_averageRating")
+
+        st.caption(f"{result['matched']:,} of {index.size:,} books match · "
+                   f"answered in {result['milliseconds']:.1f} ms")
+
+    if not ranges and not any(selections.values()):
+        return None
+    return result
+
+
+def render_filtered_download(version, filtered_df):
+    """CSV download of the facet-filtered books, built only on request and kept while the rows stay the same"""
+    # The data version and row positions identify the filtered rows without comparing their values
+    rows_key = (version, hashlib.sha1(filtered_df.index.to_numpy().tobytes()).hexdigest())
+    prepared = st.session_state.get("facet_download_csv")
+    if prepared is not None and prepared[0] != rows_key:
+        del st.session_state["facet_download_csv"]
+        prepared = None
+
+    if prepared is None:
+        if st.button(f"Prepare CSV of {len(filtered_df):,} filtered books", key="facet_download_prepare"):
+            prepared = (rows_key, filtered_df.to_csv(index=False))
+            st.session_state["facet_download_csv"] = prepared
+    if prepared is not None:
+        st.download_button(f"⬇️ Download filtered books (CSV, {format_size(len(prepared[1]))})", prepared[1],
+                           file_name="filtered_books.csv", key="facet_download")
+
+
+def render_snapshot_memory():
+    """Memory held by the shared catalog snapshots, one line per data version still referenced"""
+    with st.expander("🧠 Catalog snapshot memory"):
+        for snapshot in CATALOG_SNAPSHOTS.memory_report():
+            st.caption(f"{'Current' if snapshot['current'] else 'Retired'} version {snapshot['version']}: "
+                       f"{snapshot['books']:,} books · {format_size(snapshot['frame_bytes'])} table + "
+                       f"{format_size(snapshot['facet_index_bytes'])} facet index, shared by all sessions · "
+                       f"loaded in {snapshot['load_seconds']:.2f}s")
+
+
+# Seconds between refreshes of the Ingest Monitor while an ingest runs
+INGEST_POLL_SECONDS = 2
+
+
+def render_ingest_monitor(progress):
+    """Throughput, ETA and running counts of the current or last ingest, from its progress file"""
+    estimate = estimate_progress(progress)
+    keys = progress["keys"]
+    stage = f" · stage: {progress['stage']}" if progress["stage"] else ""
+    st.caption(f"Ingest {progress['status']}{stage} · "
+               f"updated {format_duration(time.time() - progress['updated_at'])} ago")
+    if progress["error"]:
+        st.error(f"The last ingest failed: {progress['error']}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Books imported", f"{estimate['imported']:,}", f"of ~{estimate['expected']:,} fetched")
+    col2.metric("Throughput", f"{estimate['books_per_second']:.1f} books/s")
+    col3.metric("Search keys done", f"{estimate['keys_done']} / {len(keys)}")
+    col4.metric("ETA", "-" if estimate["eta_seconds"] is None else format_duration(estimate["eta_seconds"]),
+                f"elapsed {format_duration(estimate['elapsed_seconds'])}", delta_color="off")
+    if estimate["expected"]:
+        st.progress(min(estimate["processed"] / estimate["expected"], 1.0))
+
+    st.subheader("🔑 Search Keys")
+    key_rows = []
+    for key, counts in keys.items():
+        seconds = ((counts["finished_at"] or progress["updated_at"]) - counts["started_at"]
+                   if counts["started_at"] else 0.0)
+        processed = counts["imported"] + counts["failed"]
+        key_rows.append({"search_key": key, "status": counts["status"], "fetched": counts["fetched"],
+                         "imported": counts["imported"], "failed": counts["failed"], "seconds": round(seconds, 1),
+                         "books_per_second": round(processed / seconds, 1) if seconds else None})
+    st.dataframe(pd.DataFrame(key_rows), use_container_width=True, hide_index=True)
+
+    st.subheader("⏱️ Stages")
+    st.dataframe(pd.DataFrame([{"stage": name, "seconds": round(stats["seconds"], 1), "items": stats["items"],
+                                "items_per_second": round(stats["items"] / stats["seconds"], 1)
+                                if stats["seconds"] and stats["items"] else None}
+                               for name, stats in progress["stages"].items()]),
+                 use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("🏢 Top Publishers So Far")
+        if progress["publishers"]:
+            st.bar_chart(pd.Series(progress["publishers"], name="books"))
+    with col2:
+        st.subheader("📱 eBook vs Physical So Far")
+        if progress["formats"]:
+            st.bar_chart(pd.Series(progress["formats"], name="books"))
+    st.subheader("📅 Books by Publication Year So Far")
+    if progress["years"]:
+        st.bar_chart(pd.Series(progress["years"], name="books"))
+
+
+# Warm every analysis once per data version in the background, so no session pays the cold path
+@st.cache_resource
+def start_cache_warmup(version):
+    from Cache_Warmup import warm_caches  # Cache_Warmup imports this module
+    thread = threading.Thread(target=warm_caches, name="cache-warmup", daemon=True,
+                              kwargs={"version": version, "backend": init_backend(), "snapshot": True})
+    # The snapshot loader's workers inherit this context, like run_queries' workers do
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
+
+
 def main():
     st.set_page_config(page_title="BookScape Explorer", page_icon="📚", layout="wide")
     st.header("📖 _:orange[Books Data Analysis]_", divider="rainbow")
 
     try:
+        start_cache_warmup(current_data_version())
+
         # Default view - Books table
         st.subheader("📚 Books Database")
-        books_df = run_query(BOOKS_TABLE)
-        total_count = run_query(COUNT_BOOKS).iloc[0]['total_books']
-        st.write(f"Total books in database: {total_count}")
-        books_df['publication_year'] = books_df['publication_year'].apply(
-            lambda x: str(int(x)) if pd.notnull(x) else 'N/A')
+        # Served from the shared catalog snapshot: a view over its columns, never a per-session copy
+        snapshot = catalog_snapshot()
+        books_df = snapshot.view(BOOKS_TABLE_COLUMNS)
+        st.write(f"Total books in database: {snapshot.size}")
+
+        # Faceted filters answer from the in-memory index, without a database round trip
+        facet_result = render_facet_filters(snapshot.facets)
+        if facet_result is not None:
+            books_df = snapshot.view(BOOKS_TABLE_COLUMNS, facet_result["rows"])
 
         # Add search functionality
         search_term = st.text_input("🔍 Search books by title or author:")
@@ -661,10 +1402,19 @@ def main():
                 books_df['book_authors'].str.contains(search_term, case=False, na=False)
                 ]
             st.write(f"Found {len(filtered_df)} matching books")
-            st.dataframe(filtered_df, use_container_width=True)
+            st.dataframe(filtered_df, use_container_width=True, column_config=BOOKS_TABLE_FORMAT)
         else:
+            filtered_df = books_df
             st.write(f"Showing all {len(books_df)} books")
-            st.dataframe(books_df, use_container_width=True)
+            st.dataframe(books_df, use_container_width=True, column_config=BOOKS_TABLE_FORMAT)
+        render_snapshot_memory()
+
+        if facet_result is not None:
+            render_filtered_download(snapshot.version, filtered_df)
+        elif search_term:
+            render_export("FILTERED_BOOKS", *filtered_books_query(search_term))
+        else:
+            render_export("BOOKS_TABLE", BOOKS_TABLE)
 
         # Separator
         st.markdown("---")
@@ -692,11 +1442,21 @@ def main():
              "Authors in Multiple Publishers",
              "eBook vs Physical Book Prices",
              "Rating Outlier Analysis",
-             "Top Publishers by Rating"]
+             "Top Publishers by Rating",
+             "ISBN Lookup",
+             "Similar Books",
+             "Price & Rating Trends",
+             "Category Hierarchy",
+             "Ingest Monitor"]
         )
 
+        # Views with a sketch-based counterpart can trade exactness for near-constant time
+        if ANALYSIS_VIEWS.get(analysis_option) in APPROXIMATE_ANALYSES:
+            st.toggle("⚡ Approximate mode", key="approximate_mode",
+                      help="Answer from catalog sketches maintained at ingest, with error bounds")
+
         if analysis_option == "eBooks vs Physical Books Distribution":
-            ebook_data = run_query(EBOOK_VS_PHYSICAL)
+            ebook_data = run_analysis("EBOOK_VS_PHYSICAL")
 
             # Display data and visualization
             col1, col2 = st.columns([1, 2])
@@ -715,8 +1475,7 @@ def main():
 
             with col2:
                 st.subheader("📈 Visual Distribution")
-                pie_fig = book_distribution_pie_chart(ebook_data)
-                st.pyplot(pie_fig)
+                show_chart("EBOOK_VS_PHYSICAL", ebook_data)
 
         elif analysis_option == "Top 5 Most Expensive Books":
             expensive_books = run_query(TOP_EXPENSIVE_BOOKS)
@@ -726,21 +1485,20 @@ def main():
             st.dataframe(expensive_books)
 
             st.subheader("📊 Price Comparison")
-            bar_fig = expense_bar_chart(expensive_books)
-            st.pyplot(bar_fig)
+            show_chart("TOP_EXPENSIVE_BOOKS", expensive_books)
 
             # Price statistics
             col1, col2 = st.columns(2)
             with col1:
                 st.metric(
                     "Most Expensive Book",
-                    f"${expensive_books['amount_retailPrice'].max():,.2f}",
+                    f"${expensive_books['retail_price_usd'].max():,.2f}",
                     delta=expensive_books['book_title'].iloc[0]
                 )
             with col2:
                 st.metric(
                     "Average Price (Top 5)",
-                    f"${expensive_books['amount_retailPrice'].mean():,.2f}",
+                    f"${expensive_books['retail_price_usd'].mean():,.2f}",
                     delta="Average of top 5 books"
                 )
         elif analysis_option == "Publishers with Most Books":
@@ -750,8 +1508,7 @@ def main():
             st.dataframe(publisher_books)
 
             st.subheader("📊 Publisher Book Count Visualization")
-            fig = publisher_books_chart(publisher_books)
-            st.pyplot(fig)
+            show_chart("PUBLISHER_BOOK_COUNT", publisher_books)
 
             col1, col2 = st.columns(2)
             with col1:
@@ -779,9 +1536,7 @@ def main():
                 st.dataframe(publisher_ratings)
                 if len(publisher_ratings) > 0:  # Check if we have data
                     st.subheader("📊 Publisher Ratings Visualization")
-                    fig = publisher_rating_chart(publisher_ratings)
-
-                    st.pyplot(fig)
+                    show_chart("PUBLISHER_RATINGS", publisher_ratings)
 
                     col1, col2 = st.columns(2)
                     with col1:
@@ -809,8 +1564,7 @@ def main():
                 st.dataframe(long_books)
 
                 st.subheader("📊 Page Count vs Publication Year")
-                fig = year_pages_chart(long_books)
-                st.pyplot(fig)
+                show_chart("PUBLISHED_AFTER_2010", long_books)
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -834,8 +1588,7 @@ def main():
                 st.dataframe(discounted_books)
 
                 st.subheader("📊 Discount Distribution")
-                fig = discount_chart(discounted_books)
-                st.pyplot(fig)
+                show_chart("DISCOUNTED_BOOKS", discounted_books)
 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -851,7 +1604,7 @@ def main():
                         f"{len(discounted_books)} books"
                     )
                 with col3:
-                    avg_savings = (discounted_books['amount_listPrice'] - discounted_books['amount_retailPrice']).mean()
+                    avg_savings = (discounted_books['list_price_usd'] - discounted_books['retail_price_usd']).mean()
                     st.metric(
                         "Average Savings",
                         f"${avg_savings:.2f}",
@@ -859,15 +1612,14 @@ def main():
                     )
 
         elif analysis_option == "eBook vs Physical Book Page Count":
-            page_count_data = run_query(AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL)
+            page_count_data = run_analysis("AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL")
 
             if not page_count_data.empty:
                 st.subheader("📚 Page Count Comparison")
                 st.dataframe(page_count_data)
 
                 st.subheader("📊 Visualization")
-                fig = page_count_comparison(page_count_data)
-                st.pyplot(fig)
+                show_chart("AVERAGE_PAGE_COUNT_EBOOK_VS_PHYSICAL", page_count_data)
 
                 for _, row in page_count_data.iterrows():
                     st.metric(
@@ -877,11 +1629,13 @@ def main():
                     )
 
         elif analysis_option == "Top Authors Analysis":
-            top_authors = run_query(TOP_AUTHORS)
+            top_authors = run_analysis("TOP_AUTHORS")
 
             if not top_authors.empty:
                 st.subheader("📚 Top Authors by Number of Books")
-                st.dataframe(top_authors[['author_name', 'book_count']])
+                st.dataframe(top_authors.drop(columns=['author_id']))
+                render_drilldown(top_authors, "AUTHOR_BOOKS", ["author_id"], ["author_name"],
+                                 "book_count", "All books of an author")
 
         elif analysis_option == "Publishers with More Than 10 Books":
             many_books = run_query(PUBLISHER_WITH_MORE_THAN_10_BOOKS)
@@ -893,7 +1647,16 @@ def main():
                 st.warning("No data available!")
 
         elif analysis_option == "Category Page Count Analysis":
-            category_pages = run_query(AVERAGE_PAGE_COUNT_PER_CATEGORY)
+            # Leaf categories as stored, or every category rolled up to one level of its path
+            levels = category_tree_levels()
+            grouping = "Category"
+            if levels:
+                grouping = st.radio("Group by", ["Category"] + [f"Level {level}" for level in range(1, levels + 1)],
+                                    horizontal=True, key="category_level")
+            if grouping == "Category":
+                category_pages = run_query(AVERAGE_PAGE_COUNT_PER_CATEGORY)
+            else:
+                category_pages = run_query(CATEGORY_LEVEL_STATS, (int(grouping.split()[-1]) - 1,))
 
             if not category_pages.empty:
                 st.subheader("📚 Category Analysis")
@@ -904,7 +1667,9 @@ def main():
 
             if not many_authors.empty:
                 st.subheader("📚 Books with More Than 3 Authors")
-                st.dataframe(many_authors)
+                st.dataframe(many_authors[['book_title', 'author_count', 'sample_authors']])
+                render_drilldown(many_authors, "BOOK_AUTHOR_LIST", ["book_id"], ["book_title"],
+                                 "author_count", "All authors of a book")
 
                 # Summary statistics
                 st.metric(
@@ -916,7 +1681,7 @@ def main():
                 st.info("No books found with more than 3 authors.")
 
         elif analysis_option == "Books with Above Average Ratings":
-            above_avg = run_query(RATINGS_GREATER_THAN_AVERAGE_RATING)
+            above_avg = run_query_streamed(RATINGS_GREATER_THAN_AVERAGE_RATING, st.empty())
 
             if not above_avg.empty:
                 st.subheader("📚 Books with Above Average Number of Ratings")
@@ -943,7 +1708,10 @@ def main():
 
             if not same_year.empty:
                 st.subheader("📚 Authors with Multiple Books in Same Year")
-                st.dataframe(same_year)
+                st.dataframe(same_year.drop(columns=['author_id']))
+                render_drilldown(same_year, "AUTHOR_YEAR_BOOKS", ["author_id", "publication_year"],
+                                 ["author_name", "publication_year"], "books_in_year",
+                                 "All books of an author in a year")
 
                 # Summary
                 st.metric(
@@ -959,7 +1727,7 @@ def main():
             search_keyword = st.text_input("Enter keyword to search in book titles:")
 
             if search_keyword:
-                results = run_query(search_books_by_keyword(search_keyword))
+                results = run_query(*search_books_by_keyword(search_keyword))
 
                 if not results.empty:
                     st.subheader(f"📚 Books containing '{search_keyword}'")
@@ -1018,7 +1786,10 @@ def main():
 
             if not multi_publisher.empty:
                 st.subheader("📚 Authors Published by Multiple Publishers in Same Year")
-                st.dataframe(multi_publisher)
+                st.dataframe(multi_publisher.drop(columns=['author_id']))
+                render_drilldown(multi_publisher, "AUTHOR_YEAR_BOOKS", ["author_id", "publication_year"],
+                                 ["author_name", "publication_year"], "book_count",
+                                 "All books and publishers of an author in a year")
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -1037,7 +1808,7 @@ def main():
                 st.info("No authors found publishing with multiple publishers in the same year.")
 
         elif analysis_option == "eBook vs Physical Book Prices":
-            price_comparison = run_query(AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL)
+            price_comparison = run_analysis("AVERAGE_RETAIL_PRICE_EBOOK_VS_PHYSICAL")
 
             if not price_comparison.empty:
                 st.subheader("📚 Average Price Comparison: eBooks vs Physical Books")
@@ -1054,15 +1825,14 @@ def main():
                 st.info("No price comparison data available.")
 
         elif analysis_option == "Rating Outlier Analysis":
-            outliers = run_query(BOOKS_WITH_RATING_OUTLIERS)
+            outliers = run_analysis("BOOKS_WITH_RATING_OUTLIERS")
 
             if not outliers.empty:
                 st.subheader("📚 Books with Unusual Ratings (2+ Standard Deviations)")
                 st.dataframe(outliers)
 
                 st.subheader("📊 Rating Outliers Visualization")
-                fig = rating_outliers_chart(outliers)
-                st.pyplot(fig)
+                show_chart("BOOKS_WITH_RATING_OUTLIERS", outliers)
 
                 # Metrics
                 col1, col2, col3 = st.columns(3)
@@ -1094,8 +1864,7 @@ def main():
                 st.dataframe(top_publishers)
 
                 st.subheader("📊 Publisher Ratings Visualization")
-                fig = top_publisher_chart(top_publishers)
-                st.pyplot(fig)
+                show_chart("PUBLISHER_WITH_HIGHEST_AVERAGE_RATING", top_publishers)
 
                 # Metrics
                 col1, col2 = st.columns(2)
@@ -1112,6 +1881,150 @@ def main():
                         total_books,
                         f"Across {len(top_publishers)} publishers"
                     )
+
+        elif analysis_option == "ISBN Lookup":
+            isbn_text = st.text_area("Enter ISBN-10 or ISBN-13 values (one per line or comma separated):")
+            isbns = [value.strip() for value in isbn_text.replace(",", "\n").splitlines() if value.strip()]
+
+            if isbns:
+                lookup = resolve_isbns(isbns)
+                resolved = lookup[lookup['book_id'].notna()]
+                unresolved = lookup[lookup['book_id'].isna()]
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric(
+                        "Resolved ISBNs",
+                        resolved['isbn'].nunique(),
+                        f"of {len(isbns)} requested"
+                    )
+                with col2:
+                    st.metric(
+                        "Not Found / Invalid",
+                        unresolved['isbn'].nunique(),
+                        f"{lookup['canonical_isbn'].isna().sum()} invalid"
+                    )
+
+                if not resolved.empty:
+                    st.subheader("📚 Matching Books")
+                    st.dataframe(resolved, use_container_width=True)
+                if not unresolved.empty:
+                    st.subheader("❓ Unresolved ISBNs")
+                    st.dataframe(unresolved[['isbn', 'canonical_isbn']])
+
+        elif analysis_option == "Similar Books":
+            if not os.path.exists(SIMILARITY_INDEX_PATH):
+                st.info("The similarity index has not been built yet. Run Book_Data.py to build it.")
+            else:
+                index = load_similarity_index(os.path.getmtime(SIMILARITY_INDEX_PATH))
+                title_search = st.text_input("Find a book by title:")
+
+                if title_search:
+                    titles = pd.Series(index.titles)
+                    matches = titles[titles.str.contains(title_search, case=False, regex=False)].head(50)
+
+                    if matches.empty:
+                        st.info(f"No books found containing '{title_search}'")
+                    else:
+                        position = st.selectbox(
+                            "Select a book",
+                            matches.index.tolist(),
+                            format_func=lambda i: titles[i]
+                        )
+                        similar = pd.DataFrame(
+                            index.similar_books(index.book_ids[position]),
+                            columns=["book_id", "book_title", "similarity"]
+                        )
+
+                        if not similar.empty:
+                            st.subheader(f"📚 Books similar to '{titles[position]}'")
+                            st.dataframe(similar[["book_title", "similarity"]], use_container_width=True)
+                        else:
+                            st.info("No similar books found.")
+
+        elif analysis_option == "Price & Rating Trends":
+            last_observed = latest_history_date()
+            if last_observed is None:
+                st.info("No price and rating history yet. Each run of Book_Data.py records it.")
+            else:
+                days = st.slider("Changes in the last days", 1, 90, TREND_DAYS, key="trend_days")
+                st.caption(f"History last recorded on {last_observed}")
+                params = trend_params(days)
+                trends = {name: run_query(query, params) for name, query in TREND_QUERIES.items()}
+
+                for name, title in [("PRICE_DROPS", "📉 Biggest Price Drops (USD)"),
+                                    ("RATING_COUNT_GAINS", "⭐ Most New Ratings"),
+                                    ("RATING_CHANGES", "📊 Average Rating Changes")]:
+                    st.subheader(title)
+                    if trends[name].empty:
+                        st.info("No changes in this period.")
+                    else:
+                        st.dataframe(trends[name].drop(columns=['book_id']), use_container_width=True)
+
+                # Full timeline of one of the changed books
+                changed = [df[['book_id', 'book_title']] for df in trends.values() if not df.empty]
+                if changed:
+                    changed = pd.concat(changed).drop_duplicates()
+                    labels = {f"{row.book_title} ({row.book_id})": row.book_id for row in changed.itertuples()}
+                    choice = st.selectbox("Price and rating history of a book", list(labels))
+                    history = run_query(BOOK_HISTORY, (labels[choice],))
+                    st.dataframe(history, use_container_width=True)
+                    st.image(cached_figure(current_data_version(), f"BOOK_HISTORY:{labels[choice]}",
+                                           price_history_chart, history), use_column_width="always")
+
+        elif analysis_option == "Category Hierarchy":
+            if not category_tree_levels():
+                st.info("The category hierarchy is built by Book_Data.py; reload the catalog to create it.")
+            else:
+                # One selector per level; each choice lists the subcategories of the node below it
+                node, path = None, []
+                children = run_query(CATEGORY_ROOTS)
+                while not children.empty:
+                    labels = ["All"] + [f"{row.node_name} ({row.book_count:,} books)" for row in children.itertuples()]
+                    choice = st.selectbox(" / ".join(path) or "Top-level categories", labels,
+                                          key=f"category_level_{len(path)}")
+                    if choice == "All":
+                        break
+                    node = children.iloc[labels.index(choice) - 1]
+                    path.append(node['node_name'])
+                    children = run_query(CATEGORY_SUBCATEGORIES, (int(node['node_id']),))
+
+                if node is not None:
+                    st.subheader(f"📂 {node['node_path']}")
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Books", f"{int(node['book_count']):,}")
+                    col2.metric("Average pages", "-" if pd.isna(node['avg_pages']) else f"{node['avg_pages']:.0f}")
+                    col3.metric("Average rating", "-" if pd.isna(node['avg_rating']) else f"{node['avg_rating']:.2f}")
+                    col4.metric("Average price (USD)", "-" if pd.isna(node['avg_price']) else f"{node['avg_price']:.2f}")
+
+                if not children.empty:
+                    st.subheader("📚 Subcategories" if node is not None else "📚 Top-level Categories")
+                    st.dataframe(children.drop(columns=['node_id', 'node_path']), use_container_width=True)
+                    render_drilldown(children.reset_index(drop=True), "CATEGORY_NODE_BOOKS", ["node_id"],
+                                     ["node_name"], "book_count", "Books in a category")
+                elif node is not None:
+                    render_drilldown(pd.DataFrame([node]).reset_index(drop=True), "CATEGORY_NODE_BOOKS",
+                                     ["node_id"], ["node_name"], "book_count", "Books in this category")
+
+        elif analysis_option == "Ingest Monitor":
+            # Reads the file Book_Data.py publishes, never the tables it is writing
+            progress = read_progress()
+            if progress is None:
+                st.info("No ingest has run yet. Book_Data.py publishes its progress here while it loads the catalog.")
+            else:
+                render_ingest_monitor(progress)
+                if progress["status"] == "running" and st.toggle("Refresh automatically", value=True,
+                                                                 key="ingest_auto_refresh"):
+                    time.sleep(INGEST_POLL_SECONDS)
+                    st.rerun()
+
+        # Export the full result of the selected analysis
+        if analysis_option in ANALYSIS_VIEWS:
+            query_name = ANALYSIS_VIEWS[analysis_option]
+            render_export(query_name, ANALYSIS_QUERIES[query_name])
+        elif analysis_option == "Search Books by Keyword" and search_keyword:
+            render_export("KEYWORD_SEARCH", *search_books_by_keyword(search_keyword))
+
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
         st.warning("Please check your database connection and try again.")
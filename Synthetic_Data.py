@@ -0,0 +1,128 @@
+import random
+from itertools import accumulate, product
+from Book_Data import create_database_schema, process_book, refresh_book_display, isbn13_check_digit
+from Deduplication import deduplicate
+from Result_Cache import bump_data_version
+from Catalog_Sketches import CatalogSketches
+from Price_History import record_history
+from Category_Tree import refresh_category_stats
+
+# Vocabulary of the generated catalog, shaped like Google Books search results
+SEARCH_KEYS = ["Python programming", "Data Science", "Machine Learning", "Web Development", "Economics",
+               "Cooking Books", "English Literature", "Human Psychology", "Physics", "Business"]
+TITLE_WORDS = ["python", "data", "learning", "guide", "modern", "practical", "introduction", "advanced",
+               "economics", "kitchen", "poetry", "mind", "quantum", "business", "web", "design", "theory",
+               "history", "handbook", "essentials", "analysis", "systems", "stories", "recipes", "science"]
+PUBLISHERS = ["O'Reilly Media", "O'Reilly Media, Inc.", "Packt Publishing", "Wiley", "John Wiley & Sons",
+              "Penguin", "Penguin Books", "HarperCollins", "Springer", "Springer Nature", "Pearson",
+              "Cambridge University Press", "Oxford University Press", "Apress", "Manning Publications"]
+FIRST_NAMES = ["Anna", "Ravi", "John", "Mei", "Carlos", "Fatima", "Lars", "Priya", "Tom", "Yuki",
+               "Olga", "Samuel", "Aisha", "David", "Elena", "Kenji", "Maria", "Ahmed", "Lucy", "Ivan"]
+LAST_NAMES = ["Smith", "Kumar", "Chen", "Garcia", "Khan", "Larsen", "Sharma", "Brown", "Tanaka", "Petrova",
+              "Okafor", "Hussain", "Miller", "Rossi", "Sato", "Lopez", "Ali", "Evans", "Novak", "Singh"]
+CATEGORIES = ["Computers / Programming / Python", "Computers / Data Science", "Computers / Web",
+              "Business & Economics / General", "Business & Economics / Economics", "Cooking / General",
+              "Literary Criticism / English", "Psychology / General", "Science / Physics", "Fiction"]
+CURRENCIES = ["INR", "USD", "EUR", "GBP"]
+
+# Skewed catalogs: a long tail of authors and publishers where a few of them own most books (Zipf),
+# and most books carry no price
+SYLLABLES = ["ka", "ri", "lo", "men", "tar", "vi", "son", "del", "ma", "ne", "ro", "sa", "te", "lin", "go", "ber"]
+TAIL_SURNAMES = ["".join(parts).title() for parts in product(SYLLABLES, repeat=3)]
+SKEWED_AUTHORS = [f"{first} {last}" for last in LAST_NAMES + TAIL_SURNAMES for first in FIRST_NAMES]
+SKEWED_PUBLISHERS = PUBLISHERS + [f"{name} Press" for name in TAIL_SURNAMES[:2000]]
+SKEWED_SALE_SHARE = 0.35
+
+
+def zipf_cum_weights(size, exponent):
+    """Cumulative Zipf weights of ranks 1..size, for random.choices"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+SKEWED_AUTHOR_WEIGHTS = zipf_cum_weights(len(SKEWED_AUTHORS), 1.1)
+SKEWED_PUBLISHER_WEIGHTS = zipf_cum_weights(len(SKEWED_PUBLISHERS), 1.2)
+
+
+def synthetic_isbn13(number):
+    body = f"978{number % 10 ** 9:09d}"
+    return body + isbn13_check_digit(body)
+
+
+def synthetic_book(number, rng, skewed=False):
+    """One Google Books volume with the fields Book_Data.process_book reads"""
+    title = " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 5))).title()
+    author_count = rng.choice([1, 1, 1, 2, 2, 3, 4])
+    if skewed:
+        authors = rng.choices(SKEWED_AUTHORS, cum_weights=SKEWED_AUTHOR_WEIGHTS, k=author_count)
+    else:
+        authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(author_count)]
+    currency = rng.choice(CURRENCIES)
+    list_price = round(rng.uniform(5, 150) * (80 if currency == "INR" else 1), 2)
+    on_sale = rng.random() < (SKEWED_SALE_SHARE if skewed else 0.8)
+
+    book = {
+        "id": f"syn{number:08d}",
+        "volumeInfo": {
+            "title": title,
+            "subtitle": f"{rng.choice(TITLE_WORDS).title()} edition" if rng.random() < 0.4 else None,
+            "authors": list(dict.fromkeys(authors)),
+            "publisher": (rng.choices(SKEWED_PUBLISHERS, cum_weights=SKEWED_PUBLISHER_WEIGHTS)[0] if skewed
+                          else rng.choice(PUBLISHERS)),
+            "publishedDate": f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-01",
+            "description": " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(10, 60))),
+            "industryIdentifiers": [{"type": "ISBN_13", "identifier": synthetic_isbn13(number)}],
+            "readingModes": {"text": rng.random() < 0.7, "image": rng.random() < 0.3},
+            "pageCount": rng.randint(40, 1200),
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 2)),
+            "averageRating": rng.choice([None, None, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]),
+            "ratingsCount": rng.randint(0, 500) if rng.random() < 0.6 else None,
+            "language": rng.choice(["en", "en", "en", "fr", "de", "hi"]),
+            "imageLinks": {"thumbnail": f"http://books.example/{number}.jpg"}
+        },
+        "saleInfo": {
+            "country": "IN",
+            "saleability": "FOR_SALE" if on_sale else "NOT_FOR_SALE",
+            "isEbook": rng.random() < 0.45
+        }
+    }
+    if on_sale:
+        book["saleInfo"]["listPrice"] = {"amount": list_price, "currencyCode": currency}
+        book["saleInfo"]["retailPrice"] = {"amount": round(list_price * rng.uniform(0.5, 1.0), 2),
+                                           "currencyCode": currency}
+    book["volumeInfo"] = {k: v for k, v in book["volumeInfo"].items() if v is not None}
+    return book
+
+
+def seed_database(connection, books=2000, seed=7, commit_every=500, skewed=False):
+    """Recreate the schema and load synthetic books through the regular ingest path
+
+    skewed draws authors and publishers from Zipf-weighted long tails and leaves most books unpriced.
+    Returns the data version published for the seeded catalog; its catalog sketches are saved too.
+    """
+    rng = random.Random(seed)
+    sketches = CatalogSketches()
+    cursor = connection.cursor()
+    create_database_schema(cursor)
+    connection.commit()
+
+    for number in range(books):
+        process_book(synthetic_book(number, rng, skewed), rng.choice(SEARCH_KEYS), cursor, sketches)
+        if (number + 1) % commit_every == 0:
+            connection.commit()
+    connection.commit()
+
+    affected_books = set()
+    for kind in ("publisher", "author"):
+        affected_books.update(deduplicate(cursor, kind))
+    for book_id in affected_books:
+        refresh_book_display(cursor, book_id)
+    sketches.apply_author_merges(cursor)
+    refresh_category_stats(cursor)
+
+    version = bump_data_version(cursor)
+    record_history(cursor, version)
+    connection.commit()
+    sketches.save(version)
+    cursor.close()
+    print(f"Seeded {books} synthetic books (data version {version})")
+    return version
@@ -0,0 +1,34 @@
+from Storage import SQLiteBackend
+from Book_Data import DISCOUNT_PCT_LIMIT, create_database_schema, discount_percentage, process_book
+
+
+def price(amount, currency):
+    return {"amount": amount, "currencyCode": currency}
+
+
+def test_same_currency_discount_uses_raw_amounts():
+    # 9 INR -> 8 INR is 11.11% off; rounding to USD cents first gives 0.11 -> 0.10, 9.09%
+    assert discount_percentage(price(9, "INR"), price(8, "INR")) == 11.11
+
+
+def test_discount_is_clamped_to_the_column():
+    assert discount_percentage(price(0.01, "USD"), price(500, "USD")) == -DISCOUNT_PCT_LIMIT
+
+
+def test_mixed_currencies_convert_before_comparing():
+    assert discount_percentage(price(10, "GBP"), price(12.73, "USD")) == 0.0
+    assert discount_percentage(price(10, "XXX"), price(5, "USD")) is None
+    assert discount_percentage({}, price(5, "USD")) is None
+
+
+def test_display_lists_authors_in_api_order(tmp_path):
+    connection = SQLiteBackend(str(tmp_path / "books.db")).connect()
+    cursor = connection.cursor()
+    create_database_schema(cursor)
+    # "Zoe Adams" is inserted first, so ordering by author_id would put her first in the second book
+    for book_id, authors in (("first", ["Zoe Adams"]), ("second", ["Ann Brook", "Zoe Adams", "Carl Diaz"])):
+        process_book({"id": book_id, "volumeInfo": {"title": book_id, "authors": authors}, "saleInfo": {}},
+                     "test", cursor)
+    cursor.execute("SELECT book_authors FROM book_display WHERE book_id = 'second'")
+    assert cursor.fetchone()[0] == "Ann Brook, Zoe Adams, Carl Diaz"
+    connection.close()
@@ -0,0 +1,79 @@
+import pytest
+import requests
+import Book_Data
+import Crawl_Planner
+from Book_Data import scrap
+
+
+class FakeResponse:
+    def __init__(self, status_code, items=(), headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = Book_Data.json.dumps({"items": list(items)}).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+
+class FakeSession:
+    """Replays canned responses in order"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.headers = {}
+        self.requests = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.requests += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    waits = []
+    monkeypatch.setattr(Book_Data.time, "sleep", waits.append)
+    return waits
+
+
+def books(count, prefix="b"):
+    return [{"id": f"{prefix}{n}", "volumeInfo": {}} for n in range(count)]
+
+
+def test_rate_limit_and_server_errors_are_retried(no_sleep):
+    session = FakeSession(FakeResponse(429, headers={"Retry-After": "7"}), FakeResponse(503),
+                          FakeResponse(200, books(3)))
+    assert len(scrap("python", "key", 40, session)) == 3
+    assert no_sleep == [7.0, 2.0]
+
+
+def test_client_errors_are_not_mistaken_for_the_end_of_results():
+    with pytest.raises(requests.HTTPError):
+        scrap("python", "key", 40, FakeSession(FakeResponse(403)))
+
+
+def test_retries_are_bounded():
+    session = FakeSession(*[FakeResponse(500)] * (Book_Data.MAX_RETRIES + 1))
+    with pytest.raises(requests.HTTPError):
+        scrap("python", "key", 40, session)
+    assert session.requests == Book_Data.MAX_RETRIES + 1
+
+
+def test_failed_partitions_are_counted(monkeypatch, capsys):
+    def fake_scrap(query, api_key, max_results, session=None, filters=None):
+        if filters:
+            raise requests.HTTPError("403 error")
+        return books(max_results)
+
+    monkeypatch.setattr(Crawl_Planner, "scrap", fake_scrap)
+    assert len(Crawl_Planner.crawl("python", "key", workers=2, ceiling=4)) == 4
+    assert "2 failed" in capsys.readouterr().out
+
+
+def test_partitions_over_the_budget_are_reported(monkeypatch, capsys):
+    monkeypatch.setattr(Crawl_Planner, "scrap", lambda query, api_key, max_results, session=None, filters=None:
+                        books(max_results, prefix=f"{query}{sorted((filters or {}).items())}"))
+    Crawl_Planner.crawl("python", "key", workers=1, ceiling=4, max_partitions=2)
+    output = capsys.readouterr().out
+    assert "1 of 2 sub-partitions dropped" in output
+    assert "2 dropped over the partition budget" in output
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import pytest
+import pyarrow.parquet as pq
+from Data_Export import EXPORT_TTL_SECONDS, export_parquet, export_to_file, remove_stale_exports
+
+
+def catalog(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books (book_id INTEGER, pages INTEGER, rating REAL, subtitle TEXT, year INTEGER)")
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?)", rows)
+    return conn
+
+
+def test_nulls_only_in_a_later_chunk(tmp_path):
+    # Chunks of two rows: pages gets its first null in the second chunk,
+    # subtitle and year are null in the whole first chunk
+    rows = [
+        (1, 120, 4.5, None, None),
+        (2, 300, None, None, None),
+        (3, None, 3.0, "Second edition", 2019),
+        (4, 250, 4.0, None, None),
+        (5, 90, None, "Abridged", 2021),
+    ]
+    path = tmp_path / "books.parquet"
+    assert export_parquet(catalog(rows), "SELECT * FROM books ORDER BY book_id", path, chunk_size=2) == 5
+
+    table = pq.read_table(path)
+    assert [str(field.type) for field in table.schema] == ["int64", "int64", "double", "string", "int64"]
+    assert table.column("pages").to_pylist() == [120, 300, None, 250, 90]
+    assert table.column("subtitle").to_pylist() == [None, None, "Second edition", None, "Abridged"]
+    assert table.column("year").to_pylist() == [None, None, 2019, None, 2021]
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+
+def test_columns_never_typed_within_the_scan_are_strings(tmp_path):
+    rows = [(n, n * 10, None, None, None) for n in range(4)] + [(4, 40, 1.5, "Late", 2020)]
+    path = tmp_path / "books.parquet"
+    export_parquet(catalog(rows), "SELECT * FROM books ORDER BY book_id", path, chunk_size=2, type_scan_rows=4)
+
+    table = pq.read_table(path)
+    assert str(table.schema.field("year").type) == "string"
+    assert table.column("year").to_pylist() == [None, None, None, None, "2020"]
+    assert table.column("rating").to_pylist() == [None, None, None, None, "1.5"]
+
+
+def test_short_result_with_an_all_null_column(tmp_path):
+    path = tmp_path / "books.parquet"
+    assert export_parquet(catalog([(1, 100, None, None, None)]), "SELECT * FROM books", path) == 1
+    assert str(pq.read_table(path).schema.field("subtitle").type) == "string"
+
+
+def test_export_files_stay_in_their_directory_and_failed_exports_leave_none(tmp_path):
+    conn = catalog([(1, 120, 4.5, None, 2019)])
+    path, rows = export_to_file(conn, "SELECT * FROM books", "CSV", directory=str(tmp_path))
+    assert rows == 1 and [p.name for p in tmp_path.iterdir()] == [os.path.basename(path)]
+
+    with pytest.raises(sqlite3.Error):
+        export_to_file(conn, "SELECT * FROM missing_table", "Parquet", directory=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_exports_past_their_ttl_are_removed(tmp_path):
+    conn = catalog([(1, 120, 4.5, None, 2019)])
+    stale, _ = export_to_file(conn, "SELECT * FROM books", "CSV", directory=str(tmp_path))
+    fresh, _ = export_to_file(conn, "SELECT * FROM books", "CSV", directory=str(tmp_path))
+    old = os.path.getmtime(stale) - EXPORT_TTL_SECONDS - 1
+    os.utime(stale, (old, old))
+
+    remove_stale_exports(str(tmp_path))
+    assert not os.path.exists(stale) and os.path.exists(fresh)
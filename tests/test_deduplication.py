@@ -0,0 +1,44 @@
+from Deduplication import ENTITIES, PUBLISHER_NOISE, cluster_names, normalize_name, blocking_keys
+
+
+def test_non_latin_names_do_not_fail_or_merge():
+    assert cluster_names(["清华大学出版社", "Packt", "Иванов", "हिंदी प्रकाशन"]) == []
+
+
+def test_non_latin_variants_merge():
+    names = ["清华大学出版社", "清华大学 出版社", "Иванов Пётр", "иванов пётр", "Packt", "Packt Publishing"]
+    assert sorted(cluster_names(names, PUBLISHER_NOISE, 0.75)) == [[0, 1], [2, 3], [4, 5]]
+
+
+def test_accents_dropped_from_latin_letters_only():
+    assert normalize_name("Müller") == ["muller"]
+    assert normalize_name("Nguyễn Thị") == ["nguyen", "thi"]
+    assert normalize_name("O'Reilly Media", PUBLISHER_NOISE) == ["oreilly"]
+    assert normalize_name("हिंदी") == ["हिंदी"]
+
+
+def test_names_without_words_fall_back_to_their_text():
+    assert normalize_name("!!!") == ["!!!"]
+    assert normalize_name("  ") == []
+
+
+def test_empty_names_have_no_blocks_and_match_nothing():
+    assert blocking_keys([], "") == set()
+    assert cluster_names(["", " ", "", "Packt"]) == []
+
+
+def cluster_authors(names):
+    author = ENTITIES["author"]
+    return sorted(cluster_names(names, author["noise"], author["threshold"], author["distinct"]))
+
+
+def test_generational_suffixes_are_different_authors():
+    assert cluster_authors(["John Smith Jr.", "John Smith Sr.", "John Smith", "John Smith III"]) == []
+    # Trigram similarity alone would merge these (0.95)
+    assert cluster_authors(["Alexander Hamilton III", "Alexander Hamilton II"]) == []
+
+
+def test_same_suffix_variants_still_merge():
+    names = ["John Smith Jr.", "John Smith, Jr", "Dr. Jane Doe", "Jane Doe",
+             "Alexander Hamillton III", "Alexander Hamilton III"]
+    assert cluster_authors(names) == [[0, 1], [2, 3], [4, 5]]
@@ -0,0 +1,53 @@
+import pytest
+from Storage import SQLiteBackend
+from Index_Check import check_query_indexes, full_scan_steps
+
+QUERIES = {
+    "RATED": "SELECT book_id FROM books WHERE averageRating > 4",
+    "COUNT": "SELECT COUNT(*) FROM books",
+    "TITLES": "SELECT b.book_title FROM books b",
+    "BY_PUBLISHER": "SELECT p.publisher_name, COUNT(b.book_id) FROM publishers p "
+                    "JOIN books b ON b.publisher_id = p.publisher_id GROUP BY p.publisher_name",
+}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "plans.db"))
+    connection = backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE publishers (publisher_id INTEGER PRIMARY KEY, publisher_name TEXT)")
+    cursor.execute("CREATE TABLE books (book_id INTEGER PRIMARY KEY, book_title TEXT, "
+                   "publisher_id INTEGER, averageRating REAL)")
+    cursor.execute("CREATE INDEX idx_rating ON books (averageRating)")
+    cursor.execute("CREATE INDEX idx_publisher ON books (publisher_id)")
+    yield backend, cursor
+    connection.close()
+
+
+def test_covering_index_and_driving_table_scans_are_full_scans(catalog):
+    backend, cursor = catalog
+    assert full_scan_steps(backend.explain(cursor, QUERIES["RATED"])) == []
+    # COUNT(*) reads every entry of the smallest index
+    assert [step["table"] for step in full_scan_steps(backend.explain(cursor, QUERIES["COUNT"]))] == ["books"]
+    # Whichever table drives the join is read in full
+    assert len(full_scan_steps(backend.explain(cursor, QUERIES["BY_PUBLISHER"]))) == 1
+
+
+def test_full_scans_fail_unless_allowed_for_the_query(catalog):
+    backend, cursor = catalog
+    failures = check_query_indexes(backend, cursor, QUERIES, {("TITLES", "books")})
+    assert sorted(failures) == ["BY_PUBLISHER", "COUNT"]
+
+    allowed = {("TITLES", "books"), ("COUNT", "books"), ("BY_PUBLISHER", "publishers"), ("BY_PUBLISHER", "books")}
+    assert check_query_indexes(backend, cursor, QUERIES, allowed) == {}
+
+
+def test_plan_steps_name_the_table_behind_an_alias(catalog):
+    backend, cursor = catalog
+    [step] = backend.explain(cursor, QUERIES["TITLES"])
+    assert (step["table"], step["alias"]) == ("books", "b")
+    # An alias is no exemption: the allowed scan is of books, not of whatever "p" stands for
+    failures = check_query_indexes(backend, cursor, {"TITLES": "SELECT p.publisher_name FROM publishers p"},
+                                   {("TITLES", "books")})
+    assert [step["table"] for step in failures["TITLES"]] == ["publishers"]
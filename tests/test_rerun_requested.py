@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+from streamlit.runtime.scriptrunner.script_requests import RerunData, ScriptRequests
+from Streamlit_Application import RERUN_STATE_READABLE, rerun_requested
+
+
+def session(requests):
+    return SimpleNamespace(script_requests=requests)
+
+
+def test_pending_rerun_state_is_readable():
+    # Fails when a Streamlit upgrade renames the private state query cancellation relies on
+    assert RERUN_STATE_READABLE
+
+
+def test_rerun_and_stop_requests_cancel():
+    requests = ScriptRequests()
+    assert not rerun_requested(session(requests))
+    requests.request_rerun(RerunData())
+    assert rerun_requested(session(requests))
+
+    requests = ScriptRequests()
+    requests.request_stop()
+    assert rerun_requested(session(requests))
+
+
+def test_no_script_context_never_cancels():
+    assert not rerun_requested(None)
@@ -0,0 +1,58 @@
+import os
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+import Result_Cache
+from Result_Cache import ResultCache, cached_figure
+
+
+def counting_chart():
+    calls = []
+
+    def draw(data):
+        calls.append(len(data))
+        fig, ax = plt.subplots(figsize=(2, 2))
+        ax.bar(data["name"], data["books"])
+        return fig
+
+    return draw, calls
+
+
+def test_charts_are_keyed_by_their_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(Result_Cache, "RESULT_CACHE", ResultCache(str(tmp_path)))
+    draw, calls = counting_chart()
+    first = pd.DataFrame({"name": ["a", "b"], "books": [3, 4]})
+
+    cached_figure("v1", "TOP", draw, first)
+    cached_figure("v1", "TOP", draw, first.copy())
+    assert calls == [2]
+
+    cached_figure("v1", "TOP", draw, pd.DataFrame({"name": ["a", "b", "c"], "books": [3, 4, 1]}))
+    assert calls == [2, 3]
+
+
+def test_degraded_results_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(Result_Cache, "RESULT_CACHE", ResultCache(str(tmp_path)))
+    draw, calls = counting_chart()
+    degraded = pd.DataFrame({"name": ["a"], "books": [1]})
+    degraded.attrs["degraded"] = "Query exceeded its 30s time limit"
+
+    cached_figure("v1", "TOP", draw, degraded)
+    cached_figure("v1", "TOP", draw, degraded)
+    assert calls == [1, 1]
+    assert not os.path.exists(tmp_path / "v1")
+
+
+def test_disk_entries_are_evicted_least_recently_used_first(tmp_path):
+    entry = b"x" * 1000
+    cache = ResultCache(str(tmp_path), max_disk_bytes=3500)
+    for number, query in enumerate(["a", "b", "c"]):
+        cache.put("v1", query, None, entry)
+        os.utime(cache.path("v1", cache.key(query)), (time.time() - 100 + number,) * 2)
+
+    # Reading "a" from disk makes it the most recently used
+    assert ResultCache(str(tmp_path)).get("v1", "a") == entry
+    cache.put("v1", "d", None, entry)
+
+    on_disk = {query for query in "abcd" if os.path.exists(cache.path("v1", cache.key(query)))}
+    assert on_disk == {"a", "c", "d"}
@@ -0,0 +1,34 @@
+import sqlite3
+from decimal import Decimal
+from Result_Loader import column_kind, fetch_frame
+
+
+def test_integral_values_do_not_make_a_decimal_column_int():
+    assert column_kind(None, [4, 3.5, None, 4.5]) == "float"
+    assert column_kind(None, [12, Decimal("9.99")]) == "float"
+    assert column_kind(None, [None, 4, 5]) == "int"
+    assert column_kind(None, [True, None, False]) == "bool"
+    assert column_kind(None, [1, "two"]) == "str"
+    assert column_kind(None, [None, None]) == "str"
+
+
+def test_sqlite_numeric_affinity_keeps_fractions():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books (averageRating DECIMAL(3,2), retail_price DECIMAL(10,2))")
+    conn.executemany("INSERT INTO books VALUES (?, ?)", [(4.0, 12.0), (3.5, 9.99), (4.5, 1.5)])
+
+    frame = fetch_frame(conn, "SELECT averageRating, retail_price FROM books")
+    assert frame["averageRating"].tolist() == [4.0, 3.5, 4.5]
+    assert frame["retail_price"].tolist() == [12.0, 9.99, 1.5]
+    assert str(frame["averageRating"].dtype) == "float64"
+
+
+def test_sqlite_decimal_columns_return_floats(tmp_path):
+    from Storage import SQLiteBackend
+    conn = SQLiteBackend(str(tmp_path / "books.db")).connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE books (averageRating DECIMAL(3,2))")
+    cursor.executemany("INSERT INTO books VALUES (%s)", [(4.0,), (5,)])
+    cursor.execute("SELECT averageRating FROM books")
+    assert [type(row[0]) for row in cursor.fetchall()] == [float, float]
+    conn.close()